@@ -0,0 +1,222 @@
+"""プレイ中の GC を止めて暇な時間にだけ回収する仕組みと、フレームごとのメモリの確保を調べる計測
+
+    collector = IdleCollector()
+    collector.start()                    # ステージを作った後
+    tracer = AllocationTracer(frames=600)
+    while True:
+        tracer.begin_frame()
+        game.step(action)
+        if any(kind == EVENT_RESET for kind, _ in game.events):
+            collector.level_started()    # 作り直したステージを凍らせる
+        ...描画...
+        collector.update(game)           # クリア・ゲームオーバーの画面のときだけ回収する
+        tracer.end_frame()
+    tracer.finish()                      # 途中で終わったときは、そこまでの分を表示する
+
+IdleCollector は自動の GC を止め（gc.disable）、ステージを作った後の物は gc.freeze() で
+回収の対象から外す。回収はクリア・ゲームオーバーの画面に入ったときに1回だけ行う
+（画面が止まっているので、少し時間がかかっても目立たない）。プレイが長く続いて
+回収を待つ物が MAX_PENDING を超えたときだけ、若い世代を回収する。
+
+AllocationTracer は tracemalloc で、warmup フレームの後の frames フレームの間、
+毎フレームの終わりにスナップショットを取って前のフレームの終わりと比べ、呼び出し元
+（ファイル:行）ごとに、各フレームで増えた量（フレームの終わりまで残った確保）の合計と、
+計測の間に残った量とを1フレームあたりで表示する
+（numpy・pygame などの中で確保した分は、それを呼んだゲームの行に数える）。
+次のフレームで解放される物（毎フレーム作り直すリストなど）は、増えた量には出るが残った量には出ない。
+（スナップショットを毎フレーム取るので、計測中のフレームはかなり遅くなる。）
+計測の最初と最後には GC を回す（解放した物を取っておく Python の空きリストも空になるので、
+残った量は本当に使われている物だけになる）。GC が回収することになる循環参照のごみは、
+その数と、計測中の GC の回数・時間として別に表示する。
+フレームの中で確保してすぐ解放した分は呼び出し元ごとには残らないので、
+1フレームの中の一時的な確保量の最大・平均として表示する。
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+MAX_PENDING = 50000   # 回収を待つ物（若い世代）がこれを超えたらプレイ中でも若い世代だけ回収する
+TRACE_WARMUP = 60     # 計測を始めるまでのフレーム数（画像・文字のキャッシュができるまで）
+TRACE_TOP = 15        # 表示する呼び出し元の数
+TRACE_DEPTH = 16      # 記録する呼び出しの深さ（numpy・pygame の中から、呼んだゲームの行までたどる）
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def traced_itself(traceback):
+    """計測の仕組み自体（tracemalloc・このファイル）や import の確保か"""
+    if any(frame.filename in (tracemalloc.__file__, __file__) for frame in traceback):
+        return True
+    return traceback[-1].filename.startswith('<frozen importlib._bootstrap')
+
+
+def call_site(traceback):
+    """確保した場所に一番近いゲームのファイルの行（無ければ一番内側の行）"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(GAME_DIR):
+            return frame
+    return traceback[-1]
+
+
+class IdleCollector:
+    """プレイ中は GC を止め、クリア・ゲームオーバーの画面でだけ回収する"""
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self.idle = False             # 前の update でクリア・ゲームオーバーの画面だったか
+        self.idle_collections = 0     # 暇な時間に回収した回数
+        self.forced_collections = 0   # プレイ中に若い世代を回収した回数
+
+    def start(self):
+        """自動の GC を止め、今ある物（最初のステージ）を回収の対象から外す"""
+        gc.disable()
+        gc.collect()
+        gc.freeze()
+
+    def level_started(self):
+        """ステージを作り直した後に呼ぶ（作った物を回収の対象から外す）"""
+        gc.freeze()
+
+    def update(self, game):
+        """描画の後に毎フレーム呼ぶ。クリア・ゲームオーバーの画面に入ったときに回収する"""
+        idle = game.level_cleared or game.game_over
+        if idle and not self.idle:
+            # 凍らせた物も含めて全て回収し、残った物を凍らせ直す
+            gc.unfreeze()
+            gc.collect()
+            gc.freeze()
+            self.idle_collections += 1
+        elif not idle and gc.get_count()[0] > self.max_pending:
+            gc.collect(0)
+            self.forced_collections += 1
+        self.idle = idle
+
+    def stop(self):
+        """自動の GC に戻す"""
+        gc.unfreeze()
+        gc.enable()
+
+
+class AllocationTracer:
+    """フレームごとのメモリの確保を tracemalloc で調べ、呼び出し元ごとに表示する"""
+
+    def __init__(self, frames, warmup=TRACE_WARMUP, top=TRACE_TOP, file=sys.stderr):
+        self.frames = frames
+        self.warmup = warmup
+        self.top = top
+        self.file = file
+        self.frame = 0
+        self.measured = 0         # 計測したフレーム数
+        self.last_stats = None    # 前のフレームの終わりの、呼び出しの履歴 -> (量, 数)（計測中だけ）
+        self.sites = {}           # 呼び出し元 -> [増えた量, 増えた数, 残った量, 残った数]
+        self.frame_current = 0    # フレームの始まりの確保量（バイト）
+        self.peak_total = 0       # フレームの中の一時的な確保量の合計
+        self.peak_max = 0
+        self.gc_pauses = []       # 計測中の GC の (世代, 秒)
+        self.gc_start = None
+        self.garbage = 0          # 計測中に回収した循環参照のごみの数
+        tracemalloc.start(TRACE_DEPTH)
+
+    @property
+    def measuring(self):
+        return self.last_stats is not None
+
+    def begin_frame(self):
+        if self.frame == self.warmup:
+            gc.collect()
+            self.last_stats = self.take_stats()
+            gc.callbacks.append(self.on_gc)
+        if self.measuring:
+            self.frame_current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def end_frame(self):
+        if self.measuring:
+            peak = tracemalloc.get_traced_memory()[1] - self.frame_current
+            self.peak_total += peak
+            self.peak_max = max(self.peak_max, peak)
+            stats = self.take_stats()
+            self.add_diff(self.last_stats, stats, grown=True)
+            self.last_stats = stats
+            self.measured += 1
+        self.frame += 1
+        if self.frame == self.warmup + self.frames:
+            self.finish()
+
+    def add_diff(self, previous, current, grown):
+        """previous から current への違いを呼び出し元ごとに、残った量（grown なら増えた量にも）足す"""
+        sites = self.sites
+        changes = [(traceback, size, count, *previous.get(traceback, (0, 0)))
+                   for traceback, (size, count) in current.items()]
+        changes.extend((traceback, 0, 0, size, count) for traceback, (size, count) in previous.items()
+                       if traceback not in current)
+        for traceback, size, count, old_size, old_count in changes:
+            size_diff = size - old_size
+            count_diff = count - old_count
+            if (size_diff or count_diff) and not traced_itself(traceback):
+                site = sites.setdefault(call_site(traceback), [0, 0, 0, 0])
+                if grown:
+                    site[0] += max(size_diff, 0)
+                    site[1] += max(count_diff, 0)
+                site[2] += size_diff
+                site[3] += count_diff
+
+    def finish(self):
+        """計測をやめて表示する（frames に届く前に呼べば、それまでのフレームの分を表示する）"""
+        if self.measuring:
+            gc.callbacks.remove(self.on_gc)
+            self.garbage += gc.collect()
+            # 最後の GC で解放した分は残った量にだけ入れる
+            self.add_diff(self.last_stats, self.take_stats(), grown=False)
+            if self.measured:
+                self.report()
+        self.stop()
+
+    def on_gc(self, phase, info):
+        """GC の前後に呼ばれる（gc.callbacks）"""
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            self.gc_pauses.append((info['generation'], time.perf_counter() - self.gc_start))
+            self.garbage += info['collected']
+            self.gc_start = None
+
+    def take_stats(self):
+        """今の確保の、呼び出しの履歴 -> (量, 数)"""
+        return {stat.traceback: (stat.size, stat.count)
+                for stat in tracemalloc.take_snapshot().statistics('traceback')}
+
+    def report(self):
+        """呼び出し元ごとの1フレームあたりの増えた量・残った量と、一時的な確保量・GC を表示する"""
+        frames = self.measured
+        file = self.file
+        sites = self.sites
+        grown = sum(site[0] for site in sites.values())
+        grown_count = sum(site[1] for site in sites.values())
+        size_diff = sum(site[2] for site in sites.values())
+        count_diff = sum(site[3] for site in sites.values())
+        print(f"メモリの確保: {frames} フレーム（1フレームあたり）", file=file)
+        print(f"  増えた量 {grown / frames:+.1f} B, {grown_count / frames:+.2f} 個", file=file)
+        print(f"  残った量 {size_diff / frames:+.1f} B, {count_diff / frames:+.2f} 個", file=file)
+        print(f"  循環参照のごみ {self.garbage / frames:.2f} 個", file=file)
+        print(f"  一時的な確保量 平均 {self.peak_total / frames / 1024:.1f} KiB,"
+              f" 最大 {self.peak_max / 1024:.1f} KiB", file=file)
+        if self.gc_pauses:
+            worst = max(seconds for _, seconds in self.gc_pauses)
+            generations = sorted({generation for generation, _ in self.gc_pauses})
+            print(f"  GC {len(self.gc_pauses)} 回（世代 {generations}）, 最大 {worst * 1e3:.2f} ms", file=file)
+        else:
+            print("  GC 0 回", file=file)
+        print(f"増えた量の多い呼び出し元（上位 {self.top}。増えた量 / 残った量）", file=file)
+        ranked = sorted(sites.items(), key=lambda item: (item[1][0], abs(item[1][2])), reverse=True)
+        for frame, (size, count, kept, kept_count) in ranked[:self.top]:
+            print(f"  {size / frames:+10.1f} B {count / frames:+8.2f} 個 / {kept / frames:+10.1f} B"
+                  f" {kept_count / frames:+8.2f} 個  {frame.filename}:{frame.lineno}", file=file)
+
+    def stop(self):
+        """計測をやめる（tracemalloc は遅いので、表示したら止める）"""
+        if self.on_gc in gc.callbacks:
+            gc.callbacks.remove(self.on_gc)
+        self.last_stats = None
+        tracemalloc.stop()
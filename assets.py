@@ -0,0 +1,129 @@
+"""画像の読み込み（縮小済みの画像を1枚のアトラスにまとめ、ディスクにキャッシュする）
+
+    sprites = AssetManager().load_sprites({'paddle': ('player.png', (100, 15)), ...})
+    sprites['paddle']  # アトラスの一部（subsurface）。読み込めなかった画像は入らない
+
+アトラスは元画像のパス・更新時刻・大きさと縮小後の大きさから作ったキーで
+.cache/ に生のピクセル（RGBA）と配置（JSON）を保存する。次回からは元画像の
+デコードと縮小をせずにピクセルをそのまま読み込む。読み込んだアトラスは
+convert_alpha() で画面の形式に変換するので、描画のたびに形式を変換しなくて済む
+（pygame.display.set_mode() の後に呼ぶこと）。
+"""
+import hashlib
+import json
+import os
+import sys
+
+import pygame
+
+CACHE_DIR = '.cache'
+ATLAS_WIDTH = 512   # アトラスの幅（これより広い画像はその幅になる）
+ATLAS_PADDING = 1   # 画像の間の隙間（拡大縮小して描いても隣がにじまないように）
+ATLAS_VERSION = 1   # キャッシュの形式を変えたら上げる
+
+
+def pack_atlas(sizes):
+    """名前 -> (幅, 高さ) を棚詰めで並べ、(アトラスの大きさ, 名前 -> (x, y, 幅, 高さ)) を返す"""
+    rects = {}
+    width = max([ATLAS_WIDTH] + [w for w, _ in sizes.values()])
+    x = y = shelf_height = 0
+    # 背の高い順に並べると棚の無駄が少ない（同じ高さなら名前順）
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + w > width:
+            x = 0
+            y += shelf_height + ATLAS_PADDING
+            shelf_height = 0
+        rects[name] = (x, y, w, h)
+        x += w + ATLAS_PADDING
+        shelf_height = max(shelf_height, h)
+    return (width, y + shelf_height), rects
+
+
+class AssetManager:
+    """画像をアトラスにまとめて読み込む"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.errors = []  # 読み込めなかった画像のメッセージ
+
+    def report(self, message):
+        """読み込みの失敗を覚えておき、標準エラーに出す"""
+        self.errors.append(message)
+        print(message, file=sys.stderr)
+
+    def load_sprites(self, specs):
+        """specs（名前 -> (パス, (幅, 高さ) または None で元の大きさ)）の画像を読み込む
+
+        名前 -> Surface の辞書を返す。読み込めなかった画像は報告して辞書に入れない。
+        """
+        sources = {}
+        for name, (path, size) in specs.items():
+            try:
+                stat = os.stat(path)
+            except OSError as error:
+                self.report(f"画像を読み込めない: {path}: {error.strerror}")
+                continue
+            sources[name] = (path, size, stat.st_mtime_ns, stat.st_size)
+        if not sources:
+            return {}
+
+        key_data = json.dumps([ATLAS_VERSION, sorted(sources.items())]).encode('utf-8')
+        key = hashlib.sha1(key_data).hexdigest()[:16]
+        pixels_path = os.path.join(self.cache_dir, f"atlas-{key}.rgba")
+        layout_path = os.path.join(self.cache_dir, f"atlas-{key}.json")
+
+        atlas, rects = self.load_cached_atlas(pixels_path, layout_path)
+        if atlas is None:
+            atlas, rects = self.build_atlas(sources)
+            if not rects:
+                return {}
+            # 読み込めなかった画像があれば、次回も報告するようにキャッシュしない
+            if len(rects) == len(sources):
+                self.save_cached_atlas(atlas, rects, pixels_path, layout_path)
+        atlas = atlas.convert_alpha()
+        return {name: atlas.subsurface(rect) for name, rect in rects.items()}
+
+    def build_atlas(self, sources):
+        """元画像をデコード・縮小してアトラスに並べる"""
+        images = {}
+        for name, (path, size, _, _) in sources.items():
+            try:
+                image = pygame.image.load(path)
+            except (pygame.error, OSError) as error:
+                self.report(f"画像を読み込めない: {path}: {error}")
+                continue
+            if size is not None and image.get_size() != tuple(size):
+                image = pygame.transform.scale(image, size)
+            images[name] = image
+        (width, height), rects = pack_atlas({name: image.get_size() for name, image in images.items()})
+        atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+        for name, image in images.items():
+            x, y, _, _ = rects[name]
+            # 透明な面に写すだけなので、色とアルファをそのまま写す
+            atlas.blit(image, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        return atlas, rects
+
+    def load_cached_atlas(self, pixels_path, layout_path):
+        """キャッシュからアトラスを読む（無い・壊れているときは (None, None)）"""
+        try:
+            with open(layout_path) as f:
+                layout = json.load(f)
+            with open(pixels_path, 'rb') as f:
+                pixels = f.read()
+            atlas = pygame.image.frombuffer(pixels, tuple(layout['size']), 'RGBA')
+        except (OSError, ValueError, KeyError, pygame.error):
+            return None, None
+        return atlas, {name: tuple(rect) for name, rect in layout['rects'].items()}
+
+    def save_cached_atlas(self, atlas, rects, pixels_path, layout_path):
+        """アトラスをキャッシュに書く（配置を最後に書くので、途中で落ちても壊れたまま使われない）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, data, mode in ((pixels_path, pygame.image.tobytes(atlas, 'RGBA'), 'wb'),
+                                     (layout_path, json.dumps({'size': atlas.get_size(), 'rects': rects}), 'w')):
+                temp_path = path + '.tmp'
+                with open(temp_path, mode) as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+        except OSError as error:
+            self.report(f"画像のキャッシュを書けない: {error}")
@@ -0,0 +1,120 @@
+"""1フレームのゲームの処理と描画で確保するメモリを呼び出し元ごとに表示し、GC の止め方ごとのフレームの時間を比べる
+
+    python -m benchmarks.allocation [--frames 600] [--dirty]
+
+1. 確保: 自動操縦で進めたゲームを画面外の Surface に描き、AllocationTracer の表示を出す
+   （毎フレーム残る量・循環参照のごみが増えていれば、そこがプレイ中の GC の原因になる）。
+2. GC: 自動の GC のままと IdleCollector（プレイ中は止め、ゲームオーバーの画面でだけ回収）とで、
+   フレームの時間の p99・最大と、プレイ中の GC の回数・最大の時間を表示する。
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from allocation import AllocationTracer, IdleCollector
+from engine import EVENT_RESET, GameConfig, GameEngine
+from particles import ParticleSystem, spawn_destruction
+from predict import autopilot_action
+from renderer import Renderer
+from text_cache import get_font
+
+
+def setup(dirty):
+    """(GameEngine, Renderer, ParticleSystem)"""
+    screen = pygame.Surface((800, 600))
+    renderer = Renderer(screen, get_font(None, 36), get_font(None, 24), dirty=dirty)
+    particles = ParticleSystem(seed=0)
+    renderer.particles = particles
+    return GameEngine(0, GameConfig(multi_ball=2)), renderer, particles
+
+
+def play_frame(game, renderer, particles, collector=None):
+    """1フレーム進めて描き、クリア・ゲームオーバーの画面のフレームだったかを返す
+
+    クリアしたら（クリアの画面の代わりに）すぐにステージを作り直す。
+    """
+    game.step(autopilot_action(game))
+    idle = game.level_cleared or game.game_over
+    if collector is not None:
+        collector.update(game)
+    if game.level_cleared:
+        game.reset_game()
+    if collector is not None and any(kind == EVENT_RESET for kind, _ in game.events):
+        collector.level_started()
+    spawn_destruction(particles, game, game.events)
+    particles.update()
+    renderer.render(game, game.events)
+    return idle
+
+
+def trace(frames, dirty):
+    game, renderer, particles = setup(dirty)
+    tracer = AllocationTracer(frames, file=sys.stdout)
+    for _ in range(tracer.warmup + frames):
+        tracer.begin_frame()
+        play_frame(game, renderer, particles)
+        tracer.end_frame()
+
+
+def measure_gc(frames, dirty, idle):
+    """(フレームの時間の p99, 最大, プレイ中の GC の回数, その最大の時間, 暇な画面のフレーム数)（秒）"""
+    game, renderer, particles = setup(dirty)
+    collector = IdleCollector() if idle else None
+    pauses = []
+    gc_start = None
+
+    def on_gc(phase, info):
+        nonlocal gc_start
+        if phase == 'start':
+            gc_start = time.perf_counter()
+        else:
+            pauses.append(time.perf_counter() - gc_start)
+
+    if collector is not None:
+        collector.start()
+    gc.callbacks.append(on_gc)
+    times = []
+    idle_frames = 0
+    try:
+        for _ in range(frames):
+            start = time.perf_counter()
+            paused = len(pauses)
+            if play_frame(game, renderer, particles, collector):
+                # クリア・ゲームオーバーの画面の時間（暇な時間の回収を含む）は数えない
+                del pauses[paused:]
+                idle_frames += 1
+            else:
+                times.append(time.perf_counter() - start)
+    finally:
+        gc.callbacks.remove(on_gc)
+        if collector is not None:
+            collector.stop()
+    return np.percentile(times, 99), max(times), len(pauses), max(pauses, default=0.0), idle_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=600, help='測るフレーム数')
+    parser.add_argument('--dirty', action='store_true', help='差分描画で描く')
+    args = parser.parse_args()
+
+    pygame.init()
+    trace(args.frames, args.dirty)
+
+    print()
+    print(f"{'gc':>6} {'p99 ms':>8} {'max ms':>8} {'GC 回数':>8} {'GC 最大 ms':>11} {'暇な画面':>8}")
+    for idle in (False, True):
+        p99, worst, count, pause, idle_frames = measure_gc(args.frames * 5, args.dirty, idle)
+        print(f"{'idle' if idle else 'auto':>6} {p99 * 1e3:>8.3f} {worst * 1e3:>8.3f} {count:>8}"
+              f" {pause * 1e3:>11.3f} {idle_frames:>8}")
+
+
+if __name__ == '__main__':
+    main()
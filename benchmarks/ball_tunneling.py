@@ -0,0 +1,93 @@
+"""速い玉のすり抜けと、連続的な当たり判定（continuous_collision）のコストを測る
+
+    python -m benchmarks.ball_tunneling [--frames 5000]
+
+玉の速さを変えて、1フレームの移動の途中で生きたブロックに触れているのに
+何にも当たらずにまっすぐ進んだフレーム数（すり抜け）と、1フレームあたりの時間を比べる。
+"""
+import argparse
+import time
+
+from collision import sweep_circle_rect
+from engine import (
+    GameConfig, GameEngine, BALL_RADIUS, PADDLE_WIDTH,
+    ACTION_FIRE, ACTION_LEFT, ACTION_RIGHT, EVENT_BLOCK_DESTROYED,
+)
+
+SPEEDS = [8, 24, 64, 96]
+
+# パドルのどこで玉を受けるか（フレームごとに変えて、真上に跳ね続けないようにする）
+AIM_OFFSETS = [-30, -15, 0, 15, 30]
+
+
+def chase_ball(game):
+    """玉の下にパドルを動かす入力"""
+    if not game.ball_active:
+        return ACTION_FIRE
+    center = game.paddle_x + PADDLE_WIDTH // 2 + AIM_OFFSETS[game.frame // 50 % len(AIM_OFFSETS)]
+    if center < game.ball_x - game.paddle_speed:
+        return ACTION_RIGHT
+    if center > game.ball_x + game.paddle_speed:
+        return ACTION_LEFT
+    return 0
+
+
+def passed_through(game, x, y, dx, dy):
+    """(x, y) から (dx, dy) 動く間に触れた生きたブロックがあるか"""
+    blocks = game.blocks
+    left = min(x, x + dx) - BALL_RADIUS
+    top = min(y, y + dy) - BALL_RADIUS
+    right = max(x, x + dx) + BALL_RADIUS
+    bottom = max(y, y + dy) + BALL_RADIUS
+    for index in blocks.find_in_rect(left, top, right, bottom).tolist():
+        block_x = float(blocks.x[index])
+        block_y = float(blocks.y[index])
+        if sweep_circle_rect(x, y, dx, dy, BALL_RADIUS, block_x, block_y,
+                             block_x + float(blocks.width[index]),
+                             block_y + float(blocks.height[index])) is not None:
+            return True
+    return False
+
+
+def run(speed, continuous, frames):
+    """(すり抜けたフレーム数, 壊したブロック数, 落とした玉の数, 1フレームの秒数)"""
+    game = GameEngine(0, GameConfig(ball_speed=speed, continuous_collision=continuous))
+    tunneled = destroyed = lost = 0
+    elapsed = 0.0
+    for _ in range(frames):
+        x, y, dx, dy = game.ball_x, game.ball_y, game.ball_dx, game.ball_dy
+        moving = game.ball_active
+        lives = game.lives
+        action = chase_ball(game)
+        start = time.perf_counter()
+        game.step(action)
+        elapsed += time.perf_counter() - start
+
+        hits = sum(1 for kind, _ in game.events if kind == EVENT_BLOCK_DESTROYED)
+        destroyed += hits
+        # 何にも当たらず（向きが変わらず）に、ブロックと重なる線分を通った
+        unchanged = game.ball_active and (game.ball_dx, game.ball_dy) == (dx, dy)
+        if moving and unchanged and hits == 0 and passed_through(game, x, y, dx, dy):
+            tunneled += 1
+        if game.lives < lives or game.game_over:
+            lost += 1
+        if game.game_over or game.level_cleared:
+            game.reset(0)
+    return tunneled, destroyed, lost, elapsed / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=5000, help='測定するフレーム数')
+    args = parser.parse_args()
+
+    print(f"{'speed':>5} {'mode':>10} {'tunneled':>9} {'blocks':>7} {'lost':>5} {'ms/frame':>9}")
+    for speed in SPEEDS:
+        for continuous in (False, True):
+            tunneled, destroyed, lost, frame_time = run(speed, continuous, args.frames)
+            mode = 'swept' if continuous else 'discrete'
+            print(f"{speed:>5} {mode:>10} {tunneled:>9} {destroyed:>7} {lost:>5} {frame_time * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
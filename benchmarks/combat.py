@@ -0,0 +1,108 @@
+"""sample.py の弾と敵の処理（Pool と find_hits）が、敵の数を増やしても1フレームの時間を保てるかを測る
+
+    python -m benchmarks.combat [--frames 300] [--waves 10,100,500,1000]
+
+敵の数ごとに、弾を撃ち続けながら sample.py と同じように敵・弾を動かし、当たり判定をして描く。
+比べるために、以前の isCollision（math.sqrt で1組ずつ）で全ての組を調べた時間も表示する。
+"""
+import argparse
+import math
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from pool import Pool, find_hits
+
+SCREEN_SIZE = (800, 600)
+ENEMY_SIZE = BULLET_SIZE = (32, 32)
+FIRE_INTERVAL = 2      # 弾を撃つ間隔（フレーム）。画面の中の弾が 100 発を超える
+HIT_DISTANCE = 27
+
+
+def is_collision(enemy_x, enemy_y, bullet_x, bullet_y):
+    """以前の sample.py の当たり判定（1組ずつ）"""
+    distance = math.sqrt(math.pow(enemy_x - bullet_x, 2) + math.pow(enemy_y - bullet_y, 2))
+    return distance < HIT_DISTANCE
+
+
+def draw_pool(screen, image, pool):
+    """生きている物を Surface.blits 1回で描く"""
+    alive = pool.active
+    screen.blits([(image, (x, y)) for x, y in zip(pool.x[alive].tolist(), pool.y[alive].tolist())],
+                 doreturn=False)
+
+
+def run(wave, frames, screen, images, rng):
+    """(1フレームの秒数, 以前の当たり判定だけの1フレームの秒数, 倒した数, 弾の最大数)"""
+    enemy_image, bullet_image = images
+    enemies = Pool(wave)
+    bullets = Pool(512)
+    enemies.spawn_many(rng.integers(0, 737, wave), rng.integers(50, 151, wave), rng.choice([-1, 1], wave), 0)
+    player_x = 370
+    kills = max_bullets = 0
+    elapsed = scalar_elapsed = 0.0
+    for frame in range(frames):
+        start = time.perf_counter()
+        if frame % FIRE_INTERVAL == 0:
+            bullets.spawn(player_x, 480, 0, -3)
+        enemies.move()
+        at_left = enemies.active & (enemies.x <= 0)
+        at_right = enemies.active & (enemies.x >= 736)
+        enemies.dx[at_left] = 1
+        enemies.dx[at_right] = -1
+        # 下に降りると弾の届く範囲から出ていくので、このベンチマークでは上下に動かさない
+        hit_bullets, hit_enemies = find_hits(bullets, enemies, HIT_DISTANCE)
+        bullets.release(hit_bullets)
+        enemies.release(hit_enemies)
+        kills += len(hit_enemies)
+        bullets.release(np.flatnonzero(bullets.active & (bullets.y <= 0)))
+        bullets.move()
+        screen.fill((0, 0, 0))
+        draw_pool(screen, bullet_image, bullets)
+        draw_pool(screen, enemy_image, enemies)
+        elapsed += time.perf_counter() - start
+        max_bullets = max(max_bullets, len(bullets))
+        # 倒した分は補充して敵の数を保つ
+        count = wave - len(enemies)
+        enemies.spawn_many(rng.integers(0, 737, count), rng.integers(50, 151, count), 1, 0)
+
+        # 以前のやり方で全ての組を調べる時間（10フレームに1回だけ測る）
+        if frame % 10 == 0:
+            bullet_xy = list(zip(bullets.x[bullets.active].tolist(), bullets.y[bullets.active].tolist()))
+            enemy_xy = list(zip(enemies.x[enemies.active].tolist(), enemies.y[enemies.active].tolist()))
+            start = time.perf_counter()
+            for enemy_x, enemy_y in enemy_xy:
+                for bullet_x, bullet_y in bullet_xy:
+                    is_collision(enemy_x, enemy_y, bullet_x, bullet_y)
+            scalar_elapsed += time.perf_counter() - start
+    return elapsed / frames, scalar_elapsed / len(range(0, frames, 10)), kills, max_bullets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300, help='測るフレーム数')
+    parser.add_argument('--waves', default='10,100,500,1000', help='敵の数（カンマ区切り）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    images = []
+    for size, color in ((ENEMY_SIZE, (255, 0, 0)), (BULLET_SIZE, (255, 255, 0))):
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        pygame.draw.circle(image, color, (size[0] // 2, size[1] // 2), size[0] // 2)
+        images.append(image)
+
+    print(f"{'enemies':>8} {'bullets':>8} {'kills':>6} {'frame ms':>9} {'isCollision ms':>15}")
+    for wave in (int(value) for value in args.waves.split(',')):
+        frame_time, scalar_time, kills, max_bullets = run(wave, args.frames, screen, images,
+                                                          np.random.default_rng(args.seed))
+        print(f"{wave:>8} {max_bullets:>8} {kills:>6} {frame_time * 1e3:>9.3f} {scalar_time * 1e3:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""比較用: ブロック・敵を1つずつの dict のリストで持っていたころ（配列にする前）の作り
+
+entity_layout・enemy_scaling で、今の配列（BlockStore・EnemyStore）と比べるために使う。
+ゲーム全体ではなく、配置の違いが効く部分（敵の移動と、玉の当たりの検索）だけを、
+GameEngine と同じ配置・同じ判定で再現する。
+"""
+from engine import (
+    BLOCK_HEIGHT, BLOCK_WIDTH, ENEMY_HEIGHT, ENEMY_WIDTH, LEFT_WALL_X, MIN_DISTANCE_FROM_PADDLE,
+    TOP_WALL_Y, WALL_THICKNESS,
+)
+
+GRID_CELL_SIZE = 64
+
+
+class UniformGrid:
+    """プレイエリアを一定サイズのセルに分割し、各セルに入っている物体の番号を持つ
+
+    範囲外の座標は端のセルにまとめる。
+    """
+
+    def __init__(self, left, top, right, bottom, cell_size):
+        self.left = left
+        self.top = top
+        self.cell_size = cell_size
+        self.cols = max(1, int((right - left) // cell_size) + 1)
+        self.rows = max(1, int((bottom - top) // cell_size) + 1)
+        self.cells = [set() for _ in range(self.cols * self.rows)]
+        self.ranges = {}  # 番号 -> 登録しているセル範囲 (c0, r0, c1, r1)
+
+    def cell_range(self, x, y, width, height):
+        """矩形（右端・下端を含む）が重なるセルの範囲を返す"""
+        size = self.cell_size
+        c0 = int((x - self.left) // size)
+        c1 = int((x + width - self.left) // size)
+        r0 = int((y - self.top) // size)
+        r1 = int((y + height - self.top) // size)
+        last_col = self.cols - 1
+        last_row = self.rows - 1
+        c0 = 0 if c0 < 0 else (last_col if c0 > last_col else c0)
+        c1 = 0 if c1 < 0 else (last_col if c1 > last_col else c1)
+        r0 = 0 if r0 < 0 else (last_row if r0 > last_row else r0)
+        r1 = 0 if r1 < 0 else (last_row if r1 > last_row else r1)
+        return (c0, r0, c1, r1)
+
+    def insert(self, item, x, y, width, height):
+        cell_range = self.cell_range(x, y, width, height)
+        self.ranges[item] = cell_range
+        c0, r0, c1, r1 = cell_range
+        cells = self.cells
+        cols = self.cols
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                cells[r * cols + c].add(item)
+
+    def remove(self, item):
+        cell_range = self.ranges.pop(item, None)
+        if cell_range is None:
+            return
+        c0, r0, c1, r1 = cell_range
+        cells = self.cells
+        cols = self.cols
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                cells[r * cols + c].discard(item)
+
+    def move(self, item, x, y, width, height):
+        """移動した物体の登録セルを更新（セルが変わらなければ何もしない）"""
+        if self.ranges.get(item) == self.cell_range(x, y, width, height):
+            return
+        self.remove(item)
+        self.insert(item, x, y, width, height)
+
+    def query(self, x, y, width, height):
+        """矩形と同じセルに入っている物体の番号の集合"""
+        c0, r0, c1, r1 = self.cell_range(x, y, width, height)
+        found = set()
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                found.update(self.cells[r * self.cols + c])
+        return found
+
+    def query_cells(self, x, y, width, height):
+        """矩形と重なる空でないセル（番号の集合）のリスト"""
+        c0, r0, c1, r1 = self.cell_range(x, y, width, height)
+        cells = self.cells
+        cols = self.cols
+        return [cell for r in range(r0, r1 + 1)
+                for cell in cells[r * cols + c0:r * cols + c1 + 1] if cell]
+
+
+class DictLayout:
+    """game のブロック・敵を dict のリストに写したもの
+
+    grid=False なら、敵の配置の判定でグリッドを使わずに全てのブロック・敵を調べる（グリッドを使う前の作り）。
+    """
+
+    def __init__(self, game, grid=True):
+        self.grid = grid
+        self.right_wall_x = game.right_wall_x
+        self.paddle_y = game.paddle_y
+        self.block_grid = UniformGrid(LEFT_WALL_X, TOP_WALL_Y, game.right_wall_x, game.bottom_y, GRID_CELL_SIZE)
+        self.enemy_grid = UniformGrid(LEFT_WALL_X, TOP_WALL_Y, game.right_wall_x, game.bottom_y, GRID_CELL_SIZE)
+        blocks = game.blocks
+        self.blocks = []
+        for index, (x, y, active) in enumerate(zip(blocks.x.tolist(), blocks.y.tolist(), blocks.active.tolist())):
+            if active:
+                self.block_grid.insert(index, x, y, BLOCK_WIDTH, BLOCK_HEIGHT)
+            self.blocks.append({'x': x, 'y': y, 'width': BLOCK_WIDTH, 'height': BLOCK_HEIGHT, 'active': active})
+        enemies = game.enemies
+        self.enemies = []
+        for index, values in enumerate(zip(enemies.x.tolist(), enemies.y.tolist(), enemies.active.tolist(),
+                                           enemies.trapped.tolist(), enemies.direction.tolist(),
+                                           enemies.speed.tolist(), enemies.move_down_timer.tolist())):
+            x, y, active, trapped, direction, speed, timer = values
+            if active:
+                self.enemy_grid.insert(index, x, y, ENEMY_WIDTH, ENEMY_HEIGHT)
+            self.enemies.append({'x': x, 'y': y, 'width': ENEMY_WIDTH, 'height': ENEMY_HEIGHT,
+                                 'active': active, 'trapped': trapped, 'direction': direction,
+                                 'speed': speed, 'move_down_timer': timer})
+
+    def check_enemy_block_collision(self, enemy_x, enemy_y):
+        if not self.grid:
+            for block in self.blocks:
+                if (block['active'] and
+                        enemy_x + ENEMY_WIDTH > block['x'] and enemy_x < block['x'] + block['width'] and
+                        enemy_y + ENEMY_HEIGHT > block['y'] and enemy_y < block['y'] + block['height']):
+                    return True
+            return False
+        blocks = self.blocks
+        for cell in self.block_grid.query_cells(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT):
+            for index in cell:
+                block = blocks[index]
+                if (enemy_x + ENEMY_WIDTH > block['x'] and enemy_x < block['x'] + block['width'] and
+                        enemy_y + ENEMY_HEIGHT > block['y'] and enemy_y < block['y'] + block['height']):
+                    return True
+        return False
+
+    def check_enemy_enemy_collision(self, enemy_x, enemy_y, exclude_enemy):
+        if not self.grid:
+            for enemy in self.enemies:
+                if (enemy['active'] and enemy is not exclude_enemy and
+                        enemy_x + ENEMY_WIDTH > enemy['x'] and enemy_x < enemy['x'] + enemy['width'] and
+                        enemy_y + ENEMY_HEIGHT > enemy['y'] and enemy_y < enemy['y'] + enemy['height']):
+                    return True
+            return False
+        enemies = self.enemies
+        for cell in self.enemy_grid.query_cells(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT):
+            for index in cell:
+                enemy = enemies[index]
+                if enemy is exclude_enemy:
+                    continue
+                if (enemy_x + ENEMY_WIDTH > enemy['x'] and enemy_x < enemy['x'] + enemy['width'] and
+                        enemy_y + ENEMY_HEIGHT > enemy['y'] and enemy_y < enemy['y'] + enemy['height']):
+                    return True
+        return False
+
+    def check_enemy_position_valid(self, enemy_x, enemy_y, exclude_enemy):
+        if enemy_x < LEFT_WALL_X + WALL_THICKNESS or enemy_x + ENEMY_WIDTH > self.right_wall_x:
+            return False
+        if enemy_y < TOP_WALL_Y + WALL_THICKNESS:
+            return False
+        if enemy_y + ENEMY_HEIGHT > self.paddle_y - MIN_DISTANCE_FROM_PADDLE:
+            return False
+        if self.check_enemy_block_collision(enemy_x, enemy_y):
+            return False
+        return not self.check_enemy_enemy_collision(enemy_x, enemy_y, exclude_enemy)
+
+    def update_enemies(self):
+        """GameEngine.update_enemies と同じ動き（1体ずつ番号順に動かす）"""
+        for index, enemy in enumerate(self.enemies):
+            if not enemy['active'] or enemy['trapped']:
+                continue
+            enemy['move_down_timer'] += 1
+            move_down = False
+            if enemy['move_down_timer'] >= 60:
+                move_down = True
+                enemy['move_down_timer'] = 0
+
+            new_x = enemy['x'] + enemy['direction'] * enemy['speed']
+            if self.check_enemy_position_valid(new_x, enemy['y'], enemy):
+                enemy['x'] = new_x
+            else:
+                if new_x <= LEFT_WALL_X + WALL_THICKNESS:
+                    enemy['x'] = LEFT_WALL_X + WALL_THICKNESS
+                    enemy['direction'] = 1
+                elif new_x + enemy['width'] >= self.right_wall_x:
+                    enemy['x'] = self.right_wall_x - enemy['width']
+                    enemy['direction'] = -1
+                move_down = True
+
+            if move_down:
+                new_y = enemy['y'] + 10
+                if self.check_enemy_position_valid(enemy['x'], new_y, enemy):
+                    enemy['y'] = new_y
+
+            self.enemy_grid.move(index, enemy['x'], enemy['y'], enemy['width'], enemy['height'])
+
+    def find_ball_hit(self, grid, targets, left, top, right, bottom):
+        """範囲（端を含む）と重なる物体のうち番号が最小のもの（無ければ None）"""
+        candidates = grid.query(left, top, right - left, bottom - top)
+        for index in sorted(candidates):
+            target = targets[index]
+            if (right >= target['x'] and left <= target['x'] + target['width'] and
+                    bottom >= target['y'] and top <= target['y'] + target['height']):
+                return index
+        return None
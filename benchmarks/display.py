@@ -0,0 +1,112 @@
+"""ウィンドウの大きさ・画質の段階ごとの描画と表示の時間と、AdaptiveQuality が段階を上げ下げする様子を測る
+
+    python -m benchmarks.display [--frames 200] [--windows 800x600,1920x1080,3840x2160]
+    python -m benchmarks.display --adaptive [--load 12] [--window 1920x1080]
+
+1. 段階ごとの時間: 自動操縦で進めたゲームを Renderer で display.target に描き、Display.present() で
+   ウィンドウに出すまでの1フレームあたりの時間を、ウィンドウの大きさ・QUALITY_LEVELS の段階ごとに表示する。
+2. --adaptive: 毎フレーム --load ミリ秒の他の処理がある中で AdaptiveQuality を動かし、
+   途中で他の処理を無くしたときに段階が戻るかを表示する。
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from display import QUALITY_LEVELS, AdaptiveQuality, Display
+from engine import GameConfig, GameEngine
+from particles import ParticleSystem, spawn_destruction
+from predict import autopilot_action
+from renderer import Renderer
+from text_cache import get_font
+
+
+def busy_wait(seconds):
+    """他の処理の代わりに seconds 秒だけ CPU を使う"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def setup(window_size, render_scale=1.0):
+    """(Display, Renderer, ParticleSystem, GameEngine)"""
+    display = Display(window_size=window_size, render_scale=render_scale)
+    renderer = Renderer(display.target, get_font(None, 36), get_font(None, 24), scale=display.render_scale)
+    particles = ParticleSystem(seed=0)
+    renderer.particles = particles
+    # 玉を増やして、ブロック・敵が壊れ続ける（パーティクルが出続ける）ようにする
+    game = GameEngine(0, GameConfig(multi_ball=4))
+    return display, renderer, particles, game
+
+
+def play_frame(display, renderer, particles, game):
+    """1フレーム進めて描き、描画と表示にかかった秒数を返す"""
+    game.step(autopilot_action(game))
+    if game.level_cleared:
+        game.reset_game()
+    if renderer.particles is not None:
+        spawn_destruction(particles, game, game.events)
+        particles.update()
+    start = time.perf_counter()
+    display.present(renderer.render(game, game.events))
+    return time.perf_counter() - start
+
+
+def measure_levels(window_size, frames):
+    """段階ごとの1フレームあたりの描画と表示の秒数のリスト"""
+    display, renderer, particles, game = setup(window_size)
+    quality = AdaptiveQuality(display, renderer, particles)
+    results = []
+    for level in range(len(QUALITY_LEVELS)):
+        quality.set_level(level)
+        elapsed = sum(play_frame(display, renderer, particles, game) for _ in range(frames))
+        results.append(elapsed / frames)
+    return results
+
+
+def run_adaptive(window_size, frames, load):
+    """前半は他の処理あり、後半は無しで AdaptiveQuality を動かし、段階が変わったフレームを表示する"""
+    display, renderer, particles, game = setup(window_size)
+    quality = AdaptiveQuality(display, renderer, particles)
+    level = quality.level
+    for frame in range(frames):
+        start = time.perf_counter()
+        play_frame(display, renderer, particles, game)
+        if frame < frames // 2:
+            busy_wait(load)
+        quality.record((time.perf_counter() - start) * 1e3)
+        if quality.level != level:
+            level = quality.level
+            print(f"frame {frame}: 段階 {level}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200, help='段階ごとに測るフレーム数')
+    parser.add_argument('--windows', default='800x600,1920x1080,3840x2160', help='ウィンドウの大きさ（カンマ区切り）')
+    parser.add_argument('--adaptive', action='store_true', help='AdaptiveQuality の上げ下げを試す')
+    parser.add_argument('--window', default='1920x1080', help='--adaptive のウィンドウの大きさ')
+    parser.add_argument('--load', type=float, default=12, help='--adaptive の他の処理の時間（ミリ秒）')
+    args = parser.parse_args()
+
+    pygame.init()
+    if args.adaptive:
+        run_adaptive(parse_size(args.window), 1200, args.load / 1e3)
+        return
+
+    print('ms/frame  ' + ' '.join(f"{f'level {level}':>9}" for level in range(len(QUALITY_LEVELS))))
+    for window in args.windows.split(','):
+        results = measure_levels(parse_size(window), args.frames)
+        print(f"{window:>9} " + ' '.join(f"{seconds * 1e3:>9.3f}" for seconds in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""玉と敵の当たりを、全ての敵と比べる方法とセルの索引で絞る方法とで比べる
+
+    python -m benchmarks.enemy_hits [--ticks 200] [--balls 1,16,256]
+
+全ブロックを壊して全ての敵を動ける状態にし、敵を動かしながら（毎 tick 索引を作り直す）、
+玉 --balls 個の当たりを探す1 tick あたりの時間を、敵の数ごとに表示する。
+玉が1個なら find_ball_hit（いつも全ての敵と比べる）、それより多ければ find_ball_hits で探す。
+セルの索引を使うのは find_ball_hits で (玉の数 × 敵の数) が HIT_CELL_PAIRS を超えるときだけで、
+その境目はこの結果で決めている（1個の玉では索引を作る時間の方が長い）。
+"""
+import argparse
+import time
+
+import numpy as np
+
+import entities
+from benchmarks.enemy_scaling import SIZES, enemy_config, free_all_enemies
+from engine import BALL_RADIUS, GameEngine, TOP_WALL_Y, WALL_THICKNESS
+
+
+def time_hits(config, ticks, balls, use_cells):
+    """1 tick あたりの (当たりを探す秒数, 敵の数)"""
+    limit = entities.HIT_CELL_PAIRS
+    entities.HIT_CELL_PAIRS = -1 if use_cells else np.inf
+    try:
+        game = GameEngine(0, config)
+        free_all_enemies(game)
+        enemies = game.enemies
+        rng = np.random.default_rng(0)
+        # 敵のいる範囲に玉を置く
+        x = rng.uniform(WALL_THICKNESS, game.right_wall_x, (ticks, balls))
+        y = rng.uniform(TOP_WALL_Y, float(enemies.y.max()) + BALL_RADIUS, (ticks, balls))
+        elapsed = 0.0
+        for tick in range(ticks):
+            game.update_enemies()
+            left = x[tick] - BALL_RADIUS
+            top = y[tick] - BALL_RADIUS
+            right = x[tick] + BALL_RADIUS
+            bottom = y[tick] + BALL_RADIUS
+            start = time.perf_counter()
+            if balls == 1 and not use_cells:
+                enemies.find_ball_hit(float(left[0]), float(top[0]), float(right[0]), float(bottom[0]))
+            else:
+                enemies.find_ball_hits(left, top, right, bottom)
+            elapsed += time.perf_counter() - start
+        return elapsed / ticks, len(enemies)
+    finally:
+        entities.HIT_CELL_PAIRS = limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=200, help='測る tick 数')
+    parser.add_argument('--balls', default='1,16,256', help='玉の数（カンマ区切り）')
+    args = parser.parse_args()
+
+    print(f"{'enemies':>8} {'balls':>6} {'mask us':>9} {'cells us':>9} {'speedup':>8}")
+    for balls in (int(value) for value in args.balls.split(',')):
+        for enemy_rows, enemy_cols in SIZES:
+            config = enemy_config(enemy_rows, enemy_cols)
+            mask_time, count = time_hits(config, args.ticks, balls, False)
+            cell_time, _ = time_hits(config, args.ticks, balls, True)
+            print(f"{count:>8} {balls:>6} {mask_time * 1e6:>9.1f} {cell_time * 1e6:>9.1f}"
+                  f" {mask_time / cell_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""敵の移動処理（update_enemies）の敵数に対するスケーリングを測る
+
+    python -m benchmarks.enemy_scaling [--frames 120]
+
+全ブロックを壊して全ての敵を動ける状態にし、1フレームあたりの時間を、今の配列による処理と、
+以前の dict のリストによる処理（グリッドで絞る判定・全件走査による判定。benchmarks.dict_layout）とで比べる。
+"""
+import argparse
+import time
+
+from benchmarks.dict_layout import DictLayout
+from engine import (
+    GameConfig, GameEngine, ENEMY_WIDTH, ROW_HEIGHT, BLOCK_START_Y, WALL_THICKNESS,
+)
+
+# (敵の行数, 1行あたりの敵の数)
+SIZES = [(2, 8), (4, 16), (5, 50), (10, 50), (20, 50), (40, 50)]
+
+
+def enemy_config(enemy_rows, enemy_cols):
+    """敵が重ならず、下に動く余裕もあるステージの大きさを決める"""
+    width = (ENEMY_WIDTH + 20) * (enemy_cols + 1) + 4 * WALL_THICKNESS
+    rows = enemy_rows * 2 + 1
+    height = BLOCK_START_Y + rows * ROW_HEIGHT + 150 + 300
+    return GameConfig(screen_width=width, screen_height=height,
+                      block_rows=enemy_rows + 1, enemy_rows=enemy_rows, enemy_cols=enemy_cols)
+
+
+def free_all_enemies(game):
+    """ブロックを全て壊して敵を動ける状態にする"""
+    for index in range(len(game.blocks)):
+        game.destroy_block(index)
+    game.check_enemy_trapped()
+
+
+def time_update_enemies(config, frames, layout=None):
+    """update_enemies 1回あたりの平均時間（秒）と敵の数
+
+    layout が 'grid'・'linear' なら、dict のリストに写した DictLayout で測る。
+    """
+    game = GameEngine(0, config)
+    free_all_enemies(game)
+    update = game.update_enemies
+    if layout is not None:
+        update = DictLayout(game, grid=layout == 'grid').update_enemies
+    start = time.perf_counter()
+    for _ in range(frames):
+        update()
+    return (time.perf_counter() - start) / frames, len(game.enemies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=120, help='測定するフレーム数')
+    parser.add_argument('--skip-linear', action='store_true', help='全件走査版の測定を省く')
+    args = parser.parse_args()
+
+    print(f"{'enemies':>8} {'array ms':>10} {'grid ms':>10} {'linear ms':>10} {'speedup':>8}")
+    for enemy_rows, enemy_cols in SIZES:
+        config = enemy_config(enemy_rows, enemy_cols)
+        array_time, count = time_update_enemies(config, args.frames)
+        grid_time, _ = time_update_enemies(config, args.frames, 'grid')
+        if args.skip_linear:
+            linear = f"{'-':>10}"
+        else:
+            # 全件走査は敵の数の2乗で遅くなるので、フレーム数を減らす
+            linear_time, _ = time_update_enemies(config, max(1, args.frames * 16 // count), 'linear')
+            linear = f"{linear_time * 1000:>10.3f}"
+        print(f"{count:>8} {array_time * 1000:>10.3f} {grid_time * 1000:>10.3f} {linear}"
+              f" {grid_time / array_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""ブロック・敵を配列で持つ今の作りと、dict のリストで持っていた作りとで、メモリと時間を比べる
+
+    python -m benchmarks.entity_layout [--frames 60]
+
+同じ配置のステージで、次の3つを dict（benchmarks.dict_layout）と配列（BlockStore・EnemyStore）とで表示する。
+  memory: ブロック・敵を作るときに確保されたメモリ（tracemalloc。dict は当たり判定用のグリッドを含む）
+  update: 全ての敵を動ける状態にしたときの update_enemies 1回の時間
+  hit:    玉の位置1つに対してブロック・敵の当たりを探す時間（step の中で配置の違いが効く部分）
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.dict_layout import DictLayout
+from benchmarks.enemy_scaling import enemy_config, free_all_enemies
+from engine import BALL_RADIUS, TOP_WALL_Y, WALL_THICKNESS, GameEngine
+from entities import BlockStore, EnemyStore
+
+# (敵の行数, 1行あたりの敵の数)
+SIZES = [(2, 8), (10, 50), (40, 50)]
+
+
+def traced(build):
+    """build() が確保したメモリ（バイト）"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def copy_stores(game):
+    """game と同じ配置の BlockStore・EnemyStore を作り直す"""
+    blocks = game.blocks
+    enemies = game.enemies
+    return (BlockStore(blocks.col_left, blocks.row_top, float(blocks.width[0]), float(blocks.height[0])),
+            EnemyStore(enemies.x, enemies.y, float(enemies.width[0]), float(enemies.height[0]),
+                       enemies.direction))
+
+
+def time_update(update, frames):
+    """update() 1回あたりの平均時間（秒）"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        update()
+    return (time.perf_counter() - start) / frames
+
+
+def ball_boxes(game, count):
+    """ブロック・敵のある範囲に置いた玉の (左, 上, 右, 下) のリスト"""
+    rng = np.random.default_rng(0)
+    x = rng.uniform(WALL_THICKNESS, game.right_wall_x, count)
+    y = rng.uniform(TOP_WALL_Y, float(game.enemies.y.max()) + BALL_RADIUS, count)
+    return list(zip((x - BALL_RADIUS).tolist(), (y - BALL_RADIUS).tolist(),
+                    (x + BALL_RADIUS).tolist(), (y + BALL_RADIUS).tolist()))
+
+
+def time_hits(find_block, find_enemy, boxes):
+    """玉の位置1つあたりの、ブロック・敵の当たりを探す平均時間（秒）"""
+    start = time.perf_counter()
+    for box in boxes:
+        find_block(*box)
+        find_enemy(*box)
+    return (time.perf_counter() - start) / len(boxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=60, help='測定するフレーム数')
+    args = parser.parse_args()
+
+    print(f"{'':>16} {'memory KB':>17} {'update ms':>17} {'hit us':>15}")
+    print(f"{'enemies':>8} {'blocks':>7} {'dict':>8} {'array':>8} {'dict':>8} {'array':>8} {'dict':>7} {'array':>7}")
+    for enemy_rows, enemy_cols in SIZES:
+        config = enemy_config(enemy_rows, enemy_cols)
+        game = GameEngine(0, config)
+        dict_memory = traced(lambda: DictLayout(game))
+        array_memory = traced(lambda: copy_stores(game))
+
+        boxes = ball_boxes(game, 1000)
+        layout = DictLayout(game)
+        dict_hit = time_hits(lambda *box: layout.find_ball_hit(layout.block_grid, layout.blocks, *box),
+                             lambda *box: layout.find_ball_hit(layout.enemy_grid, layout.enemies, *box), boxes)
+        array_hit = time_hits(game.blocks.find_ball_hit, game.enemies.find_ball_hit, boxes)
+
+        free_all_enemies(game)
+        layout = DictLayout(game)
+        dict_update = time_update(layout.update_enemies, args.frames)
+        array_update = time_update(game.update_enemies, args.frames)
+
+        print(f"{len(game.enemies):>8} {len(game.blocks):>7} {dict_memory / 1024:>8.1f} {array_memory / 1024:>8.1f}"
+              f" {dict_update * 1e3:>8.3f} {array_update * 1e3:>8.3f} {dict_hit * 1e6:>7.1f} {array_hit * 1e6:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
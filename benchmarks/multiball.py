@@ -0,0 +1,157 @@
+"""マルチボールの玉をまとめて処理する時間と、1つずつ処理したときと結果が同じかを調べる
+
+    python -m benchmarks.multiball [--balls 200] [--frames 300]
+    python -m benchmarks.multiball --check [--frames 3000]
+
+玉の数を保ったまま（落ちた玉は補充する）自動操縦でゲームを進め、GameEngine.step() と
+Renderer.render() の1フレームあたりの時間を、既定のステージと大きなステージで表示する
+（大きなステージは全体を描き直すと玉が無くても間に合わないので、--dirty で差分描画にして測る）。
+--check では、増えた玉を番号順に1つずつ GameEngine の玉の判定で動かすエンジンと
+同じ入力で進め、玉・スコア・ブロック・敵が毎フレーム一致するかを確かめる。
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from benchmarks.suite import world_config
+from engine import GameConfig, GameEngine, BALL_RADIUS, EVENT_RESET, TOP_WALL_Y, WALL_THICKNESS
+from predict import autopilot_action
+from renderer import Renderer
+from text_cache import get_font
+
+FRAME_BUDGET = 1 / 60
+
+
+class SequentialGameEngine(GameEngine):
+    """増えた玉を1つずつ、主の玉と同じメソッドで動かす（比べる用）"""
+
+    def move_extra_balls(self):
+        balls = self.balls
+        main_ball = (self.ball_x, self.ball_y, self.ball_dx, self.ball_dy)
+        for i in range(balls.count):
+            self.ball_x, self.ball_y = float(balls.x[i]), float(balls.y[i])
+            self.ball_dx, self.ball_dy = float(balls.dx[i]), float(balls.dy[i])
+            self.ball_x += self.ball_dx
+            self.ball_y += self.ball_dy
+            self.check_ball_wall_collision()
+            self.check_ball_paddle_collision()
+            self.check_ball_block_collision()
+            self.check_ball_enemy_collision()
+            balls.x[i], balls.y[i], balls.dx[i], balls.dy[i] = self.ball_x, self.ball_y, self.ball_dx, self.ball_dy
+        self.ball_x, self.ball_y, self.ball_dx, self.ball_dy = main_ball
+
+
+def fill_balls(game, count, rng):
+    """増えた玉が count 個になるまで、ブロックの下の範囲に上向きの玉を加える"""
+    missing = count - game.balls.count
+    if missing <= 0:
+        return
+    angle = rng.uniform(math.radians(-60), math.radians(60), missing)
+    x = rng.uniform(WALL_THICKNESS + BALL_RADIUS, game.right_wall_x - BALL_RADIUS, missing)
+    y = rng.uniform((TOP_WALL_Y + game.paddle_y) / 2, game.paddle_y - BALL_RADIUS, missing)
+    game.balls.add(x, y, game.ball_speed * np.sin(angle), -game.ball_speed * np.cos(angle))
+
+
+def state_of(game):
+    """比べる状態"""
+    count = game.balls.count
+    return (game.ball_x, game.ball_y, game.ball_dx, game.ball_dy, game.lives, game.score,
+            game.balls.x[:count].tolist(), game.balls.y[:count].tolist(),
+            game.balls.dx[:count].tolist(), game.balls.dy[:count].tolist(),
+            game.blocks.active.tobytes(), game.enemies.active.tobytes(), game.enemies.trapped.tobytes(),
+            sorted(game.events, key=repr))
+
+
+def check(frames, seeds, multi_ball):
+    """まとめて処理した結果と1つずつ処理した結果を比べる（違ったフレームの数を返す）"""
+    mismatches = 0
+    for seed in range(seeds):
+        config = world_config(8, 20, 12)
+        config.multi_ball = multi_ball
+        games = [GameEngine(seed, config), SequentialGameEngine(seed, config)]
+        rng = np.random.default_rng(seed)
+        most = 0
+        for frame in range(frames):
+            action = autopilot_action(games[0])
+            # 同じ玉が同じブロックを同時に狙うように、ときどき玉をまとめて加える
+            if frame % 200 == 100 and games[0].ball_active:
+                ball_seed = int(rng.integers(1 << 31))
+                for game in games:
+                    fill_balls(game, 100, np.random.default_rng(ball_seed))
+            for game in games:
+                game.step(action)
+            most = max(most, games[0].balls.count)
+            if state_of(games[0]) != state_of(games[1]):
+                print(f"seed {seed} frame {frame}: 1つずつ処理した結果と違う", file=sys.stderr)
+                mismatches += 1
+                break
+        print(f"seed {seed}: {frame + 1} フレーム, 最大 {most} 個, スコア {games[0].score}")
+    return mismatches
+
+
+def measure(config, balls, frames, seed, dirty):
+    """(step の秒数, render の秒数, 平均の残りブロック数)（1フレームあたり）
+
+    ブロックがすぐに無くなるので、毎フレーム（測る時間の外で）全てのブロックを戻して、
+    ブロックが揃ったステージで測る。
+    """
+    game = GameEngine(seed, config)
+    game.step(autopilot_action(game))
+    screen = pygame.Surface((config.screen_width, config.screen_height))
+    renderer = Renderer(screen, get_font(None, 36), get_font(None, 24), dirty=dirty)
+    all_blocks = np.ones(len(game.blocks), dtype=bool)
+    rng = np.random.default_rng(seed)
+    step_time = render_time = 0.0
+    live_blocks = 0
+    for _ in range(frames):
+        fill_balls(game, balls, rng)
+        if game.blocks.live < len(game.blocks):
+            game.blocks.set_active(all_blocks)
+            game.setup_trap_counters()
+            game.events.append((EVENT_RESET, None))
+            renderer.render(game, game.events)
+        live_blocks += game.blocks.live
+        action = autopilot_action(game)
+        start = time.perf_counter()
+        game.step(action)
+        middle = time.perf_counter()
+        renderer.render(game, game.events)
+        render_time += time.perf_counter() - middle
+        step_time += middle - start
+    return step_time / frames, render_time / frames, live_blocks / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--balls', type=int, default=200, help='増えた玉の数')
+    parser.add_argument('--frames', type=int, default=300, help='測る・比べるフレーム数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--check', action='store_true', help='1つずつ処理した結果と比べる')
+    parser.add_argument('--seeds', type=int, default=5, help='--check で試すシードの数')
+    parser.add_argument('--dirty', action='store_true', help='差分描画で描く')
+    args = parser.parse_args()
+
+    pygame.init()
+    if args.check:
+        sys.exit(1 if check(args.frames, args.seeds, multi_ball=3) else 0)
+
+    # 玉が無いときと比べて、玉の分の時間がわかるようにする
+    print(f"{'stage':>12} {'blocks':>7} {'balls':>6} {'step ms':>8} {'render ms':>10} {'frame ms':>9}")
+    for name, config in (('default', GameConfig()), ('20x40', world_config(20, 40, 30))):
+        for balls in (0, args.balls):
+            step_time, render_time, live_blocks = measure(config, balls, args.frames, args.seed, args.dirty)
+            frame_time = step_time + render_time
+            mark = '' if frame_time <= FRAME_BUDGET else '  (16.7 ms を超えた)'
+            print(f"{name:>12} {live_blocks:>7.0f} {balls:>6} {step_time * 1e3:>8.3f}"
+                  f" {render_time * 1e3:>10.3f} {frame_time * 1e3:>9.3f}{mark}")
+
+
+if __name__ == '__main__':
+    main()
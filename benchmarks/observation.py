@@ -0,0 +1,74 @@
+"""画素の観測を作る時間を、作り方ごとに比べる
+
+    python -m benchmarks.observation [--frames 300] [--size 84x84]
+
+- tostring: Renderer で 800×600 に描き、pygame.image.tostring でバイト列にして配列にコピーする（これまで）
+- capture:  Renderer で描き、ScreenCapture で縮小・グレースケールにする
+- direct:   ObservationRenderer で、Renderer に観測の倍率を渡して観測の解像度に直接描く
+どれも自動操縦で進めたゲームを描き、FrameStack に積むまでの1フレームあたりの時間を表示する。
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from engine import GameEngine, SCREEN_WIDTH, SCREEN_HEIGHT
+from observation import FrameStack, ObservationRenderer, ScreenCapture
+from predict import autopilot_action
+from renderer import Renderer
+from text_cache import get_font
+
+
+def run(observe, shape, dtype, frames):
+    """observe(game) で観測を作って積む、1フレームあたりの秒数"""
+    game = GameEngine(0)
+    stack = FrameStack(shape, dtype=dtype)
+    stack.reset(observe(game))
+    elapsed = 0.0
+    for _ in range(frames):
+        game.step(autopilot_action(game))
+        start = time.perf_counter()
+        stack.push(observe(game))
+        elapsed += time.perf_counter() - start
+    return elapsed / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300, help='測るフレーム数')
+    parser.add_argument('--size', default='84x84', help='観測の大きさ（幅x高さ）')
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.split('x'))
+
+    pygame.init()
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    renderer = Renderer(screen, get_font(None, 36), get_font(None, 24))
+
+    def tostring(game):
+        renderer.render(game)
+        data = pygame.image.tostring(screen, 'RGB')
+        return np.frombuffer(data, dtype=np.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH, 3).copy()
+
+    results = [('tostring 800x600 rgb', run(tostring, (SCREEN_HEIGHT, SCREEN_WIDTH, 3), np.uint8, args.frames))]
+    for grayscale in (False, True):
+        mode = 'gray' if grayscale else 'rgb'
+        capture = ScreenCapture(screen, size, grayscale)
+
+        def captured(game):
+            renderer.render(game)
+            return capture.capture()
+
+        observer = ObservationRenderer(size, grayscale)
+        results.append((f"capture {args.size} {mode}", run(captured, observer.shape, np.uint8, args.frames)))
+        results.append((f"direct {args.size} {mode}", run(observer.render, observer.shape, np.uint8, args.frames)))
+
+    for name, seconds in results:
+        print(f"{name:>24}: {seconds * 1e6:8.1f} us/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""パーティクルの更新・描画の時間と、重いフレームで予算が数を減らす様子を測る
+
+    python -m benchmarks.particles [--frames 300] [--counts 100,1000,4000] [--load 14]
+
+1. 数ごとの時間: パーティクルを一定の数に保ったまま update() と draw() の1フレームあたりの時間を測る。
+2. 予算: 毎フレーム --load ミリ秒の他の処理（描画などの代わりに待つ）がある中で、
+   敵を倒し続けて爆発を出し続け、adapt() あり・なしのフレームの時間の最大と、パーティクルの数を表示する。
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from engine import SCREEN_WIDTH, SCREEN_HEIGHT
+from particles import (
+    DEBRIS_KINDS, DEBRIS_LIFE, DEBRIS_SPEED, EXPLOSION_COUNT, EXPLOSION_KINDS, EXPLOSION_LIFE,
+    EXPLOSION_SPEED, FRAME_BUDGET, ParticleSystem,
+)
+
+
+def busy_wait(seconds):
+    """他の処理の代わりに seconds 秒だけ CPU を使う"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def measure_count(screen, count, frames):
+    """count 個を保ったときの (update の秒数, draw の秒数)（1フレームあたり）"""
+    particles = ParticleSystem(max(count, 1), seed=0)
+    particles.budget = particles.capacity
+    update_time = draw_time = 0.0
+    for _ in range(frames):
+        particles.emit(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, count - len(particles), DEBRIS_KINDS,
+                       DEBRIS_SPEED, DEBRIS_LIFE)
+        screen.fill((0, 0, 0))
+        start = time.perf_counter()
+        particles.update()
+        middle = time.perf_counter()
+        particles.draw(screen)
+        draw_time += time.perf_counter() - middle
+        update_time += middle - start
+    return update_time / frames, draw_time / frames
+
+
+def measure_budget(screen, frames, load, adaptive):
+    """(フレームの時間の最大, 16.7ms を超えたフレーム数, 最後の数, 捨てた数)"""
+    particles = ParticleSystem(seed=0)
+    if not adaptive:
+        particles.budget = particles.capacity
+    worst = 0.0
+    over = 0
+    for frame in range(frames):
+        start = time.perf_counter()
+        screen.fill((0, 0, 0))
+        # 1フレームに敵を 20 体倒し続ける
+        for i in range(20):
+            particles.emit(40 + i * 35, 150, EXPLOSION_COUNT * 4, EXPLOSION_KINDS, EXPLOSION_SPEED,
+                           EXPLOSION_LIFE)
+        particles.update()
+        particles.draw(screen)
+        busy_wait(load)
+        elapsed = time.perf_counter() - start
+        if adaptive:
+            particles.adapt(elapsed)
+        # 最初の数フレームは予算が決まるまでなので数えない
+        if frame >= 10:
+            worst = max(worst, elapsed)
+            over += elapsed > FRAME_BUDGET
+    return worst, over, len(particles), particles.shed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300, help='測るフレーム数')
+    parser.add_argument('--counts', default='100,1000,4000', help='パーティクルの数（カンマ区切り）')
+    parser.add_argument('--load', type=float, default=14, help='予算の試験での他の処理の時間（ミリ秒）')
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    print(f"{'count':>6} {'update ms':>10} {'draw ms':>8}")
+    for count in (int(value) for value in args.counts.split(',')):
+        update_time, draw_time = measure_count(screen, count, args.frames)
+        print(f"{count:>6} {update_time * 1e3:>10.3f} {draw_time * 1e3:>8.3f}")
+
+    print()
+    print(f"他の処理 {args.load} ms/フレーム、1フレームに爆発 20 回")
+    print(f"{'adapt':>6} {'worst ms':>9} {'over 16.7':>10} {'particles':>10} {'shed':>8}")
+    for adaptive in (False, True):
+        worst, over, count, shed = measure_budget(screen, args.frames, args.load / 1e3, adaptive)
+        print(f"{'yes' if adaptive else 'no':>6} {worst * 1e3:>9.3f} {over:>10} {count:>10} {shed:>8}")
+
+
+if __name__ == '__main__':
+    main()
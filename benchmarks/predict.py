@@ -0,0 +1,116 @@
+"""玉の軌道の予測（predict.py）が正しいかを確かめ、予測と自動操縦の速さ・強さを測る
+
+    python -m benchmarks.predict [--samples 10000] [--games 1000] [--frames 3000]
+
+1. ランダムな玉の位置・向きから壁だけで跳ね返らせて1 tick ずつ動かし、
+   パドルの高さに達した tick と x が predict_landing と一致するかを確かめる（違えば終了コード 1）。
+2. VectorGameEngine の全ゲームをまとめて予測する時間を測る。
+3. 自動操縦と sweep.py のボット（玉を追いかける）で遊ばせ、失ったライフ・スコア・クリア数を比べる。
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+from engine import GameEngine, BALL_RADIUS, START_LIVES, ACTION_FIRE
+from predict import autopilot_action, predict_landing, predict_landing_with_blocks
+from sweep import bot_actions
+from vector_env import VectorGameEngine
+
+
+def random_ball(rng, game):
+    """玉を壁の内側のランダムな位置に、ランダムな向きで置く"""
+    game.ball_x = float(rng.uniform(40, game.right_wall_x - BALL_RADIUS))
+    game.ball_y = float(rng.uniform(80, game.paddle_y - BALL_RADIUS - 1))
+    angle = rng.uniform(0, 2 * math.pi)
+    speed = rng.choice([4.0, 8.0, 13.5, 24.0])
+    game.ball_dx = speed * math.cos(angle)
+    game.ball_dy = speed * math.sin(angle)
+
+
+def simulate_landing(game):
+    """壁だけで跳ね返らせて1 tick ずつ動かし、パドルの高さに達した x と tick 数"""
+    ticks = 0
+    while game.ball_y + BALL_RADIUS < game.paddle_y:
+        game.ball_x += game.ball_dx
+        game.ball_y += game.ball_dy
+        game.check_ball_wall_collision()
+        ticks += 1
+    return game.ball_x, ticks
+
+
+def check(samples, seed):
+    """predict_landing が1 tick ずつ動かした結果と一致するか"""
+    rng = np.random.default_rng(seed)
+    game = GameEngine(0)
+    worst = 0.0
+    for sample in range(samples):
+        random_ball(rng, game)
+        if abs(game.ball_dy) < 0.5:
+            continue
+        predicted_x, predicted_ticks = predict_landing(game)
+        x, ticks = simulate_landing(game)
+        # 1 tick ずつ足した誤差が積もるので、x は少しだけずれてよい
+        if ticks != predicted_ticks or abs(x - predicted_x) > 1e-6:
+            print(f"sample {sample}: predicted ({predicted_x}, {predicted_ticks}), actual ({x}, {ticks})")
+            return False
+        worst = max(worst, abs(x - predicted_x))
+    print(f"ok: {samples} samples, worst x error {worst:.2e}")
+    return True
+
+
+def play(games, frames, policy):
+    """policy で VectorGameEngine のゲームを遊ばせ、(失ったライフ, スコア, クリアした数, 1 step の秒数)"""
+    game = VectorGameEngine(games)
+    seeds = np.arange(games)
+    lost = score = cleared = 0
+    elapsed = 0.0
+    for frame in range(1, frames + 1):
+        start = time.perf_counter()
+        actions = policy(game, seeds, frame)
+        elapsed += time.perf_counter() - start
+        _, done = game.step(actions)
+        lost += int((START_LIVES - game.final_lives[done]).sum())
+        score += int(game.final_score[done].sum())
+        cleared += int(game.final_level_cleared[done].sum())
+    lost += int((START_LIVES - game.lives).sum())
+    score += int(game.score.sum())
+    return lost, score, cleared, elapsed / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10000, help='確かめる玉の数')
+    parser.add_argument('--games', type=int, default=1000, help='まとめて予測・自動操縦するゲームの数')
+    parser.add_argument('--frames', type=int, default=3000, help='遊ばせるフレーム数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+
+    if not check(args.samples, args.seed):
+        sys.exit(1)
+
+    # 1つのゲームの予測（壁だけ・ブロックも含める）
+    game = GameEngine(0)
+    game.step(ACTION_FIRE)
+    for name, function in (('walls', predict_landing), ('blocks', predict_landing_with_blocks)):
+        start = time.perf_counter()
+        for _ in range(1000):
+            function(game)
+        print(f"predict ({name}, 1 game): {(time.perf_counter() - start) * 1e3:8.1f} us")
+
+    vector = VectorGameEngine(args.games)
+    start = time.perf_counter()
+    for _ in range(100):
+        predict_landing(vector)
+    print(f"predict (walls, {args.games} games): {(time.perf_counter() - start) * 1e4:8.1f} us")
+
+    for name, policy in (('bot', bot_actions), ('autopilot', lambda game, seeds, frame: autopilot_action(game))):
+        lost, score, cleared, step_time = play(args.games, args.frames, policy)
+        print(f"{name:>9}: lives lost {lost:>6}, score {score:>9}, cleared {cleared:>5},"
+              f" policy {step_time * 1e6:8.1f} us/step")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""ステージの大きさを変えながら、重い処理を1つずつ測る
+
+    python -m benchmarks.suite [--output results.json] [--compare baseline.json] [--threshold 0.1]
+
+ブロック 10×10〜200×200、敵 18〜1990 体のステージを作り、次の処理の1回あたりの時間を測る:
+玉とブロック・敵の当たり判定、check_enemy_trapped（全員の判定し直し）、
+update_enemies（全ての敵が動ける状態）、create_blocks / create_enemies、
+画面外の面への描画全体（SDL のダミードライバ）。
+
+--output で結果を JSON に保存し、--compare で保存しておいた結果（基準）と比べる。
+基準より threshold（割合）以上遅くなった処理があれば表示して終了コード 1 で終わる。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from engine import (
+    GameConfig, GameEngine, SCREEN_WIDTH, SCREEN_HEIGHT, WALL_THICKNESS,
+    BLOCK_WIDTH, BLOCK_SPACING, BLOCK_START_Y, ROW_HEIGHT, ENEMY_WIDTH,
+)
+from renderer import Renderer
+from benchmarks.enemy_scaling import free_all_enemies
+
+# 名前 -> (ブロックの行数, ブロックの列数, 1行あたりの敵の数)。敵の行数はブロックの行数 - 1
+SIZES = {
+    '10x10': (10, 10, 2),
+    '25x25': (25, 25, 4),
+    '50x50': (50, 50, 8),
+    '100x100': (100, 100, 10),
+    '200x200': (200, 200, 10),
+}
+
+# 当たり判定で玉を置く位置の数（1回の測定で呼ぶ回数）
+BALL_POSITIONS = 1000
+
+
+def world_config(block_rows, block_cols, enemy_cols):
+    """ブロックの行と敵の行が交互に並ぶステージ（敵が下に動く余裕もある）"""
+    width = max(block_cols * (BLOCK_WIDTH + BLOCK_SPACING),
+                (ENEMY_WIDTH + 20) * (enemy_cols + 1)) + 4 * WALL_THICKNESS
+    height = BLOCK_START_Y + (2 * block_rows - 1) * ROW_HEIGHT + 150 + 300
+    return GameConfig(screen_width=width, screen_height=height,
+                      block_rows=block_rows, block_cols=block_cols,
+                      enemy_rows=block_rows - 1, enemy_cols=enemy_cols)
+
+
+def measure(setup, run, number, repeat):
+    """setup() の結果で run(state, i) を number 回呼ぶのを repeat 回繰り返す
+
+    1回あたりの秒数の (中央値, 最小値) を返す。setup の時間は含めない。
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        for i in range(number):
+            run(state, i)
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times), min(times)
+
+
+def ball_positions(store, count):
+    """ブロック・敵が並んでいる範囲に散らばった玉の位置（半分くらいは何かに当たる）"""
+    rng = random.Random(0)
+    left = float(store.x.min())
+    right = float((store.x + store.width).max())
+    top = float(store.y.min())
+    bottom = float((store.y + store.height).max())
+    return [(rng.uniform(left, right), rng.uniform(top, bottom)) for _ in range(count)]
+
+
+def hot_paths(config, renderer):
+    """処理の名前 -> (setup, run, number) を作る"""
+    game = GameEngine(0, config)
+    free_game = GameEngine(0, config)
+    free_all_enemies(free_game)
+    block_points = ball_positions(game.blocks, BALL_POSITIONS)
+    enemy_points = ball_positions(game.enemies, BALL_POSITIONS)
+
+    def fresh_game():
+        # 当たり判定はブロック・敵を壊すので毎回作り直す
+        return GameEngine(0, config)
+
+    def ball_block(state, i):
+        state.ball_x, state.ball_y = block_points[i]
+        state.check_ball_block_collision()
+
+    def ball_enemy(state, i):
+        state.ball_x, state.ball_y = enemy_points[i]
+        state.check_ball_enemy_collision()
+
+    def recheck_all():
+        game.trap_check_pending = set(range(len(game.enemies)))
+        return game
+
+    return {
+        'check_ball_block_collision': (fresh_game, ball_block, BALL_POSITIONS),
+        'check_ball_enemy_collision': (fresh_game, ball_enemy, BALL_POSITIONS),
+        'check_enemy_trapped': (recheck_all, lambda state, i: state.check_enemy_trapped(), 1),
+        'update_enemies': (lambda: free_game, lambda state, i: state.update_enemies(), 30),
+        'create_blocks': (lambda: game, lambda state, i: state.create_blocks(), 3),
+        'create_enemies': (lambda: game, lambda state, i: state.create_enemies(), 3),
+        'render': (lambda: game, lambda state, i: renderer.render(state), 10),
+    }
+
+
+def run_suite(sizes, repeat):
+    """sizes のステージで全ての処理を測り、名前 -> 結果 の辞書を返す"""
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    renderer = Renderer(screen, pygame.font.Font(None, 36), pygame.font.Font(None, 24))
+    results = {}
+    for size in sizes:
+        config = world_config(*SIZES[size])
+        # check_enemy_trapped は1回ごとに作り直すので回数を増やす
+        for path, (setup, run, number) in hot_paths(config, renderer).items():
+            median, best = measure(setup, run, number, repeat * 4 if number == 1 else repeat)
+            results[f"{size}/{path}"] = {'median_us': median * 1e6, 'min_us': best * 1e6}
+            print(f"{size:>8} {path:<28} {median * 1e6:>12.1f}", flush=True)
+    pygame.quit()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """基準と比べた表を表示し、threshold 以上遅くなった処理の名前のリストを返す"""
+    regressions = []
+    print(f"\n{'benchmark':<37} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<37} {'-':>12} {result['median_us']:>12.1f} {'new':>8}")
+            continue
+        change = result['median_us'] / base['median_us'] - 1
+        mark = ''
+        if change > threshold:
+            regressions.append(name)
+            mark = '  REGRESSION'
+        print(f"{name:<37} {base['median_us']:>12.1f} {result['median_us']:>12.1f} {change:>+8.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES),
+                        help='測るステージの大きさ')
+    parser.add_argument('--repeat', type=int, default=5, help='測定の繰り返し回数（中央値を使う）')
+    parser.add_argument('--output', metavar='PATH', help='結果を JSON で保存する')
+    parser.add_argument('--compare', metavar='PATH', help='保存しておいた結果と比べる')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='この割合以上遅くなったら退行とみなす')
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'benchmark':<28} {'median us':>12}")
+    results = run_suite(args.sizes, args.repeat)
+
+    if args.output:
+        meta = {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""VectorGameEngine の速さを測り、GameEngine と同じ結果になるかを確かめる
+
+    python -m benchmarks.vector_env [--games 1000] [--frames 600] [--check]
+
+ランダムな入力で N 個のゲームを進め、1秒あたりに進められるフレーム数（全ゲームの合計）を表示する。
+--check を付けると、同じ入力で GameEngine を N 個動かして毎フレーム状態を比べる。
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine import GameEngine, ACTION_FIRE
+from vector_env import VectorGameEngine
+
+
+def random_actions(rng, games, fire_rate=0.05):
+    """←→ はランダム、スペースキーはときどき押す"""
+    actions = rng.integers(0, 4, size=games)
+    actions[rng.random(games) < fire_rate] |= ACTION_FIRE
+    return actions
+
+
+def compare_game(vector, index, game):
+    """ゲーム index の状態が GameEngine と違う項目の名前を返す（同じなら None）"""
+    blocks = game.blocks
+    enemies = game.enemies
+    fields = [
+        ('paddle_x', vector.paddle_x[index], game.paddle_x),
+        ('ball_x', vector.ball_x[index], game.ball_x),
+        ('ball_y', vector.ball_y[index], game.ball_y),
+        ('ball_dx', vector.ball_dx[index], game.ball_dx),
+        ('ball_dy', vector.ball_dy[index], game.ball_dy),
+        ('ball_active', vector.ball_active[index], game.ball_active),
+        ('lives', vector.lives[index], game.lives),
+        ('score', vector.score[index], game.score),
+    ]
+    for name, value, expected in fields:
+        if value != expected:
+            return name
+    arrays = [
+        ('block_active', vector.block_active[index], blocks.active),
+        ('enemy_x', vector.enemy_x[index], enemies.x),
+        ('enemy_y', vector.enemy_y[index], enemies.y),
+        ('enemy_active', vector.enemy_active[index], enemies.active),
+        ('enemy_trapped', vector.enemy_trapped[index], enemies.trapped),
+        ('enemy_direction', vector.enemy_direction[index], enemies.direction),
+        ('enemy_move_down_timer', vector.enemy_move_down_timer[index], enemies.move_down_timer),
+    ]
+    for name, value, expected in arrays:
+        if not np.array_equal(value, expected):
+            return name
+    return None
+
+
+def check(games, frames, seed):
+    """同じ入力で GameEngine を動かし、毎フレーム比べる（違いが無ければ True）"""
+    rng = np.random.default_rng(seed)
+    vector = VectorGameEngine(games)
+    scalar = [GameEngine(index) for index in range(games)]
+    finished = 0
+    for frame in range(1, frames + 1):
+        actions = random_actions(rng, games)
+        reward, done = vector.step(actions)
+        for index, game in enumerate(scalar):
+            score = game.score
+            game.step(int(actions[index]))
+            if reward[index] != game.score - score:
+                print(f"frame {frame} game {index}: reward {reward[index]} != {game.score - score}")
+                return False
+            if done[index] != (game.game_over or game.level_cleared):
+                print(f"frame {frame} game {index}: done {done[index]}")
+                return False
+            if done[index]:
+                finished += 1
+                game.reset(index)
+            name = compare_game(vector, index, game)
+            if name is not None:
+                print(f"frame {frame} game {index}: {name} differs")
+                return False
+    print(f"ok: {games} games x {frames} frames, {finished} games finished")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000, help='同時に進めるゲームの数')
+    parser.add_argument('--frames', type=int, default=600, help='進めるフレーム数')
+    parser.add_argument('--seed', type=int, default=0, help='入力の乱数シード')
+    parser.add_argument('--check', action='store_true', help='GameEngine と結果を比べる')
+    args = parser.parse_args()
+
+    if args.check:
+        if not check(args.games, args.frames, args.seed):
+            sys.exit(1)
+        return
+
+    rng = np.random.default_rng(args.seed)
+    actions = [random_actions(rng, args.games) for _ in range(args.frames)]
+
+    vector = VectorGameEngine(args.games)
+    start = time.perf_counter()
+    for frame_actions in actions:
+        vector.step(frame_actions)
+    vector_time = time.perf_counter() - start
+
+    # GameEngine は少ない数で測って比べる
+    scalar_games = min(args.games, 50)
+    scalar = [GameEngine(index) for index in range(scalar_games)]
+    start = time.perf_counter()
+    for frame_actions in actions:
+        for index, game in enumerate(scalar):
+            game.step(int(frame_actions[index]))
+            if game.game_over or game.level_cleared:
+                game.reset(index)
+    scalar_time = time.perf_counter() - start
+
+    total = args.games * args.frames
+    print(f"VectorGameEngine: {total / vector_time:>12,.0f} frames/s ({args.games} games)")
+    print(f"GameEngine:       {scalar_games * args.frames / scalar_time:>12,.0f} frames/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""玉（円）の連続的な当たり判定
+
+1フレームの移動を線分として扱い、円が矩形・壁に最初に触れる時刻 t（0〜1）を求める。
+速い玉がブロックやパドルをすり抜けたり、細かく刻んで動かしたりしなくて済む。
+"""
+import math
+
+
+def sweep_circle_rect(x, y, dx, dy, radius, left, top, right, bottom):
+    """円 (x, y) を (dx, dy) だけ動かしたとき、矩形に最初に触れる時刻と法線を返す
+
+    (t, nx, ny) を返す。当たらないとき、または最初から重なって（接して）いて離れる向きに
+    動いているときは None。最初から重なっていて近づく向きなら t = 0。
+    """
+    # 最初から重なっているか（矩形上で円の中心に一番近い点との距離で判定）
+    near_x = min(max(x, left), right)
+    near_y = min(max(y, top), bottom)
+    gap_x = x - near_x
+    gap_y = y - near_y
+    distance_sq = gap_x * gap_x + gap_y * gap_y
+    if distance_sq <= radius * radius:
+        if distance_sq > 0:
+            distance = math.sqrt(distance_sq)
+            nx, ny = gap_x / distance, gap_y / distance
+        else:
+            # 中心が矩形の中にある: 中心からのずれが大きい方の面
+            center_x = x - (left + right) / 2
+            center_y = y - (top + bottom) / 2
+            if abs(center_x) > abs(center_y):
+                nx, ny = (1.0 if center_x > 0 else -1.0), 0.0
+            else:
+                nx, ny = 0.0, (1.0 if center_y > 0 else -1.0)
+        if dx * nx + dy * ny >= 0:
+            return None
+        return 0.0, nx, ny
+
+    # 半径だけ広げた矩形に対する線分の交差（スラブ法）
+    t_enter = 0.0
+    t_exit = 1.0
+    normal_x = normal_y = 0.0
+    for position, delta, low, high, axis in ((x, dx, left - radius, right + radius, 0),
+                                             (y, dy, top - radius, bottom + radius, 1)):
+        if delta == 0:
+            if position < low or position > high:
+                return None
+            continue
+        t_low = (low - position) / delta
+        t_high = (high - position) / delta
+        sign = -1.0
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+            sign = 1.0
+        if t_low > t_enter:
+            t_enter = t_low
+            normal_x, normal_y = (sign, 0.0) if axis == 0 else (0.0, sign)
+        t_exit = min(t_exit, t_high)
+        if t_enter > t_exit:
+            return None
+
+    # 広げた矩形の角に入った場合は、角を中心とする円との交差を求める
+    hit_x = x + dx * t_enter
+    hit_y = y + dy * t_enter
+    if left <= hit_x <= right or top <= hit_y <= bottom:
+        return t_enter, normal_x, normal_y
+    corner_x = left if hit_x < left else right
+    corner_y = top if hit_y < top else bottom
+    offset_x = x - corner_x
+    offset_y = y - corner_y
+    a = dx * dx + dy * dy
+    b = 2 * (offset_x * dx + offset_y * dy)
+    c = offset_x * offset_x + offset_y * offset_y - radius * radius
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / (2 * a)
+    if t < 0 or t > 1:
+        return None
+    return t, (offset_x + dx * t) / radius, (offset_y + dy * t) / radius
+
+
+def sweep_circle_walls(x, y, dx, dy, radius, left, top, right):
+    """円を (dx, dy) だけ動かしたとき、左・上・右の壁に最初に触れる時刻と法線を返す
+
+    (t, nx, ny) または None。壁の外側にはみ出していて戻る向きに動いているときは当たらない。
+    """
+    best = None
+    for position, delta, limit, sign, axis in ((x, dx, left + radius, 1.0, 0),
+                                               (y, dy, top + radius, 1.0, 1),
+                                               (x, dx, right - radius, -1.0, 0)):
+        # sign は壁の法線の向き（内側向き）。壁に近づく向きに動いているときだけ
+        if delta * sign >= 0:
+            continue
+        t = (limit - position) / delta
+        if (position - limit) * sign <= 0:
+            t = 0.0  # もう壁に触れている
+        if t > 1:
+            continue
+        if best is None or t < best[0]:
+            best = (t, sign, 0.0) if axis == 0 else (t, 0.0, sign)
+    return best
@@ -0,0 +1,157 @@
+"""謎の壁 - 内部の面に描いてウィンドウ・全画面に拡大する表示と、重いときに画質を下げる調整
+
+    display = Display(window_size=(1920, 1080), render_scale=0.75)
+    renderer = Renderer(display.target, font, font_small, scale=display.render_scale)
+    quality = AdaptiveQuality(display, renderer, particles)
+    ...
+    display.present(renderer.render(game))
+    clock.tick()
+    quality.record(clock.get_rawtime())
+
+Renderer は display.target（ゲームの画面の大きさ × render_scale）に描き、present() で1回だけ
+ウィンドウの大きさに拡大する（縦横比を保ち、余りは黒い帯）。内部の面とウィンドウが同じ大きさなら
+ウィンドウに直接描く（これまでと同じで、拡大はしない）。
+
+AdaptiveQuality はフレームの時間（clock.tick の待ち時間を除いた時間）を SAMPLE_FRAMES ごとに平均し、
+予算を超えていれば QUALITY_LEVELS の段階を1つ下げ（タイルの背景・パーティクルを止め、内部の解像度を下げる）、
+余裕がある状態が続けば1つ戻す。戻してすぐにまた下がったときは、次に戻すまでの時間を倍にする。
+今の段階は F3 の処理時間の表の下に出る（Renderer.profile_notes）。
+"""
+import pygame
+
+from engine import SCREEN_WIDTH, SCREEN_HEIGHT
+from renderer import BLACK
+
+FRAME_BUDGET_MS = 1000 / 60  # 1フレームの時間の上限（ミリ秒）
+HEADROOM = 0.6               # 平均がこの割合より短ければ段階を戻す
+SAMPLE_FRAMES = 30           # 平均を取るフレーム数
+RAISE_DELAY = 180            # 段階を変えてから戻すまでに待つフレーム数（最初）
+MAX_RAISE_DELAY = 60 * 60    # 戻すまでに待つフレーム数の上限
+
+# 画質の段階（上から順に下げる）: (内部の解像度の倍率, タイルの背景, パーティクル)
+QUALITY_LEVELS = (
+    (1.0, True, True),
+    (1.0, False, True),
+    (1.0, False, False),
+    (0.75, False, False),
+    (0.5, False, False),
+)
+
+
+class Display:
+    """ウィンドウ（または全画面）と、ゲームを描く内部の面"""
+
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), window_size=None, fullscreen=False, render_scale=1.0):
+        """size はゲームの画面の大きさ。window_size が None ならウィンドウは size、全画面なら画面の大きさ"""
+        self.size = size
+        if fullscreen:
+            self.window = pygame.display.set_mode(window_size or (0, 0), pygame.FULLSCREEN)
+        else:
+            self.window = pygame.display.set_mode(window_size or size)
+        # 縦横比を保ってウィンドウに収めた範囲
+        width, height = size
+        window_width, window_height = self.window.get_size()
+        fit = min(window_width / width, window_height / height)
+        self.view = pygame.Rect(0, 0, round(width * fit), round(height * fit))
+        self.view.center = self.window.get_rect().center
+        self.view_surface = self.window.subsurface(self.view)
+        self.target = None
+        self.set_render_scale(render_scale)
+
+    def set_render_scale(self, scale):
+        """内部の面の倍率を変える（面を作り直す）"""
+        width, height = self.size
+        target_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        self.render_scale = scale
+        self.window.fill(BLACK)
+        if target_size == self.window.get_size():
+            self.target = self.window
+        else:
+            self.target = pygame.Surface(target_size).convert()
+        self.full_update = True  # 次の present() では全体を転送する
+
+    @property
+    def scaled(self):
+        """内部の面をウィンドウに拡大しているか"""
+        return self.target is not self.window
+
+    def present(self, dirty_rects=None):
+        """描いた内部の面を画面に出す（dirty_rects は Renderer.render の戻り値）"""
+        if not self.scaled:
+            if dirty_rects is None or self.full_update:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty_rects)
+        elif dirty_rects is None or dirty_rects or self.full_update:
+            # 一部だけ拡大すると、つなぎ目で画素の取り方がずれるので全体を拡大する
+            pygame.transform.scale(self.target, self.view.size, self.view_surface)
+            if self.full_update:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.view)
+        self.full_update = False
+
+
+class AdaptiveQuality:
+    """フレームの時間を見て、画質の段階を上げ下げする"""
+
+    def __init__(self, display, renderer, particles=None, budget_ms=FRAME_BUDGET_MS):
+        self.display = display
+        self.renderer = renderer
+        self.particles = particles
+        self.budget_ms = budget_ms
+        self.base_scale = display.render_scale  # --render-scale の倍率（段階の倍率はこれに掛ける）
+        self.level = 0
+        self.total_ms = 0.0
+        self.samples = 0
+        self.since_change = 0  # 段階を変えてからのフレーム数
+        self.raise_delay = RAISE_DELAY
+        self.raised = False    # 最後の変更が戻したものか
+        self.show_level()
+
+    def record(self, frame_ms):
+        """1フレームの時間（ミリ秒）を記録し、平均が出たら段階を見直す"""
+        self.total_ms += frame_ms
+        self.samples += 1
+        self.since_change += 1
+        if self.samples < SAMPLE_FRAMES:
+            return
+        average = self.total_ms / self.samples
+        self.total_ms = 0.0
+        self.samples = 0
+        if average > self.budget_ms and self.level < len(QUALITY_LEVELS) - 1:
+            if self.raised and self.since_change < self.raise_delay:
+                # 戻したら間に合わなくなった: 次に戻すまで長く待つ
+                self.raise_delay = min(MAX_RAISE_DELAY, self.raise_delay * 2)
+            self.set_level(self.level + 1, raised=False)
+        elif (average < self.budget_ms * HEADROOM and self.level > 0 and
+              self.since_change >= self.raise_delay):
+            self.set_level(self.level - 1, raised=True)
+
+    def set_level(self, level, raised=False):
+        """画質の段階を変えて、表示・描画に反映する"""
+        self.level = level
+        self.raised = raised
+        self.since_change = 0
+        scale, background, particles = QUALITY_LEVELS[level]
+        display = self.display
+        renderer = self.renderer
+        scale *= self.base_scale
+        if scale != display.render_scale:
+            display.set_render_scale(scale)
+            renderer.set_target(display.target, scale)
+        renderer.set_background(background)
+        if self.particles is not None:
+            if not particles:
+                self.particles.clear()
+            renderer.particles = self.particles if particles else None
+        self.show_level()
+
+    def show_level(self):
+        """今の段階を F3 の処理時間の表の下に出す"""
+        _, background, particles = QUALITY_LEVELS[self.level]
+        width, height = self.display.target.get_size()
+        self.renderer.profile_notes = [f"quality {self.level}: {width}x{height}",
+                                       f"tiles {'on' if background else 'off'},"
+                                       f" particles {'on' if particles else 'off'}"]
+        self.renderer.profile_layer = None
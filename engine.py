@@ -0,0 +1,900 @@
+"""謎の壁 - ゲームロジック（画面・時計に依存しないシミュレーション本体）
+
+pygame を import しないので、ディスプレイの無いサーバーでも
+GameEngine.reset(seed) / GameEngine.step(action) だけで高速に回せる。
+"""
+import bisect
+import math
+import random
+from dataclasses import dataclass
+
+import numpy as np
+
+from collision import sweep_circle_rect, sweep_circle_walls
+from entities import POSITION_DTYPE, BallStore, BlockStore, EnemyStore
+from profiler import NULL_PROFILER
+from spatial import touching_pairs
+
+# 画面設定
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# HUD（スコア表示用の上部バー）
+HUD_HEIGHT = 40
+
+# 壁の設定（HUDの下から開始）
+WALL_THICKNESS = 20
+LEFT_WALL_X = 0
+RIGHT_WALL_X = SCREEN_WIDTH - WALL_THICKNESS
+TOP_WALL_Y = HUD_HEIGHT
+BOTTOM_Y = SCREEN_HEIGHT
+
+# パドルの設定
+PADDLE_WIDTH = 100
+PADDLE_HEIGHT = 15
+PADDLE_SPEED = 10  # 2倍の移動速度
+PADDLE_Y = SCREEN_HEIGHT - 50
+
+# 玉の設定
+BALL_RADIUS = 16  # 2倍のサイズ
+BALL_SPEED = 8  # 2倍の速度
+
+# 角度制限（緩やかな角度を防ぐ）
+MIN_ANGLE = math.radians(30)  # 最小30度（ブロック・敵との衝突用）
+MAX_ANGLE = math.radians(60)  # 最大60度
+
+# パドル反射用の最大傾き（縦方向からのずれ）
+PADDLE_MAX_TILT = math.radians(60)  # 中央で真上、端で最大60度傾く
+
+# ブロックの設定
+BLOCK_WIDTH = 60
+BLOCK_HEIGHT = 25
+BLOCK_ROWS = 3  # ブロックだけの行数
+BLOCK_COLS = 10
+BLOCK_START_Y = 100
+BLOCK_SPACING = 5
+
+# 敵の設定
+ENEMY_WIDTH = 40
+ENEMY_HEIGHT = 30
+ENEMY_ROWS = 2  # 敵だけの行数
+ENEMY_COLS = 8  # 1行あたりの敵の数
+
+# 行の高さ（ブロックと敵の行の間隔）
+ROW_HEIGHT = BLOCK_HEIGHT + BLOCK_SPACING
+
+# 敵の動き
+ENEMY_MOVE_DOWN_INTERVAL = 60  # 手前に移動を試みる間隔（フレーム）
+ENEMY_MOVE_DOWN_STEP = 10      # 1回に手前に動く量
+MIN_DISTANCE_FROM_PADDLE = 100  # 敵がパドルに近づける限界（玉が跳ね返るスペース）
+
+# 動く敵がこれ以下なら、配列でまとめて処理せずに1体ずつ動かす（配列の処理の手間の方が大きい）
+SMALL_ENEMY_COUNT = 24
+
+# 連続的な当たり判定で、1フレームに処理する衝突の最大数
+MAX_SWEEP_HITS = 16
+
+# 初期ライフ
+START_LIVES = 3
+
+# マルチボール（GameConfig.multi_ball が 1 以上のとき）
+MULTI_BALL_INTERVAL = 10  # ブロックをこの数壊すごとに玉が増える
+MAX_BALLS = 256           # 増えた玉の最大数
+
+# step() 中に起きた出来事（GameEngine.events に (種類, 番号) で入る）
+EVENT_RESET = 'reset'           # ブロック・敵を作り直した
+EVENT_BLOCK_DESTROYED = 'block'  # ブロックが壊れた
+EVENT_ENEMY_DESTROYED = 'enemy'  # 敵を倒した
+EVENT_ENEMY_FREED = 'freed'      # 敵が動けるようになった
+EVENT_BALL_PROMOTED = 'promoted'  # 主の玉が落ち、増えた玉の最初のものが主の玉になった
+
+# 入力（step() に渡すビットフラグ）
+ACTION_NONE = 0
+ACTION_LEFT = 1   # ←キーが押されている
+ACTION_RIGHT = 2  # →キーが押されている
+ACTION_FIRE = 4   # このフレームでスペースキーが押された
+
+
+@dataclass
+class GameConfig:
+    """ステージの大きさとブロック・敵の数、バランス調整用の値
+
+    負荷試験用の大きなステージや、sweep.py で試す調整値もこれで指定する。
+    """
+    screen_width: int = SCREEN_WIDTH
+    screen_height: int = SCREEN_HEIGHT
+    block_rows: int = BLOCK_ROWS
+    block_cols: int = BLOCK_COLS
+    enemy_rows: int = ENEMY_ROWS
+    enemy_cols: int = ENEMY_COLS
+    paddle_max_tilt: float = PADDLE_MAX_TILT  # ラジアン
+    min_angle: float = MIN_ANGLE              # ラジアン
+    ball_speed: float = BALL_SPEED
+    paddle_speed: int = PADDLE_SPEED
+    enemy_move_down_interval: int = ENEMY_MOVE_DOWN_INTERVAL
+    # True にすると、玉の1フレームの移動を線分として当たり判定する（速い玉でもすり抜けない）
+    continuous_collision: bool = False
+    # マルチボール: 1回に増える玉の数（0 なら増えない）
+    multi_ball: int = 0
+
+
+def paddle_velocities(offset, ball_speed, paddle_max_tilt):
+    """パドルの中央からのずれ offset（-1.0〜1.0 の配列）で反射した玉の速度 (dx, dy) の配列
+
+    GameEngine.reflect_ball_off_paddle と同じ計算を配列で行う。
+    """
+    # 中央から離れるほど傾きを大きくする（ほぼ中央なら真上）
+    # sin・cos は np.sin などと最後の桁がずれることがあるので math で計算する
+    tilt = (paddle_max_tilt * np.abs(offset)).tolist()
+    dir_x = np.where(offset < 0, -1, 1)
+    dx = dir_x * ball_speed * np.array([math.sin(t) for t in tilt])
+    dy = -ball_speed * np.array([math.cos(t) for t in tilt])
+    center = np.abs(offset) < 0.05
+    return np.where(center, 0, dx), np.where(center, -ball_speed, dy)
+
+
+def bounce_velocities(ball_x, ball_y, ball_dx, ball_dy, x, y, width, height, min_angle):
+    """ブロック・敵（x, y, width, height の配列）に当たった玉の速度 (dx, dy) の配列
+
+    GameEngine.bounce_ball と同じ計算を配列で行う。
+    """
+    dx = ball_x - (x + width / 2)
+    dy = ball_y - (y + height / 2)
+    side = np.abs(dx) > np.abs(dy)
+    ball_dx = np.where(side, -ball_dx, ball_dx)
+    ball_dy = np.where(side, ball_dy, -ball_dy)
+
+    # 角度が緩やかになりすぎないようにする
+    # （x**2 は x*x と最後の桁がずれることがあるので、GameEngine と同じ式を math で計算する）
+    velocity = list(zip(ball_dx.tolist(), ball_dy.tolist()))
+    current_speed = np.array([math.sqrt(vx**2 + vy**2) for vx, vy in velocity])
+    angle = np.array([math.atan2(abs(vy), abs(vx)) for vx, vy in velocity])
+    clamp = (current_speed > 0) & (angle < min_angle)
+    speed_x = current_speed * math.cos(min_angle)
+    speed_y = current_speed * math.sin(min_angle)
+    ball_dx = np.where(clamp, np.where(ball_dx > 0, speed_x, -speed_x), ball_dx)
+    ball_dy = np.where(clamp, np.where(ball_dy > 0, speed_y, -speed_y), ball_dy)
+    return ball_dx, ball_dy
+
+
+class GameEngine:
+    """ゲーム状態（パドル・玉・ブロック・敵・ライフ・スコア）をまとめたもの"""
+
+    def __init__(self, seed=None, config=None):
+        self.config = config if config is not None else GameConfig()
+        self.screen_width = self.config.screen_width
+        self.right_wall_x = self.config.screen_width - WALL_THICKNESS
+        self.bottom_y = self.config.screen_height
+        self.paddle_speed = self.config.paddle_speed
+        self.paddle_max_tilt = self.config.paddle_max_tilt
+        self.min_angle = self.config.min_angle
+        self.enemy_move_down_interval = self.config.enemy_move_down_interval
+        self.continuous_collision = self.config.continuous_collision
+        # FrameProfiler を入れると step() の区間ごとの時間を測る
+        self.profiler = NULL_PROFILER
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """シードを指定してゲームを最初からやり直す"""
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.frame = 0
+
+        self.paddle_x = self.screen_width // 2 - PADDLE_WIDTH // 2
+        self.paddle_y = self.bottom_y - 50
+        self.paddle_prev_x = self.paddle_x  # 前フレームのパドルのX位置
+        self.paddle_direction = 0  # パドルの移動方向（-1: 左, 0: 停止, 1: 右）
+
+        self.ball_speed = self.config.ball_speed
+        self.ball_x = self.screen_width // 2
+        self.ball_y = self.paddle_y - BALL_RADIUS - 5
+        ball_angle = -math.pi / 4  # -45度（上向き）
+        self.ball_dx = self.ball_speed * math.cos(ball_angle)
+        self.ball_dy = self.ball_speed * math.sin(ball_angle)
+        self.ball_active = False  # スペースキーで発射
+        self.balls = BallStore(MAX_BALLS)  # マルチボールで増えた玉
+        self.blocks_destroyed = 0  # 壊したブロックの数（マルチボールの間隔を数える）
+        self.balls_pending = 0     # このフレームの最後に増やす玉の数
+
+        self.blocks = None
+        self.enemies = None
+        self.events = []
+        self.reset_game()
+
+    def create_blocks(self):
+        """ブロックを生成（ブロックだけの行、右端まで配置）"""
+        block_cols = self.config.block_cols
+        # 利用可能な幅を計算（左右の壁の間）
+        available_width = self.right_wall_x - (LEFT_WALL_X + WALL_THICKNESS)
+        # 右端まで配置するために必要なブロック数を計算
+        # ブロック幅とスペースを考慮
+        total_block_width = block_cols * BLOCK_WIDTH + (block_cols - 1) * BLOCK_SPACING
+        # 右端まで配置するための調整
+        if total_block_width < available_width:
+            # 余ったスペースをブロック間のスペースに分配
+            extra_space = available_width - total_block_width
+            spacing_adjustment = extra_space / (block_cols - 1) if block_cols > 1 else 0
+            actual_spacing = BLOCK_SPACING + spacing_adjustment
+        else:
+            actual_spacing = BLOCK_SPACING
+
+        # 列ごとのX座標と、ブロック行（偶数行 0, 2, 4...）ごとのY座標
+        col_x = [LEFT_WALL_X + WALL_THICKNESS + col * (BLOCK_WIDTH + actual_spacing)
+                 for col in range(block_cols)]
+        row_y = [BLOCK_START_Y + row * ROW_HEIGHT
+                 for row in range(self.config.block_rows + self.config.enemy_rows) if row % 2 == 0]
+        self.blocks = BlockStore(col_x, row_y, BLOCK_WIDTH, BLOCK_HEIGHT)
+
+    def check_enemy_block_collision(self, enemy_x, enemy_y, exclude_enemy=None):
+        """敵とブロックの衝突判定（ブロックは格子状なので、重なる行・列だけを調べる）"""
+        return self.blocks.overlaps_rect(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT)
+
+    def check_enemy_enemy_collision(self, enemy_x, enemy_y, exclude_enemy=None):
+        """敵同士の衝突判定（exclude_enemy は自分自身の番号）"""
+        return self.enemies.overlaps_rect(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT, exclude_enemy)
+
+    def check_enemy_neighbor_collision(self, enemy_x, enemy_y, neighbors, boxes, exclude_enemy=None):
+        """敵同士の衝突判定（neighbors に挙げた番号の敵だけを、boxes の範囲で調べる）
+
+        boxes は敵の番号ごとの (左, 上, 右, 下) のリスト。
+        """
+        for index in neighbors:
+            left, top, right, bottom = boxes[index]
+            if (enemy_x + ENEMY_WIDTH > left and enemy_x < right and
+                enemy_y + ENEMY_HEIGHT > top and enemy_y < bottom and
+                index != exclude_enemy):
+                return True
+        return False
+
+    def check_enemy_position_valid(self, enemy_x, enemy_y, exclude_enemy=None):
+        """敵の位置が有効かチェック（ブロックや他の敵と重ならないか）"""
+        if not self.check_enemy_position_clear(enemy_x, enemy_y):
+            return False
+
+        # 他の敵と重ならないかチェック
+        if self.check_enemy_enemy_collision(enemy_x, enemy_y, exclude_enemy):
+            return False
+
+        return True
+
+    def check_enemy_position_clear(self, enemy_x, enemy_y):
+        """check_enemy_position_valid の、敵同士の判定以外"""
+        # 壁の内側かチェック
+        if enemy_x < LEFT_WALL_X + WALL_THICKNESS or enemy_x + ENEMY_WIDTH > self.right_wall_x:
+            return False
+        if enemy_y < TOP_WALL_Y + WALL_THICKNESS:
+            return False
+
+        # パドルに近づきすぎないかチェック（パドルとの間にボールが跳ね返るスペースを確保）
+        if enemy_y + ENEMY_HEIGHT > self.paddle_y - MIN_DISTANCE_FROM_PADDLE:
+            return False
+
+        # ブロックと重ならないかチェック
+        if self.check_enemy_block_collision(enemy_x, enemy_y):
+            return False
+
+        return True
+
+    def check_enemy_positions_clear(self, enemy_x, enemy_y):
+        """check_enemy_position_valid の、敵同士の判定以外を座標の配列にまとめて行う"""
+        clear = ((enemy_x >= LEFT_WALL_X + WALL_THICKNESS) &
+                 (enemy_x + ENEMY_WIDTH <= self.right_wall_x) &
+                 (enemy_y >= TOP_WALL_Y + WALL_THICKNESS) &
+                 (enemy_y + ENEMY_HEIGHT <= self.paddle_y - MIN_DISTANCE_FROM_PADDLE))
+        clear &= ~self.blocks.overlaps_rects(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT)
+        return clear
+
+    def create_enemies(self):
+        """敵を生成（敵だけの行に配置）"""
+        enemy_cols = self.config.enemy_cols
+        # 敵を均等に配置
+        available_width = self.screen_width - 2 * WALL_THICKNESS - 2 * WALL_THICKNESS
+        enemy_spacing = available_width / (enemy_cols + 1)
+        col_x = [LEFT_WALL_X + WALL_THICKNESS + (i + 1) * enemy_spacing - ENEMY_WIDTH // 2
+                 for i in range(enemy_cols)]
+        directions = [1 if i % 2 == 0 else -1 for i in range(enemy_cols)]  # 移動方向（交互に）
+        # 奇数行（1, 3, 5...）が敵行
+        row_y = [BLOCK_START_Y + row * ROW_HEIGHT + (ROW_HEIGHT - ENEMY_HEIGHT) // 2
+                 for row in range(self.config.block_rows + self.config.enemy_rows) if row % 2 == 1]
+
+        self.enemies = EnemyStore(col_x * len(row_y),
+                                  [y for y in row_y for _ in range(enemy_cols)],
+                                  ENEMY_WIDTH, ENEMY_HEIGHT,
+                                  directions * len(row_y))
+        self.setup_trap_counters()
+
+    def setup_trap_counters(self):
+        """敵ごとに、同じ列で上下に残っているブロックの数を数えておく
+
+        閉じ込められている敵は動かないので、ブロックが壊れたときに
+        その列の敵の数を減らすだけで check_enemy_trapped が判定できる。
+        """
+        blocks = self.blocks
+        enemies = self.enemies
+        self.enemy_blocks_above = []
+        self.enemy_blocks_below = []
+        # 列ごとの、最初の位置で重なる敵（スナップショットから戻すときに使う）
+        self.column_enemies = [[] for _ in range(blocks.cols)]
+        for index, (x, y, width, height) in enumerate(zip(enemies.x.tolist(), enemies.y.tolist(),
+                                                          enemies.width.tolist(), enemies.height.tolist())):
+            # X方向に重なるブロック列
+            first_col = bisect.bisect_right(blocks.col_right_list, x)
+            last_col = bisect.bisect_left(blocks.col_left_list, x + width)
+            columns = max(0, last_col - first_col)
+            rows_above = bisect.bisect_left(blocks.row_top_list, y)
+            rows_below = blocks.rows - bisect.bisect_right(blocks.row_top_list, y + height)
+            self.enemy_blocks_above.append(rows_above * columns)
+            self.enemy_blocks_below.append(rows_below * columns)
+            for col in range(first_col, last_col):
+                self.column_enemies[col].append(index)
+        # 閉じ込められている敵だけに減らしていく写し
+        self.column_trapped_enemies = [list(column) for column in self.column_enemies]
+        # 最初のチェックで全員を判定する
+        self.trap_check_pending = set(range(len(enemies)))
+
+    def destroy_block(self, index):
+        """ブロックを壊し、生存数と同じ列の敵のカウンタを更新"""
+        blocks = self.blocks
+        enemies = self.enemies
+        blocks.kill(index)
+        self.events.append((EVENT_BLOCK_DESTROYED, index))
+        self.blocks_destroyed += 1
+        if self.config.multi_ball and self.blocks_destroyed % MULTI_BALL_INTERVAL == 0:
+            self.balls_pending += self.config.multi_ball
+
+        col = index % blocks.cols
+        block_y = float(blocks.y[index])
+        watchers = [i for i in self.column_trapped_enemies[col] if enemies.trapped[i]]
+        self.column_trapped_enemies[col] = watchers
+        for i in watchers:
+            enemy_y = float(enemies.y[i])
+            if block_y < enemy_y:
+                self.enemy_blocks_above[i] -= 1
+            elif block_y > enemy_y + float(enemies.height[i]):
+                self.enemy_blocks_below[i] -= 1
+            else:
+                continue
+            self.trap_check_pending.add(i)
+
+    def destroy_enemy(self, index):
+        """敵を倒す"""
+        self.enemies.kill(index)
+        self.events.append((EVENT_ENEMY_DESTROYED, index))
+
+    def check_ball_wall_collision(self):
+        """玉と壁の衝突判定"""
+        # 左壁
+        if self.ball_x - BALL_RADIUS <= LEFT_WALL_X + WALL_THICKNESS:
+            self.ball_x = LEFT_WALL_X + WALL_THICKNESS + BALL_RADIUS
+            self.ball_dx = abs(self.ball_dx)
+
+        # 右壁
+        if self.ball_x + BALL_RADIUS >= self.right_wall_x:
+            self.ball_x = self.right_wall_x - BALL_RADIUS
+            self.ball_dx = -abs(self.ball_dx)
+
+        # 上壁
+        if self.ball_y - BALL_RADIUS <= TOP_WALL_Y + WALL_THICKNESS:
+            self.ball_y = TOP_WALL_Y + WALL_THICKNESS + BALL_RADIUS
+            self.ball_dy = abs(self.ball_dy)
+
+    def check_ball_paddle_collision(self):
+        """玉とパドルの衝突判定（パドルのどこに当たったかだけで反射を決定）"""
+        if (self.ball_y + BALL_RADIUS >= self.paddle_y and
+            self.ball_y - BALL_RADIUS <= self.paddle_y + PADDLE_HEIGHT and
+            self.ball_x + BALL_RADIUS >= self.paddle_x and
+            self.ball_x - BALL_RADIUS <= self.paddle_x + PADDLE_WIDTH):
+            self.reflect_ball_off_paddle()
+
+    def reflect_ball_off_paddle(self):
+        """パドルに当たった玉を反射させ、パドルの上に乗せる"""
+        # パドルのどの位置に当たったか（0.0: 左端, 1.0: 右端）
+        hit_pos = (self.ball_x - self.paddle_x) / PADDLE_WIDTH
+        # -1.0（左端）〜 1.0（右端）
+        offset = (hit_pos - 0.5) * 2.0
+
+        if abs(offset) < 0.05:
+            # ほぼ中央なら真上に反射
+            self.ball_dx = 0
+            self.ball_dy = -self.ball_speed
+        else:
+            # 中央から離れるほど傾きを大きくする
+            tilt = self.paddle_max_tilt * abs(offset)  # 0〜最大傾き
+            dir_x = -1 if offset < 0 else 1       # 左側に当たれば左、右側なら右
+
+            self.ball_dx = dir_x * self.ball_speed * math.sin(tilt)
+            self.ball_dy = -self.ball_speed * math.cos(tilt)
+
+        self.ball_y = self.paddle_y - BALL_RADIUS
+
+    def bounce_ball(self, x, y, width, height):
+        """ブロック・敵に当たった玉を反射させる（どの面に当たったかで決定）"""
+        target_center_x = x + width / 2
+        target_center_y = y + height / 2
+
+        dx = self.ball_x - target_center_x
+        dy = self.ball_y - target_center_y
+
+        if abs(dx) > abs(dy):
+            # 左右の面
+            self.ball_dx = -self.ball_dx
+        else:
+            # 上下の面
+            self.ball_dy = -self.ball_dy
+        self.clamp_ball_angle()
+
+    def clamp_ball_angle(self):
+        """玉の角度が緩やかになりすぎないようにする"""
+        current_speed = math.sqrt(self.ball_dx**2 + self.ball_dy**2)
+        if current_speed > 0:
+            angle = math.atan2(abs(self.ball_dy), abs(self.ball_dx))
+            # 角度が小さすぎる場合（水平に近い場合）、最小角度を保証
+            if angle < self.min_angle:
+                # 速度を保ちつつ角度を調整
+                if self.ball_dx > 0:
+                    self.ball_dx = current_speed * math.cos(self.min_angle)
+                else:
+                    self.ball_dx = -current_speed * math.cos(self.min_angle)
+                if self.ball_dy > 0:
+                    self.ball_dy = current_speed * math.sin(self.min_angle)
+                else:
+                    self.ball_dy = -current_speed * math.sin(self.min_angle)
+
+    def check_ball_block_collision(self):
+        """玉とブロックの衝突判定"""
+        blocks = self.blocks
+        index = blocks.find_ball_hit(self.ball_x - BALL_RADIUS, self.ball_y - BALL_RADIUS,
+                                     self.ball_x + BALL_RADIUS, self.ball_y + BALL_RADIUS)
+        if index is None:
+            return False
+
+        self.bounce_ball(float(blocks.x[index]), float(blocks.y[index]),
+                         float(blocks.width[index]), float(blocks.height[index]))
+        self.destroy_block(index)
+        self.score += 10
+        return True
+
+    def check_ball_enemy_collision(self):
+        """玉と敵の衝突判定"""
+        enemies = self.enemies
+        index = enemies.find_ball_hit(self.ball_x - BALL_RADIUS, self.ball_y - BALL_RADIUS,
+                                      self.ball_x + BALL_RADIUS, self.ball_y + BALL_RADIUS)
+        if index is None:
+            return False
+
+        self.bounce_ball(float(enemies.x[index]), float(enemies.y[index]),
+                         float(enemies.width[index]), float(enemies.height[index]))
+        self.destroy_enemy(index)
+        self.score += 20
+        return True
+
+    def find_first_ball_hit(self, dx, dy):
+        """玉を (dx, dy) だけ動かしたとき、最初に触れる物を探す
+
+        (t, nx, ny, 種類, 番号) を返す（無ければ None）。種類は 'wall', 'paddle', 'block', 'enemy'。
+        同じ時刻なら壁・パドル・ブロック・敵の順、同じ種類なら番号の小さい方。
+        """
+        x = self.ball_x
+        y = self.ball_y
+        best = None
+        hit = sweep_circle_walls(x, y, dx, dy, BALL_RADIUS, LEFT_WALL_X + WALL_THICKNESS,
+                                 TOP_WALL_Y + WALL_THICKNESS, self.right_wall_x)
+        if hit is not None:
+            best = hit + ('wall', None)
+
+        # パドルは上から落ちてくる玉だけ
+        if dy > 0:
+            hit = sweep_circle_rect(x, y, dx, dy, BALL_RADIUS, self.paddle_x, self.paddle_y,
+                                    self.paddle_x + PADDLE_WIDTH, self.paddle_y + PADDLE_HEIGHT)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit + ('paddle', None)
+
+        # 移動する範囲と重なるブロック・敵だけを調べる
+        left = min(x, x + dx) - BALL_RADIUS
+        top = min(y, y + dy) - BALL_RADIUS
+        right = max(x, x + dx) + BALL_RADIUS
+        bottom = max(y, y + dy) + BALL_RADIUS
+        for kind, store in (('block', self.blocks), ('enemy', self.enemies)):
+            for index in store.find_in_rect(left, top, right, bottom).tolist():
+                target_x = float(store.x[index])
+                target_y = float(store.y[index])
+                hit = sweep_circle_rect(x, y, dx, dy, BALL_RADIUS, target_x, target_y,
+                                        target_x + float(store.width[index]),
+                                        target_y + float(store.height[index]))
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit + (kind, index)
+        return best
+
+    def move_ball_swept(self):
+        """玉を1フレーム分、移動を線分として当たり判定しながら動かす（continuous_collision 用）
+
+        最初に触れた物で反射させ、残りの移動を続ける。1フレームで複数のブロックを壊すこともある。
+        """
+        remaining = 1.0
+        for _ in range(MAX_SWEEP_HITS):
+            dx = self.ball_dx * remaining
+            dy = self.ball_dy * remaining
+            hit = self.find_first_ball_hit(dx, dy)
+            if hit is None:
+                self.ball_x += dx
+                self.ball_y += dy
+                return
+
+            t, nx, ny, kind, index = hit
+            self.ball_x += dx * t
+            self.ball_y += dy * t
+            remaining *= 1 - t
+            if kind == 'paddle':
+                self.reflect_ball_off_paddle()
+                continue
+
+            # 触れた面（角なら角からの向き）で反射
+            dot = self.ball_dx * nx + self.ball_dy * ny
+            self.ball_dx -= 2 * dot * nx
+            self.ball_dy -= 2 * dot * ny
+            if kind == 'wall':
+                continue
+            self.clamp_ball_angle()
+            if kind == 'block':
+                self.destroy_block(index)
+                self.score += 10
+            else:
+                self.destroy_enemy(index)
+                self.score += 20
+        # 衝突が多すぎるときは、残りの移動を捨てる
+
+    def spawn_balls(self, count):
+        """主の玉の位置から count 個の玉を、上向きに扇状に広げて出す"""
+        spread = min(self.paddle_max_tilt, math.pi / 2 - self.min_angle)
+        tilt = spread * (2 * np.arange(1, count + 1) / (count + 1) - 1)
+        self.balls.add(self.ball_x, self.ball_y,
+                       self.ball_speed * np.sin(tilt), -self.ball_speed * np.cos(tilt))
+
+    def move_extra_balls(self):
+        """増えた玉を全てまとめて1フレーム分動かし、壁・パドル・ブロック・敵との衝突を判定する
+
+        主の玉の後に、増えた玉を番号順に1つずつ動かしたのと同じ結果になる
+        （2つの玉が同じブロックに当たったときは、番号の小さい玉が壊す）。
+        continuous_collision でも、増えた玉はフレームごとの判定で動かす。
+        """
+        balls = self.balls
+        count = balls.count
+        x = balls.x[:count]
+        y = balls.y[:count]
+        dx = balls.dx[:count]
+        dy = balls.dy[:count]
+        x += dx
+        y += dy
+
+        # 壁
+        hit = x - BALL_RADIUS <= LEFT_WALL_X + WALL_THICKNESS
+        x[hit] = LEFT_WALL_X + WALL_THICKNESS + BALL_RADIUS
+        dx[hit] = np.abs(dx[hit])
+        hit = x + BALL_RADIUS >= self.right_wall_x
+        x[hit] = self.right_wall_x - BALL_RADIUS
+        dx[hit] = -np.abs(dx[hit])
+        hit = y - BALL_RADIUS <= TOP_WALL_Y + WALL_THICKNESS
+        y[hit] = TOP_WALL_Y + WALL_THICKNESS + BALL_RADIUS
+        dy[hit] = np.abs(dy[hit])
+
+        # パドル
+        hit = np.flatnonzero((y + BALL_RADIUS >= self.paddle_y) &
+                             (y - BALL_RADIUS <= self.paddle_y + PADDLE_HEIGHT) &
+                             (x + BALL_RADIUS >= self.paddle_x) &
+                             (x - BALL_RADIUS <= self.paddle_x + PADDLE_WIDTH))
+        if hit.size:
+            offset = ((x[hit] - self.paddle_x) / PADDLE_WIDTH - 0.5) * 2.0
+            dx[hit], dy[hit] = paddle_velocities(offset, self.ball_speed, self.paddle_max_tilt)
+            y[hit] = self.paddle_y - BALL_RADIUS
+
+        self.resolve_extra_ball_hits(self.blocks, self.destroy_block, 10)
+        self.resolve_extra_ball_hits(self.enemies, self.destroy_enemy, 20)
+
+    def resolve_extra_ball_hits(self, store, destroy, points):
+        """増えた玉と store（ブロック・敵）の当たりを、番号の小さい玉から順に処理したのと同じ結果に解決する
+
+        全ての玉の当たりをまとめて探し、同じ物に当たった玉のうち番号が最小の玉だけを当てる。
+        負けた玉のうち番号が最小のものより後ろの玉は、先の玉が壊した後の状態で探し直す（次の回）。
+        """
+        balls = self.balls
+        pending = np.arange(balls.count)
+        while pending.size:
+            x = balls.x[pending]
+            y = balls.y[pending]
+            hits = store.find_ball_hits(x - BALL_RADIUS, y - BALL_RADIUS, x + BALL_RADIUS, y + BALL_RADIUS)
+            found = hits >= 0
+            pending = pending[found]
+            hits = hits[found]
+            if pending.size == 0:
+                return
+            # 当たった物ごとに最初の玉（pending は番号順）
+            _, first = np.unique(hits, return_index=True)
+            winner = np.zeros(pending.size, dtype=bool)
+            winner[first] = True
+            if not winner.all():
+                # 負けた玉より後ろの玉の結果は、負けた玉が探し直すまで決まらない
+                winner[np.argmin(winner):] = False
+            balls_hit = pending[winner]
+            targets = hits[winner]
+            balls.dx[balls_hit], balls.dy[balls_hit] = bounce_velocities(
+                balls.x[balls_hit], balls.y[balls_hit], balls.dx[balls_hit], balls.dy[balls_hit],
+                store.x[targets].astype(np.float64), store.y[targets].astype(np.float64),
+                store.width[targets].astype(np.float64), store.height[targets].astype(np.float64),
+                self.min_angle)
+            for index in targets.tolist():
+                destroy(index)
+            self.score += points * len(targets)
+            pending = pending[~winner]
+
+    def check_enemy_trapped(self):
+        """敵がブロックに阻まれているかチェック（上下のブロック行にブロックが残っているか）
+
+        同じ列のブロックが壊れた敵だけを、残りブロック数のカウンタで判定する。
+        """
+        if not self.trap_check_pending:
+            return
+        enemies = self.enemies
+        for index in sorted(self.trap_check_pending):
+            if not enemies.active[index] or not enemies.trapped[index]:
+                continue
+            # 上下のブロック行にブロックが残っていれば阻まれている
+            # どちらかのブロック行が全て崩されていれば動けるようになる
+            if not (self.enemy_blocks_above[index] > 0 and self.enemy_blocks_below[index] > 0):
+                enemies.trapped[index] = False
+                self.events.append((EVENT_ENEMY_FREED, index))
+        self.trap_check_pending.clear()
+
+    def update_enemies(self):
+        """敵の移動（ギャラクシアン風 + 手前に移動）
+
+        動く敵をまとめて配列で処理する。ただし、このフレームで動きうる範囲が
+        他の敵と接している敵は、先に動いた敵の位置で結果が変わるので
+        番号順に1体ずつ move_enemies_in_order で動かす。動く敵が少ないときは全員1体ずつ。
+        """
+        enemies = self.enemies
+        moving = np.flatnonzero(enemies.active & ~enemies.trapped)
+        if moving.size == 0:
+            return
+
+        # タイマーを更新し、一定時間ごとに手前に移動を試みる
+        timer = enemies.move_down_timer[moving] + 1
+        move_down = timer >= self.enemy_move_down_interval
+        timer[move_down] = 0
+        enemies.move_down_timer[moving] = timer
+        if moving.size <= SMALL_ENEMY_COUNT:
+            self.move_enemies_in_order(moving.tolist(), move_down.tolist())
+            return
+
+        x = enemies.x[moving].astype(np.float64)
+        y = enemies.y[moving].astype(np.float64)
+        width = enemies.width[moving].astype(np.float64)
+        direction = enemies.direction[moving]
+        new_x = x + direction * enemies.speed[moving]
+
+        # このフレームで動きうる範囲（横移動・壁での折り返し・下移動を含む）で、他の敵と接するものを探す
+        alive = np.flatnonzero(enemies.active)
+        left = enemies.x[alive].astype(np.float64)
+        top = enemies.y[alive].astype(np.float64)
+        right = left + enemies.width[alive]
+        bottom = top + enemies.height[alive]
+        slot = np.searchsorted(alive, moving)
+        left[slot] = np.minimum(x, new_x)
+        right[slot] = np.maximum(x, new_x) + width
+        bottom[slot] += ENEMY_MOVE_DOWN_STEP
+        cell_size = max(float((right - left).max()), float((bottom - top).max()))
+        first, second = touching_pairs(left, top, right, bottom, cell_size)
+        touching = np.zeros(len(alive), dtype=bool)
+        touching[first] = True
+        touching[second] = True
+        crowded = touching[slot]
+
+        crowded_index = moving[crowded].tolist()
+        crowded_move_down = move_down[crowded].tolist()
+        neighbors = {index: [] for index in crowded_index}
+        for a, b in zip(alive[first].tolist(), alive[second].tolist()):
+            if a in neighbors and b not in neighbors[a]:
+                neighbors[a].append(b)
+            if b in neighbors and a not in neighbors[b]:
+                neighbors[b].append(a)
+
+        # 他の敵と接しない敵はまとめて動かす
+        free = ~crowded
+        index = moving[free]
+        x = x[free]
+        y = y[free]
+        width = width[free]
+        new_x = new_x[free]
+        move_down = move_down[free]
+        direction = direction[free]
+
+        # まず横方向の移動を試みる
+        valid = self.check_enemy_positions_clear(new_x, y)
+        blocked = ~valid
+        x = np.where(valid, new_x, x)
+        # 壁に当たったら方向転換
+        turn_right = blocked & (new_x <= LEFT_WALL_X + WALL_THICKNESS)
+        turn_left = blocked & ~turn_right & (new_x + width >= self.right_wall_x)
+        x[turn_right] = LEFT_WALL_X + WALL_THICKNESS
+        x[turn_left] = self.right_wall_x - width[turn_left]
+        direction[turn_right] = 1
+        direction[turn_left] = -1
+        # 横に移動できない場合は下に移動を試みる
+        move_down |= blocked
+        new_y = y + ENEMY_MOVE_DOWN_STEP
+        move_down &= self.check_enemy_positions_clear(x, new_y)
+
+        enemies.x[index] = x
+        enemies.y[index] = np.where(move_down, new_y, y)
+        enemies.direction[index] = direction
+
+        # 他の敵と接する敵は番号順に1体ずつ
+        self.move_enemies_in_order(crowded_index, crowded_move_down, neighbors)
+
+    def move_enemies_in_order(self, indices, move_downs, neighbors=None):
+        """敵を番号順に1体ずつ動かす（update_enemies の一部。タイマーは更新済み）
+
+        neighbors は敵の番号 -> このフレームで接しうる敵の番号のリスト。
+        省略すると生きている全ての敵と判定する。
+        座標は Python のリストに写して計算し、最後に配列に書き戻す。
+        """
+        enemies = self.enemies
+        xs = enemies.x.tolist()
+        ys = enemies.y.tolist()
+        widths = enemies.width.tolist()
+        heights = enemies.height.tolist()
+        directions = enemies.direction.tolist()
+        speeds = enemies.speed.tolist()
+        alive = np.flatnonzero(enemies.active).tolist()
+        boxes = [(x, y, x + width, y + height) for x, y, width, height in zip(xs, ys, widths, heights)]
+
+        for index, move_down in zip(indices, move_downs):
+            others = neighbors[index] if neighbors is not None else alive
+            x = xs[index]
+            y = ys[index]
+            width = widths[index]
+
+            # まず横方向の移動を試みる
+            new_x = x + directions[index] * speeds[index]
+
+            # 横方向の移動が有効かチェック
+            if (self.check_enemy_position_clear(new_x, y) and
+                    not self.check_enemy_neighbor_collision(new_x, y, others, boxes, index)):
+                x = new_x
+            else:
+                # 壁に当たったら方向転換
+                if new_x <= LEFT_WALL_X + WALL_THICKNESS:
+                    x = LEFT_WALL_X + WALL_THICKNESS
+                    directions[index] = 1
+                elif new_x + width >= self.right_wall_x:
+                    x = self.right_wall_x - width
+                    directions[index] = -1
+
+                # 横に移動できない場合は下に移動を試みる
+                move_down = True
+
+            # 下方向への移動を試みる
+            if move_down:
+                new_y = y + ENEMY_MOVE_DOWN_STEP
+                if (self.check_enemy_position_clear(x, new_y) and
+                        not self.check_enemy_neighbor_collision(x, new_y, others, boxes, index)):
+                    y = new_y
+
+            # 配列と同じ精度に丸めてから、後の敵の判定に使う
+            x = float(POSITION_DTYPE(x))
+            y = float(POSITION_DTYPE(y))
+            xs[index] = x
+            ys[index] = y
+            boxes[index] = (x, y, x + width, y + heights[index])
+
+        enemies.x[indices] = [xs[i] for i in indices]
+        enemies.y[indices] = [ys[i] for i in indices]
+        enemies.direction[indices] = [directions[i] for i in indices]
+
+    def check_level_clear(self):
+        """レベルクリア判定"""
+        # ブロックと敵が全て消えたかチェック
+        if self.blocks.live == 0 and self.enemies.live == 0:
+            self.level_cleared = True
+
+    def reset_ball(self):
+        """玉をリセット"""
+        self.ball_x = self.paddle_x + PADDLE_WIDTH // 2
+        self.ball_y = self.paddle_y - BALL_RADIUS - 5
+        ball_angle = -math.pi / 4
+        self.ball_dx = self.ball_speed * math.cos(ball_angle)
+        self.ball_dy = self.ball_speed * math.sin(ball_angle)
+        self.ball_active = False
+        self.balls.clear()
+        self.balls_pending = 0
+
+    def reset_game(self):
+        """ゲーム全体をリセット"""
+        self.lives = START_LIVES
+        self.score = 0
+        self.level_cleared = False
+        self.game_over = False
+        self.create_blocks()
+        self.create_enemies()
+        self.reset_ball()
+        self.events.append((EVENT_RESET, None))
+
+    def step(self, action=ACTION_NONE):
+        """1フレーム分ゲームを進める（描画・時計待ちはしない）
+
+        このフレームで起きた出来事は self.events に入る（次の step() で消える）。
+        """
+        self.frame += 1
+        self.events = []
+
+        # スペースキー
+        if action & ACTION_FIRE:
+            if self.game_over:
+                self.reset_game()
+            elif not self.ball_active:
+                self.ball_active = True
+
+        # キー入力（パドルの移動方向を追跡）
+        self.paddle_prev_x = self.paddle_x  # 前フレームの位置を保存
+        if action & ACTION_LEFT and self.paddle_x > LEFT_WALL_X + WALL_THICKNESS:
+            self.paddle_x -= self.paddle_speed
+            self.paddle_direction = -1  # 左に移動
+        elif action & ACTION_RIGHT and self.paddle_x + PADDLE_WIDTH < self.right_wall_x:
+            self.paddle_x += self.paddle_speed
+            self.paddle_direction = 1  # 右に移動
+        else:
+            self.paddle_direction = 0  # 停止
+        profiler = self.profiler
+        profiler.lap('paddle')
+
+        # 玉の移動
+        if self.ball_active and not self.game_over:
+            if self.continuous_collision:
+                self.move_ball_swept()
+            else:
+                self.ball_x += self.ball_dx
+                self.ball_y += self.ball_dy
+
+                # 衝突判定
+                self.check_ball_wall_collision()
+                self.check_ball_paddle_collision()
+                self.check_ball_block_collision()
+                self.check_ball_enemy_collision()
+
+            if self.balls.count:
+                self.move_extra_balls()
+                # 下に落ちた玉を消す
+                self.balls.remove(self.balls.y[:self.balls.count] > self.bottom_y)
+            if self.balls_pending:
+                self.spawn_balls(self.balls_pending)
+                self.balls_pending = 0
+
+            # 玉が下に落ちた
+            if self.ball_y > self.bottom_y and self.balls.count:
+                # 増えた玉が残っていれば、そのうち最初の玉を主の玉にする（ライフは減らない）
+                self.ball_x, self.ball_y, self.ball_dx, self.ball_dy = self.balls.pop_first()
+                self.events.append((EVENT_BALL_PROMOTED, None))
+            elif self.ball_y > self.bottom_y:
+                self.lives -= 1
+                if self.lives > 0:
+                    self.reset_ball()
+                else:
+                    # ゲームオーバー
+                    self.game_over = True
+                    self.ball_active = False
+        else:
+            if not self.game_over:
+                # 玉が発射されていない時はパドルに追従
+                self.ball_x = self.paddle_x + PADDLE_WIDTH // 2
+        profiler.lap('ball_physics')
+
+        # 敵の更新
+        if not self.game_over:
+            self.check_enemy_trapped()
+            profiler.lap('check_enemy_trapped')
+            self.update_enemies()
+            profiler.lap('update_enemies')
+
+        # レベルクリア判定
+        if not self.game_over:
+            self.check_level_clear()
+            profiler.lap('check_level_clear')
@@ -0,0 +1,306 @@
+"""ブロック・敵・増えた玉を NumPy の配列でまとめて持つ（1体ずつの dict ではなく、項目ごとの配列）
+
+座標は float32 の配列で持ち、比較・加算は float64 で行う（玉の座標は float64 のまま）。
+"""
+import bisect
+
+import numpy as np
+
+from spatial import CellIndex
+
+POSITION_DTYPE = np.float32
+
+# find_ball_hits で (玉の数 × 生きている敵の数) がこれ以下なら、セルで絞らずに全ての敵と比べる
+# （セルの索引を作る方が遅い。python -m benchmarks.enemy_hits で測った境目）
+HIT_CELL_PAIRS = 64000
+
+
+class BlockStore:
+    """格子状に並んだブロック
+
+    番号 i のブロックは (i // cols) 行目 (i % cols) 列目。全て同じ大きさ。
+    """
+
+    def __init__(self, col_x, row_y, width, height):
+        col_x = np.asarray(col_x, dtype=POSITION_DTYPE)
+        row_y = np.asarray(row_y, dtype=POSITION_DTYPE)
+        self.cols = len(col_x)
+        self.rows = len(row_y)
+        count = self.cols * self.rows
+
+        self.x = np.tile(col_x, self.rows)
+        self.y = np.repeat(row_y, self.cols)
+        self.width = np.full(count, width, dtype=POSITION_DTYPE)
+        self.height = np.full(count, height, dtype=POSITION_DTYPE)
+        self.active = np.ones(count, dtype=bool)
+        self.active_grid = self.active.reshape(self.rows, self.cols)  # 同じメモリを (行, 列) で見る
+        self.active_rows = [[True] * self.cols for _ in range(self.rows)]  # 1つずつ調べる用の写し
+
+        # 列・行の境界（float64）。格子なので二分探索で重なる範囲が求まる
+        self.col_left = col_x.astype(np.float64)
+        self.col_right = self.col_left + width
+        self.row_top = row_y.astype(np.float64)
+        self.row_bottom = self.row_top + height
+        self.col_left_list = self.col_left.tolist()
+        self.col_right_list = self.col_right.tolist()
+        self.row_top_list = self.row_top.tolist()
+        self.row_bottom_list = self.row_bottom.tolist()
+
+        # 列ごと・行ごと・全体の生きているブロックの数
+        self.col_live = [self.rows] * self.cols
+        self.row_live = [self.cols] * self.rows
+        self.live = count
+        self.live_table = None  # 生きているブロック数の二次元累積和（壊れたら作り直す）
+        self.version = 0  # 生きているブロックが変わるたびに増える（スナップショットで使い回せるか）
+
+    def __len__(self):
+        return len(self.active)
+
+    def kill(self, index):
+        """ブロックを壊す"""
+        self.active[index] = False
+        row, col = divmod(index, self.cols)
+        self.active_rows[row][col] = False
+        self.col_live[col] -= 1
+        self.row_live[row] -= 1
+        self.live -= 1
+        self.live_table = None
+        self.version += 1
+
+    def set_active(self, active):
+        """生きているブロックをまとめて置き換える（スナップショットから戻すとき）"""
+        self.active[:] = active
+        self.active_rows = self.active_grid.tolist()
+        self.col_live = self.active_grid.sum(axis=0).tolist()
+        self.row_live = self.active_grid.sum(axis=1).tolist()
+        self.live = int(self.active.sum())
+        self.live_table = None
+        self.version += 1
+
+    def find_ball_hit(self, left, top, right, bottom):
+        """範囲（端を含む）と重なる生きたブロックのうち番号が最小のものを返す（無ければ None）"""
+        c0 = bisect.bisect_left(self.col_right_list, left)
+        c1 = bisect.bisect_right(self.col_left_list, right)
+        if c0 >= c1:
+            return None
+        r0 = bisect.bisect_left(self.row_bottom_list, top)
+        r1 = bisect.bisect_right(self.row_top_list, bottom)
+        if r0 >= r1:
+            return None
+        hits = np.flatnonzero(self.active_grid[r0:r1, c0:c1])
+        if hits.size == 0:
+            return None
+        row, col = divmod(int(hits[0]), c1 - c0)
+        return (r0 + row) * self.cols + c0 + col
+
+    def find_ball_hits(self, left, top, right, bottom):
+        """find_ball_hit を範囲の配列に対してまとめて行う（番号の配列。無ければ -1）"""
+        hits = np.full(len(left), -1, dtype=np.int64)
+        if self.live == 0 or len(left) == 0:
+            return hits
+        c0 = np.searchsorted(self.col_right, left, side='left')
+        c1 = np.searchsorted(self.col_left, right, side='right')
+        r0 = np.searchsorted(self.row_bottom, top, side='left')
+        r1 = np.searchsorted(self.row_top, bottom, side='right')
+        # 玉はブロックより小さいので、範囲は数行・数列。行・列の順に調べ、最初に見つかったものが番号最小
+        rows = max(int((r1 - r0).max()), 0)
+        cols = max(int((c1 - c0).max()), 0)
+        for row_offset in range(rows):
+            row = r0 + row_offset
+            for col_offset in range(cols):
+                col = c0 + col_offset
+                candidate = (hits < 0) & (row < r1) & (col < c1)
+                index = np.where(candidate, row * self.cols + col, 0)
+                found = candidate & self.active[index]
+                hits[found] = index[found]
+        return hits
+
+    def find_in_rect(self, left, top, right, bottom):
+        """範囲（端を含む）と重なる生きたブロックの番号の配列（番号順）"""
+        c0 = bisect.bisect_left(self.col_right_list, left)
+        c1 = bisect.bisect_right(self.col_left_list, right)
+        r0 = bisect.bisect_left(self.row_bottom_list, top)
+        r1 = bisect.bisect_right(self.row_top_list, bottom)
+        if c0 >= c1 or r0 >= r1:
+            return np.zeros(0, dtype=np.int64)
+        rows, cols = np.nonzero(self.active_grid[r0:r1, c0:c1])
+        return (rows + r0) * self.cols + cols + c0
+
+    def overlaps_rect(self, x, y, width, height):
+        """矩形（端を含まない）と重なる生きたブロックがあるか"""
+        c0 = bisect.bisect_right(self.col_right_list, x)
+        c1 = bisect.bisect_left(self.col_left_list, x + width)
+        if c0 >= c1:
+            return False
+        r0 = bisect.bisect_right(self.row_bottom_list, y)
+        r1 = bisect.bisect_left(self.row_top_list, y + height)
+        if r0 >= r1:
+            return False
+        for row in self.active_rows[r0:r1]:
+            if True in row[c0:c1]:
+                return True
+        return False
+
+    def overlaps_rects(self, x, y, width, height):
+        """overlaps_rect を座標の配列に対してまとめて行う"""
+        if self.live == 0 or len(x) == 0:
+            return np.zeros(len(x), dtype=bool)
+        if self.live_table is None:
+            table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(self.active_grid, axis=0), axis=1, out=table[1:, 1:])
+            self.live_table = table
+        c0 = np.searchsorted(self.col_right, x, side='right')
+        c1 = np.searchsorted(self.col_left, x + width, side='left')
+        r0 = np.searchsorted(self.row_bottom, y, side='right')
+        r1 = np.searchsorted(self.row_top, y + height, side='left')
+        c1 = np.maximum(c0, c1)
+        r1 = np.maximum(r0, r1)
+        table = self.live_table
+        live = table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+        return live > 0
+
+
+class EnemyStore:
+    """敵
+
+    find_ball_hits は、玉と生きている敵が多ければ（HIT_CELL_PAIRS）、敵の左上の角があるセルの索引
+    （spatial.CellIndex）で組を絞る。敵は毎 tick 動くので、索引は呼ぶたびに作る。
+    """
+
+    def __init__(self, x, y, width, height, direction, speed=1):
+        count = len(x)
+        self.x = np.asarray(x, dtype=POSITION_DTYPE)
+        self.y = np.asarray(y, dtype=POSITION_DTYPE)
+        self.width = np.full(count, width, dtype=POSITION_DTYPE)
+        self.height = np.full(count, height, dtype=POSITION_DTYPE)
+        self.active = np.ones(count, dtype=bool)
+        self.trapped = np.ones(count, dtype=bool)  # 初期状態ではブロックに阻まれている
+        self.direction = np.asarray(direction, dtype=np.int8)  # 移動方向（1: 右, -1: 左）
+        self.speed = np.full(count, speed, dtype=np.int8)
+        self.move_down_timer = np.zeros(count, dtype=np.int16)  # 下に移動するタイマー
+        self.live = count
+
+    def __len__(self):
+        return len(self.active)
+
+    def kill(self, index):
+        """敵を倒す"""
+        self.active[index] = False
+        self.live -= 1
+
+    def find_ball_hit(self, left, top, right, bottom):
+        """範囲（端を含む）と重なる生きた敵のうち番号が最小のものを返す（無ければ None）"""
+        hit = (self.active &
+               (self.x <= np.float64(right)) &
+               (np.add(self.x, self.width, dtype=np.float64) >= left) &
+               (self.y <= np.float64(bottom)) &
+               (np.add(self.y, self.height, dtype=np.float64) >= top))
+        index = int(hit.argmax())
+        return index if hit[index] else None
+
+    def find_ball_hits(self, left, top, right, bottom):
+        """find_ball_hit を範囲の配列に対してまとめて行う（番号の配列。無ければ -1）"""
+        hits = np.full(len(left), -1, dtype=np.int64)
+        if len(left) == 0 or self.live == 0:
+            return hits
+        if len(left) * self.live > HIT_CELL_PAIRS:
+            return self.find_ball_hits_in_cells(left, top, right, bottom, hits)
+        candidates = np.flatnonzero(self.active)
+        x = self.x[candidates]
+        y = self.y[candidates]
+        hit = ((x <= right[:, None]) &
+               (np.add(x, self.width[candidates], dtype=np.float64) >= left[:, None]) &
+               (y <= bottom[:, None]) &
+               (np.add(y, self.height[candidates], dtype=np.float64) >= top[:, None]))
+        found = hit.any(axis=1)
+        hits[found] = candidates[hit[found].argmax(axis=1)]
+        return hits
+
+    def find_ball_hits_in_cells(self, left, top, right, bottom, hits):
+        """find_ball_hits をセルで絞った (玉, 敵) の組で行う"""
+        alive = np.flatnonzero(self.active)
+        cells = CellIndex(self.x[alive], self.y[alive], alive, float(self.width.max()), float(self.height.max()))
+        query, candidate = cells.pairs(left, top, right, bottom)
+        x = self.x[candidate]
+        y = self.y[candidate]
+        hit = ((x <= right[query]) &
+               (np.add(x, self.width[candidate], dtype=np.float64) >= left[query]) &
+               (y <= bottom[query]) &
+               (np.add(y, self.height[candidate], dtype=np.float64) >= top[query]))
+        # 玉ごとに重なる敵の番号の最小
+        best = np.full(len(left), len(self.active), dtype=np.int64)
+        np.minimum.at(best, query[hit], candidate[hit])
+        found = best < len(self.active)
+        hits[found] = best[found]
+        return hits
+
+    def find_in_rect(self, left, top, right, bottom):
+        """範囲（端を含む）と重なる生きた敵の番号の配列（番号順）"""
+        hit = (self.active &
+               (self.x <= np.float64(right)) &
+               (np.add(self.x, self.width, dtype=np.float64) >= left) &
+               (self.y <= np.float64(bottom)) &
+               (np.add(self.y, self.height, dtype=np.float64) >= top))
+        return np.flatnonzero(hit)
+
+    def overlaps_rect(self, x, y, width, height, exclude=None):
+        """矩形（端を含まない）と重なる生きた敵がいるか（exclude の番号は除く）"""
+        hit = (self.active &
+               (np.float64(x + width) > self.x) &
+               (np.float64(x) < np.add(self.x, self.width, dtype=np.float64)) &
+               (np.float64(y + height) > self.y) &
+               (np.float64(y) < np.add(self.y, self.height, dtype=np.float64)))
+        if exclude is not None:
+            hit[exclude] = False
+        return bool(hit.any())
+
+
+class BallStore:
+    """マルチボールで増えた玉（出た順に並べ、消えた玉の分は詰める）
+
+    x, y, dx, dy は容量分の float64 の配列で、先頭 count 個が使われている。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.count = 0
+        self.removed = 0  # これまでに消した玉の数（詰めて番号がずれたかを見るため）
+
+    def __len__(self):
+        return self.count
+
+    def add(self, x, y, dx, dy):
+        """玉をまとめて加える（x, y は1つの値でもよい。容量を超える分は加えない）。加えた数を返す"""
+        count = min(len(dx), self.capacity - self.count)
+        end = self.count + count
+        self.x[self.count:end] = np.broadcast_to(x, len(dx))[:count]
+        self.y[self.count:end] = np.broadcast_to(y, len(dx))[:count]
+        self.dx[self.count:end] = dx[:count]
+        self.dy[self.count:end] = dy[:count]
+        self.count = end
+        return count
+
+    def remove(self, mask):
+        """mask（先頭 count 個分の bool の配列）が True の玉を消し、残りを順番のまま詰める"""
+        keep = np.flatnonzero(~mask)
+        for values in (self.x, self.y, self.dx, self.dy):
+            values[:len(keep)] = values[keep]
+        self.removed += self.count - len(keep)
+        self.count = len(keep)
+
+    def pop_first(self):
+        """最初の玉を取り出して (x, y, dx, dy) を返す"""
+        ball = (float(self.x[0]), float(self.y[0]), float(self.dx[0]), float(self.dy[0]))
+        mask = np.zeros(self.count, dtype=bool)
+        mask[0] = True
+        self.remove(mask)
+        return ball
+
+    def clear(self):
+        """全て消す"""
+        self.removed += self.count
+        self.count = 0
@@ -0,0 +1,130 @@
+"""学習用の画素の観測（作っておいた NumPy の配列に読み、コピーを増やさない）
+
+    observer = ObservationRenderer((84, 84), grayscale=True)
+    stack = FrameStack(observer.shape, depth=4)
+    stack.reset(observer.render(game))
+    ...
+    game.step(action)
+    stack.push(observer.render(game))
+    stack.frames   # (4, 84, 84) の配列（古い順。コピーではない）
+
+ObservationRenderer は Renderer（main.py と同じ描画）に scale = 観測の幅 / 画面の幅 を渡して、
+観測の解像度の面に直接描く（800×600 で描いてから縮小しない）。縦横比が観測と違えば
+ScreenCapture で観測の大きさに合わせ、grayscale なら明るさに変換する。
+"""
+import numpy as np
+import pygame
+
+from engine import SCREEN_WIDTH, SCREEN_HEIGHT
+from renderer import Renderer
+from text_cache import get_font
+
+# 明るさへの変換の重み（ITU-R BT.601 を 256 倍した整数）
+LUMA_WEIGHTS = (77, 150, 29)
+
+
+class ObservationRenderer:
+    """Renderer で観測の解像度に描き、画素の配列を返す"""
+
+    def __init__(self, size, grayscale=False, images=None):
+        """size は観測の (幅, 高さ)。images は Renderer に渡す画像（無ければ図形で描く）"""
+        self.size = tuple(size)
+        self.grayscale = grayscale
+        width, height = self.size
+        self.shape = (height, width) if grayscale else (height, width, 3)
+        scale = width / SCREEN_WIDTH
+        self.target = pygame.Surface((width, max(1, round(SCREEN_HEIGHT * scale))), depth=32)
+        self.renderer = Renderer(self.target, get_font(None, 36), get_font(None, 24), images, scale=scale)
+        # タイルの背景は縮小すると模様がちらつくので1色で塗る
+        self.renderer.set_background(False)
+        self.capture = ScreenCapture(self.target, self.size, grayscale)
+        # 大きさも色も変えないときは、描いた面のビューのままだと面がロックされて次に描けないので写す
+        self.pixels = None
+        if self.capture.target is None and not grayscale:
+            self.pixels = np.zeros(self.shape, dtype=np.uint8)
+
+    def render(self, game):
+        """game を描き、画素の配列を返す（毎回同じ配列。次に描くと中身が変わる）"""
+        self.renderer.render(game)
+        pixels = self.capture.capture()
+        if self.pixels is not None:
+            self.pixels[...] = pixels
+            return self.pixels
+        return pixels
+
+
+class ScreenCapture:
+    """Renderer が描いた面を、観測の大きさ・グレースケールにして配列で読む
+
+    大きさを変えるときは、作っておいた面に pygame.transform.scale で直接縮小する。
+    グレースケールは作っておいた配列に明るさを計算して書く。どちらも毎回同じ配列を返す。
+    大きさも色も変えないときは、元の面の画素のビューを返す（コピーしない）。
+    元の面は、ビューが残っている間ロックされて blit できないので、次に描く前に手放すこと。
+    """
+
+    def __init__(self, source, size=None, grayscale=False):
+        self.source = source
+        self.size = tuple(size) if size is not None else None
+        self.grayscale = grayscale
+        self.target = None
+        self.rgb = None
+        if self.size is not None and self.size != source.get_size():
+            self.target = pygame.Surface(self.size, depth=32)
+            self.rgb = np.swapaxes(pygame.surfarray.pixels3d(self.target), 0, 1)
+        width, height = self.size or source.get_size()
+        if grayscale:
+            self.gray = np.zeros((height, width), dtype=np.uint8)
+            self.work = np.zeros((height, width), dtype=np.uint16)
+            self.work_channel = np.zeros((height, width), dtype=np.uint16)
+
+    def capture(self):
+        """今の画面を読み、画素の配列を返す"""
+        if self.target is not None:
+            pygame.transform.scale(self.source, self.size, self.target)
+            rgb = self.rgb
+        else:
+            rgb = np.swapaxes(pygame.surfarray.pixels3d(self.source), 0, 1)
+        if not self.grayscale:
+            return rgb
+
+        # (77 R + 150 G + 29 B) >> 8 を、作っておいた配列の中で計算する
+        work = self.work
+        channel = self.work_channel
+        np.multiply(rgb[..., 0], LUMA_WEIGHTS[0], out=work, dtype=np.uint16)
+        for index in (1, 2):
+            np.multiply(rgb[..., index], LUMA_WEIGHTS[index], out=channel, dtype=np.uint16)
+            work += channel
+        work >>= 8
+        self.gray[...] = work
+        return self.gray
+
+
+class FrameStack:
+    """直近 depth 枚の観測を重ねたもの（作っておいたメモリを使い回す）
+
+    2 * depth 枚分のバッファの i 番目と i + depth 番目の両方に書くことで、
+    古い順に並んだ depth 枚が常にバッファの連続した範囲になり、コピーせずにビューで読める。
+    """
+
+    def __init__(self, shape, depth=4, dtype=np.uint8):
+        self.depth = depth
+        self.buffer = np.zeros((2 * depth,) + tuple(shape), dtype=dtype)
+        self.position = 0  # 次に書く場所（0〜depth-1）
+
+    def reset(self, frame):
+        """全ての枚を frame にする（エピソードの最初）"""
+        self.buffer[...] = frame
+        self.position = 0
+
+    def push(self, frame):
+        """新しい観測を加える（一番古いものが消える）"""
+        position = self.position
+        self.buffer[position] = frame
+        self.buffer[position + self.depth] = frame
+        self.position = (position + 1) % self.depth
+
+    @property
+    def frames(self):
+        """(depth, ...) の配列（古い順。バッファのビューなので、次の push で中身が変わる）"""
+        start = self.position
+        return self.buffer[start:start + self.depth]
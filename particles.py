@@ -0,0 +1,211 @@
+"""ブロック・敵が壊れたときの破片・爆発のパーティクル
+
+    particles = ParticleSystem()
+    renderer.particles = particles
+    ...
+    game.step(action)
+    spawn_destruction(particles, game, game.events)   # 出来事から破片を出す
+    particles.update()                                # 1 tick 分動かす
+    ...
+    renderer.render(game)                             # Surface.blits 1回で描く
+    particles.adapt(frame_seconds)                    # フレームの時間から予算を決め直す
+
+パーティクルは容量分の配列（位置・速度・経過 tick・寿命・種類）の先頭 count 個に詰めて持ち、
+1つずつのオブジェクトは作らない。動かす・寿命で消すのは配列の計算1回で行う。
+描く絵は種類ごと・薄くなる段階ごとに最初に作っておく。
+
+予算（同時に出せる数）は、フレームの時間が FRAME_BUDGET を超え、そのうちパーティクルに
+かかった時間が SHRINK_SHARE 以上なら半分にし（超えた分はすぐに古い順に消す）、余裕があれば少しずつ戻す。
+パーティクル以外が重くて超えたときは予算を変えない。戻すときは、測っておいた
+1個あたりの時間から、他の処理の時間と合わせて FRAME_BUDGET * HEADROOM に収まる数までにする。
+描画が重いときはパーティクルから先に減るので、パーティクルのせいでフレームが 16ms を超え続けることはない。
+"""
+import time
+
+import numpy as np
+import pygame
+
+from engine import EVENT_BLOCK_DESTROYED, EVENT_ENEMY_DESTROYED, EVENT_RESET
+from renderer import GREEN, WHITE, RED, ORANGE, YELLOW
+
+PARTICLE_CAPACITY = 4096
+FRAME_BUDGET = 1 / 60          # 1フレームの時間の上限（秒）
+HEADROOM = 0.75                # フレームの時間がこの割合より短ければ予算を戻す
+BUDGET_SHRINK = 0.5            # 上限を超えたときに予算に掛ける値
+SHRINK_SHARE = 0.1             # 上限を超えたフレームのうち、パーティクルの時間がこの割合以上なら予算を減らす
+BUDGET_GROW = 64               # 余裕があるときに1フレームで増やす数
+INITIAL_BUDGET = 256           # 最初の予算（1個あたりの時間を測るまでは控えめにする）
+MIN_BUDGET = 0
+COST_SMOOTHING = 0.9           # 1個あたりの時間の移動平均で、前の値に掛ける重み
+GRAVITY = 0.15                 # 1 tick あたりの下向きの加速
+FADE_LEVELS = 4                # 薄くなる段階の数
+
+# 種類ごとの (色, 大きさ)
+PARTICLE_KINDS = (
+    (GREEN, 4),   # ブロックの破片
+    (WHITE, 3),   # ブロックの破片（枠）
+    (RED, 5),     # 敵の爆発
+    (ORANGE, 4),
+    (YELLOW, 3),
+)
+DEBRIS_KINDS = (0, 1)
+EXPLOSION_KINDS = (2, 3, 4)
+# 1回に出す数・速さ（1 tick あたりの画素）・寿命（tick）
+DEBRIS_COUNT = 12
+DEBRIS_SPEED = (1.0, 3.0)
+DEBRIS_LIFE = (20, 40)
+EXPLOSION_COUNT = 24
+EXPLOSION_SPEED = (1.5, 5.0)
+EXPLOSION_LIFE = (15, 35)
+
+
+def make_sprites(scale=1.0):
+    """種類ごと・薄くなる段階ごとの絵（[種類][段階]。大きさは scale 倍、1画素より小さくはしない）"""
+    sprites = []
+    for color, size in PARTICLE_KINDS:
+        size = max(1, round(size * scale))
+        levels = []
+        for level in range(FADE_LEVELS):
+            sprite = pygame.Surface((size, size))
+            sprite.fill(color)
+            # 面全体のアルファは画素ごとのアルファより速く描ける
+            sprite.set_alpha(255 * (FADE_LEVELS - level) // FADE_LEVELS)
+            levels.append(sprite)
+        sprites.append(levels)
+    return sprites
+
+
+class ParticleSystem:
+    """容量の決まったパーティクルの置き場（先頭 count 個が生きている）"""
+
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.dx = np.zeros(capacity, dtype=np.float32)
+        self.dy = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.int16)
+        self.life = np.ones(capacity, dtype=np.int16)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.count = 0
+        self.budget = min(capacity, INITIAL_BUDGET)  # 今出せる数（adapt で変わる）
+        self.shed = 0           # 予算を超えて出さなかった・消した数
+        self.spent = 0.0        # 前の adapt 以降に update・draw にかかった時間（秒）
+        self.drawn = 0          # 前の adapt 以降に描いた数
+        self.cost = 0.0         # 1個あたりの update・draw の時間（秒。移動平均）
+        self.rng = np.random.default_rng(seed)
+        self.sprites = None     # 描くときに作る（pygame の初期化の後）
+        self.sprite_scale = None  # sprites を作ったときの倍率
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, count, kinds, speed, life):
+        """(x, y) から count 個を四方に出す（予算を超える分は出さない）。出した数を返す"""
+        wanted = count
+        count = max(0, min(count, self.budget - self.count))
+        self.shed += wanted - count
+        if count == 0:
+            return 0
+        start, end = self.count, self.count + count
+        rng = self.rng
+        angle = rng.uniform(0, 2 * np.pi, count)
+        velocity = rng.uniform(speed[0], speed[1], count)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.dx[start:end] = velocity * np.cos(angle)
+        self.dy[start:end] = velocity * np.sin(angle)
+        self.age[start:end] = 0
+        self.life[start:end] = rng.integers(life[0], life[1], count, endpoint=True)
+        self.kind[start:end] = rng.choice(kinds, count)
+        self.count = end
+        return count
+
+    def update(self):
+        """1 tick 分動かし、寿命の尽きたものを消す"""
+        count = self.count
+        if count == 0:
+            return
+        start = time.perf_counter()
+        self.dy[:count] += GRAVITY
+        self.x[:count] += self.dx[:count]
+        self.y[:count] += self.dy[:count]
+        self.age[:count] += 1
+        alive = self.age[:count] < self.life[:count]
+        if not alive.all():
+            self.keep(np.flatnonzero(alive))
+        self.spent += time.perf_counter() - start
+
+    def keep(self, indices):
+        """indices（番号順）のものだけを残して詰める"""
+        for values in (self.x, self.y, self.dx, self.dy, self.age, self.life, self.kind):
+            values[:len(indices)] = values[indices]
+        self.count = len(indices)
+
+    def clear(self):
+        """全て消す"""
+        self.count = 0
+
+    def adapt(self, frame_seconds):
+        """1フレームの時間（秒。時計待ちは含めない）から予算を決め直す"""
+        spent = self.spent
+        if self.drawn:
+            cost = spent / self.drawn
+            self.cost = cost if self.cost == 0 else COST_SMOOTHING * self.cost + (1 - COST_SMOOTHING) * cost
+        self.spent = 0.0
+        self.drawn = 0
+
+        if frame_seconds > FRAME_BUDGET:
+            if spent < frame_seconds * SHRINK_SHARE:
+                # パーティクルのせいではない
+                return
+            self.budget = max(MIN_BUDGET, int(self.budget * BUDGET_SHRINK))
+            if self.count > self.budget:
+                # 古いもの（先頭）から消す
+                self.shed += self.count - self.budget
+                self.keep(np.arange(self.count - self.budget, self.count))
+        elif frame_seconds < FRAME_BUDGET * HEADROOM:
+            budget = self.budget + BUDGET_GROW
+            if self.cost > 0:
+                # 他の処理の時間と合わせて FRAME_BUDGET * HEADROOM に収まる数まで
+                other = frame_seconds - spent
+                budget = min(budget, int((FRAME_BUDGET * HEADROOM - other) / self.cost))
+            self.budget = max(MIN_BUDGET, min(self.capacity, budget))
+
+    def draw(self, surface, scale=1.0):
+        """Surface.blits 1回で描き、描いた範囲のリストを返す（scale はゲームの座標から面への倍率）"""
+        count = self.count
+        if count == 0:
+            return []
+        if scale != self.sprite_scale:
+            # 倍率が変わったら（最初・AdaptiveQuality が内部の解像度を変えたとき）作り直す
+            self.sprites = make_sprites(scale)
+            self.sprite_scale = scale
+        start = time.perf_counter()
+        fade = (self.age[:count] * FADE_LEVELS // self.life[:count]).tolist()
+        sprites = self.sprites
+        rects = surface.blits([(sprites[kind][level], (x, y)) for kind, level, x, y in
+                               zip(self.kind[:count].tolist(), fade,
+                                   (self.x[:count] * scale).astype(np.int32).tolist(),
+                                   (self.y[:count] * scale).astype(np.int32).tolist())])
+        self.spent += time.perf_counter() - start
+        self.drawn += count
+        return rects
+
+
+def spawn_destruction(particles, game, events):
+    """ブロックが壊れたら破片、敵を倒したら爆発を出す（ステージを作り直したら全て消す）"""
+    for kind, index in events:
+        if kind == EVENT_BLOCK_DESTROYED:
+            store, kinds, count, speed, life = game.blocks, DEBRIS_KINDS, DEBRIS_COUNT, DEBRIS_SPEED, DEBRIS_LIFE
+        elif kind == EVENT_ENEMY_DESTROYED:
+            store, kinds, count, speed, life = (game.enemies, EXPLOSION_KINDS, EXPLOSION_COUNT,
+                                                EXPLOSION_SPEED, EXPLOSION_LIFE)
+        elif kind == EVENT_RESET:
+            particles.clear()
+            continue
+        else:
+            continue
+        x = float(store.x[index]) + float(store.width[index]) / 2
+        y = float(store.y[index]) + float(store.height[index]) / 2
+        particles.emit(x, y, count, kinds, speed, life)
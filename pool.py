@@ -0,0 +1,100 @@
+"""容量が決まった弾・敵などの置き場（配列で持ち、撃つたびにオブジェクトを作らない）
+
+    bullets = Pool(256)
+    index = bullets.spawn(x, y, 0, -3)   # 空きが無ければ -1
+    bullets.move()
+    bullets.release(np.flatnonzero(bullets.active & (bullets.y <= 0)))
+
+位置・速度・生きているかを容量分の配列で最初に作っておき、空いている番号を
+スタック（free の先頭 free_count 個）に積んでおく。出すときはスタックから1つ取り、
+消すときは番号を積み戻すだけなので、数が増えても配列を作り直さない。
+"""
+import numpy as np
+
+POOL_DTYPE = np.float32
+
+
+class Pool:
+    """位置 (x, y) と速度 (dx, dy) を持つ物の置き場"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=POOL_DTYPE)
+        self.y = np.zeros(capacity, dtype=POOL_DTYPE)
+        self.dx = np.zeros(capacity, dtype=POOL_DTYPE)
+        self.dy = np.zeros(capacity, dtype=POOL_DTYPE)
+        self.active = np.zeros(capacity, dtype=bool)
+        # 空いている番号（小さい番号から使うように、逆順に積む）
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int64)
+        self.free_count = capacity
+
+    def __len__(self):
+        """生きている数"""
+        return self.capacity - self.free_count
+
+    def spawn(self, x, y, dx, dy):
+        """1つ出して番号を返す（空きが無ければ -1）"""
+        if self.free_count == 0:
+            return -1
+        self.free_count -= 1
+        index = int(self.free[self.free_count])
+        self.x[index] = x
+        self.y[index] = y
+        self.dx[index] = dx
+        self.dy[index] = dy
+        self.active[index] = True
+        return index
+
+    def spawn_many(self, x, y, dx, dy):
+        """まとめて出して番号の配列を返す（空きが足りなければ出せる分だけ）"""
+        count = min(len(x), self.free_count)
+        start = self.free_count - count
+        indices = self.free[start:self.free_count][::-1].copy()
+        self.free_count = start
+        self.x[indices] = x[:count]
+        self.y[indices] = y[:count]
+        self.dx[indices] = np.broadcast_to(dx, len(x))[:count]
+        self.dy[indices] = np.broadcast_to(dy, len(x))[:count]
+        self.active[indices] = True
+        return indices
+
+    def release(self, indices):
+        """番号の配列（重複なし・生きているもの）を消して空きに戻す"""
+        count = len(indices)
+        if count == 0:
+            return
+        self.active[indices] = False
+        self.free[self.free_count:self.free_count + count] = indices
+        self.free_count += count
+
+    def clear(self):
+        """全て消す"""
+        self.active[:] = False
+        self.free[:] = np.arange(self.capacity - 1, -1, -1)
+        self.free_count = self.capacity
+
+    def move(self):
+        """全てを速度の分だけ動かす（消えているものも動くが、使われないので構わない）"""
+        self.x += self.dx
+        self.y += self.dy
+
+
+def find_hits(shots, targets, distance):
+    """shots と targets の生きている物で、中心の距離が distance より近い組を探す
+
+    (shots の番号の配列, targets の番号の配列) を返す。全ての組の距離の2乗を1回の配列の計算で
+    求めて distance の2乗と比べる（平方根は取らない）。1つの弾は番号の一番小さい的に当たり、
+    同じ的に複数の弾が当たったときは番号の一番小さい弾だけが当たる（残りの弾はそのまま飛ぶ）。
+    """
+    shot_indices = np.flatnonzero(shots.active)
+    target_indices = np.flatnonzero(targets.active)
+    if len(shot_indices) == 0 or len(target_indices) == 0:
+        return shot_indices[:0], target_indices[:0]
+    gap_x = shots.x[shot_indices, None] - targets.x[None, target_indices]
+    gap_y = shots.y[shot_indices, None] - targets.y[None, target_indices]
+    hit = gap_x * gap_x + gap_y * gap_y < distance * distance
+    shot_hit = np.flatnonzero(hit.any(axis=1))
+    target_hit = hit[shot_hit].argmax(axis=1)
+    # 同じ的に当たった弾のうち最初のもの（shot_hit は番号順）
+    target_hit, first = np.unique(target_hit, return_index=True)
+    return shot_indices[shot_hit[first]], target_indices[target_hit]
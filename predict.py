@@ -0,0 +1,188 @@
+"""玉の軌道の予測と、それを使う自動操縦（画面無しの実行・ソークテストの基準のプレイヤー用）
+
+    x, ticks = predict_landing(game)      # 玉がパドルの高さに達する位置と、それまでの tick 数
+    game.step(autopilot_action(game))
+
+1 tick ずつ動かさずに、左・右・上の壁での跳ね返りを式で畳み込む。check_ball_wall_collision と
+同じく、壁を越えた tick で玉を壁の位置に置き直して向きを変えるので、ブロック・敵に当たらなければ
+実際に玉がパドルの高さ（ball_y + BALL_RADIUS >= paddle_y）に達する tick とそのときの x に一致する。
+GameEngine にも VectorGameEngine にも使え、後者なら全てのゲームをまとめて配列で予測する。
+
+predict_landing_with_blocks は生きているブロックでの跳ね返りも含めた予測（GameEngine 用）。
+線分の当たり判定で跳ね返りを辿る近似で、壊したブロックは無くなったものとして扱う。
+"""
+import math
+
+import numpy as np
+
+from collision import sweep_circle_rect, sweep_circle_walls
+from engine import (
+    LEFT_WALL_X, TOP_WALL_Y, WALL_THICKNESS, PADDLE_WIDTH, BALL_RADIUS, BLOCK_START_Y,
+    ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE,
+)
+
+# ブロックを含めた予測で辿る跳ね返りの最大数
+MAX_PREDICT_BOUNCES = 32
+# 自動操縦: 玉を残っているブロックの方へ打ち返すために、パドルの中央からずらして当てる量
+# （パドルの半分の幅に対する割合。端に寄りすぎると取りこぼすので AIM_LIMIT まで）
+AIM_LIMIT = 0.7
+# 真ん中に当てると真上に跳ねて同じ所を往復し続けるので、少なくともこれだけずらす
+MIN_AIM = 0.25
+# 狙うブロックを変える間隔（tick）
+RETARGET_FRAMES = 300
+
+
+def wall_bounds(game):
+    """玉の中心が動ける範囲 (左端, 右端, 上端) と、パドルの高さに達したとみなす中心の y"""
+    return (LEFT_WALL_X + WALL_THICKNESS + BALL_RADIUS, game.right_wall_x - BALL_RADIUS,
+            TOP_WALL_Y + WALL_THICKNESS + BALL_RADIUS, game.paddle_y - BALL_RADIUS)
+
+
+def fold_position(position, velocity, steps, low, high):
+    """low〜high の間を velocity で steps 回動いた後の位置（配列可）
+
+    check_ball_wall_collision と同じく、範囲を越えた回に端に置き直して向きを変える。
+    """
+    position = np.asarray(position, dtype=np.float64)
+    velocity = np.asarray(velocity, dtype=np.float64)
+    speed = np.abs(velocity)
+    moving = speed > 0
+    safe_speed = np.where(moving, speed, 1.0)
+    # 最初に当たる壁と、そこに置き直される回（端に接しているときも次の回）
+    first_wall = np.where(velocity > 0, high, low)
+    other_wall = np.where(velocity > 0, low, high)
+    first = np.maximum(1, np.ceil(np.abs(first_wall - position) / safe_speed))
+    # 壁から反対の壁に置き直されるまでの回数
+    crossing = np.maximum(1, np.ceil((high - low) / safe_speed))
+    laps, rest = np.divmod(np.maximum(steps - first, 0), crossing)
+    # laps が偶数なら最初の壁から、奇数なら反対の壁から rest 回進んだ所
+    from_first = laps % 2 == 0
+    start = np.where(from_first, first_wall, other_wall)
+    direction = np.where(velocity > 0, -1.0, 1.0) * np.where(from_first, 1.0, -1.0)
+    bounced = start + direction * rest * speed
+    return np.where(moving & (steps >= first), bounced, position + velocity * steps)
+
+
+def predict_landing(game):
+    """玉（配列可）がパドルの高さに達する x と、それまでの tick 数を返す
+
+    ブロック・敵は無いものとして、壁での跳ね返りだけを含める。もうパドルの高さより下にある玉、
+    真横に動いている玉は今の x と 0 を返す。発射されていない玉も同じ式で計算する（意味は無い）。
+    """
+    left, right, top, target = wall_bounds(game)
+    y = np.asarray(game.ball_y, dtype=np.float64)
+    dy = np.asarray(game.ball_dy, dtype=np.float64)
+    speed = np.where(dy != 0, np.abs(dy), 1.0)
+    # 下向き: そのまま達するまで。上向き: 上の壁に置き直されるまでと、そこから達するまで
+    down = np.maximum(0, np.ceil((target - y) / speed))
+    up = np.maximum(1, np.ceil((y - top) / speed)) + np.ceil((target - top) / speed)
+    ticks = np.where(dy > 0, down, np.where(dy < 0, up, 0))
+    x = fold_position(game.ball_x, game.ball_dx, ticks, left, right)
+    if x.ndim == 0:
+        return float(x), int(ticks)
+    return x, ticks.astype(np.int64)
+
+
+def predict_landing_with_blocks(game, max_bounces=MAX_PREDICT_BOUNCES):
+    """GameEngine の玉が、生きているブロックでも跳ね返ってパドルの高さに達する x と tick 数
+
+    ブロックでの跳ね返りは面（角なら角からの向き）での反射として近似し、最小角度の補正はしない。
+    敵は動くので含めない。max_bounces 回跳ね返っても達しなければ、その時点の x を返す。
+    """
+    left_wall = LEFT_WALL_X + WALL_THICKNESS
+    top_wall = TOP_WALL_Y + WALL_THICKNESS
+    _, _, _, target = wall_bounds(game)
+    blocks = game.blocks
+    x, y = float(game.ball_x), float(game.ball_y)
+    dx, dy = float(game.ball_dx), float(game.ball_dy)
+    speed = math.hypot(dx, dy)
+    if speed == 0:
+        return x, 0
+    # 1回に辿る長さ（tick 数）: 画面の端から端まで届く長さ
+    horizon = game.bottom_y / speed + 1
+    broken = set()
+    ticks = 0.0
+    for _ in range(max_bounces):
+        move_x, move_y = dx * horizon, dy * horizon
+        best = sweep_circle_walls(x, y, move_x, move_y, BALL_RADIUS, left_wall, top_wall, game.right_wall_x)
+        if best is not None:
+            best = best + (None,)
+        if dy > 0:
+            t = max(0.0, (target - y) / move_y)
+            if best is None or t <= best[0]:
+                return x + move_x * t, math.ceil(ticks + horizon * t)
+        for index in blocks.find_in_rect(min(x, x + move_x) - BALL_RADIUS, min(y, y + move_y) - BALL_RADIUS,
+                                         max(x, x + move_x) + BALL_RADIUS,
+                                         max(y, y + move_y) + BALL_RADIUS).tolist():
+            if index in broken:
+                continue
+            block_x = float(blocks.x[index])
+            block_y = float(blocks.y[index])
+            hit = sweep_circle_rect(x, y, move_x, move_y, BALL_RADIUS, block_x, block_y,
+                                    block_x + float(blocks.width[index]), block_y + float(blocks.height[index]))
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit + (index,)
+        if best is None:
+            # 上向きで何にも当たらない（画面外）: 見込みが無いので今の位置を返す
+            break
+
+        t, nx, ny, index = best
+        x += move_x * t
+        y += move_y * t
+        ticks += horizon * t
+        dot = dx * nx + dy * ny
+        dx -= 2 * dot * nx
+        dy -= 2 * dot * ny
+        if index is not None:
+            broken.add(index)
+    return x, math.ceil(ticks)
+
+
+def block_target(game):
+    """狙う生きたブロックの中心 (x, y)（配列可）。無ければ壁の間の真ん中の上の方
+
+    同じブロックを狙い続けると、跳ね返り方によっては届かないまま往復し続けるので、
+    RETARGET_FRAMES ごとに生きたブロックを順に狙い直す。
+    """
+    if hasattr(game, 'block_active'):
+        # VectorGameEngine
+        active = game.block_active
+        x = game.block_x + game.block_width / 2
+        y = game.block_y + game.block_height / 2
+    else:
+        blocks = game.blocks
+        active = blocks.active
+        x = np.add(blocks.x, blocks.width / 2, dtype=np.float64)
+        y = np.add(blocks.y, blocks.height / 2, dtype=np.float64)
+    count = active.sum(axis=-1)
+    nth = (game.frame // RETARGET_FRAMES) % np.maximum(count, 1)
+    # nth 番目の生きたブロック
+    index = np.argmax(np.cumsum(active, axis=-1) > np.expand_dims(nth, -1), axis=-1)
+    middle = (LEFT_WALL_X + WALL_THICKNESS + game.right_wall_x) / 2
+    return np.where(count > 0, x[index], middle), np.where(count > 0, y[index], BLOCK_START_Y)
+
+
+def autopilot_action(game, landing_x=None):
+    """予測した落下位置で玉を受け、残っているブロックの方へ打ち返す入力
+
+    GameEngine なら int、VectorGameEngine なら配列を返す。landing_x を渡さなければ
+    predict_landing で予測する。玉が発射されていなければ発射する。
+    """
+    if landing_x is None:
+        landing_x, _ = predict_landing(game)
+    # パドルの中央から offset（-1〜1）ずれた所に当たると、その向きに tilt だけ傾いて跳ねる
+    target_x, target_y = block_target(game)
+    aim = target_x - landing_x
+    tilt = np.arctan2(aim, game.paddle_y - target_y)
+    offset = np.clip(tilt / game.paddle_max_tilt, -AIM_LIMIT, AIM_LIMIT)
+    offset = np.where(np.abs(offset) < MIN_AIM, np.where(aim < 0, -MIN_AIM, MIN_AIM), offset)
+    target = landing_x - offset * (PADDLE_WIDTH / 2)
+
+    center = game.paddle_x + PADDLE_WIDTH / 2
+    half_step = game.paddle_speed / 2
+    actions = np.where(center < target - half_step, ACTION_RIGHT,
+                       np.where(center > target + half_step, ACTION_LEFT, ACTION_NONE))
+    actions = np.where(game.ball_active, actions, actions | ACTION_FIRE)
+    if actions.ndim == 0:
+        return int(actions)
+    return actions
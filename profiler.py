@@ -0,0 +1,108 @@
+"""フレームの処理時間を区間ごとに測る
+
+    profiler.begin_frame()
+    ...イベント処理...
+    profiler.lap('event_pump')   # 前の lap（フレームの始まり）からの時間が 'event_pump' の時間
+    ...
+    profiler.end_frame()
+
+区間ごとの1フレームの合計時間を、最新 capacity フレーム分だけリングバッファに持つ。
+trace=True にすると全ての区間を記録し、write_trace() で Chrome のトレース形式
+（chrome://tracing や Perfetto で開ける JSON）に書き出す。
+"""
+import json
+import time
+
+import numpy as np
+
+
+class RingBuffer:
+    """最新 capacity 個の値だけを持つ"""
+
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity)
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def latest(self):
+        """持っている値（順番は問わない）"""
+        return self.values[:min(self.count, len(self.values))]
+
+
+class NullProfiler:
+    """何も測らない（GameEngine・Renderer の既定）"""
+
+    def lap(self, name):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+    """区間ごとの処理時間（ミリ秒）を測る"""
+
+    def __init__(self, capacity=600, trace=False):
+        self.capacity = capacity
+        self.phases = {}   # 区間の名前 -> RingBuffer（最初に測った順）
+        self.frame_times = RingBuffer(capacity)  # フレーム全体
+        self.frame = 0
+        self.frame_start = self.last = time.perf_counter_ns()
+        self.current = {}  # このフレームの区間ごとの合計（ナノ秒）
+        self.trace = [] if trace else None  # (名前, 開始, 長さ) ナノ秒
+
+    def begin_frame(self):
+        """フレームの始まり"""
+        self.frame_start = self.last = time.perf_counter_ns()
+        self.current = {}
+
+    def lap(self, name):
+        """前の lap からの時間を name の区間として記録"""
+        now = time.perf_counter_ns()
+        elapsed = now - self.last
+        self.current[name] = self.current.get(name, 0) + elapsed
+        if self.trace is not None:
+            self.trace.append((name, self.last, elapsed))
+        self.last = now
+
+    def end_frame(self):
+        """フレームの終わり（このフレームで測らなかった区間は 0 として記録）"""
+        for name in self.current:
+            if name not in self.phases:
+                self.phases[name] = RingBuffer(self.capacity)
+        for name, buffer in self.phases.items():
+            buffer.append(self.current.get(name, 0) / 1e6)
+        elapsed = time.perf_counter_ns() - self.frame_start
+        self.frame_times.append(elapsed / 1e6)
+        if self.trace is not None:
+            self.trace.append((None, self.frame_start, elapsed))
+        self.frame += 1
+
+    def stats(self):
+        """区間ごとの (名前, p50, p99) のリスト（ミリ秒、最後はフレーム全体の 'frame'）"""
+        result = []
+        for name, buffer in [*self.phases.items(), ('frame', self.frame_times)]:
+            if buffer.count == 0:
+                continue
+            p50, p99 = np.percentile(buffer.latest(), [50, 99])
+            result.append((name, float(p50), float(p99)))
+        return result
+
+    def write_trace(self, path):
+        """記録した区間を Chrome のトレース形式で書き出す"""
+        events = []
+        frame = 0
+        for name, start, elapsed in self.trace:
+            event = {'ph': 'X', 'pid': 1, 'tid': 1, 'ts': start / 1000, 'dur': elapsed / 1000}
+            if name is None:
+                # フレーム全体（区間はこの中に入れ子で表示される）
+                event.update(name='frame', args={'frame': frame})
+                frame += 1
+            else:
+                event['name'] = name
+            events.append(event)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
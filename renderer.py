@@ -0,0 +1,471 @@
+"""謎の壁 - 描画処理
+
+Renderer は GameEngine の状態を画面に描く。screen は画面外の Surface でもよい
+（学習用に画素を読むときは observation.ObservationRenderer・ScreenCapture）。
+dirty=True にすると、背景・壁・残っているブロック・動かない敵・HUD を
+キャッシュした面（フィールド面）に焼き込んでおき、毎フレーム変わった部分だけを
+描き直して pygame.display.update(dirty_rects) で転送する。
+scale を指定すると、ゲームの座標をその倍率で screen に描く（display.Display の内部の面に
+解像度を下げて描くとき）。画像・文字は倍率に合わせて縮小したものを作っておく。
+"""
+import numpy as np
+import pygame
+
+from engine import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, HUD_HEIGHT, WALL_THICKNESS,
+    LEFT_WALL_X, RIGHT_WALL_X, TOP_WALL_Y,
+    PADDLE_WIDTH, PADDLE_HEIGHT, BALL_RADIUS,
+    EVENT_RESET, EVENT_BLOCK_DESTROYED, EVENT_ENEMY_DESTROYED, EVENT_ENEMY_FREED,
+)
+from profiler import NULL_PROFILER
+from text_cache import TEXT_CACHE
+
+# 色定義
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+ORANGE = (255, 165, 0)
+CYAN = (0, 255, 255)
+
+# HUD の表示位置
+SCORE_POS = (10, 8)
+LIVES_POS = (180, 8)
+
+# タイルを描かないときの背景の色
+PLAIN_BACKGROUND = (30, 30, 30)
+
+# 処理時間の表示を作り直す間隔（フレーム）
+PROFILE_REFRESH = 30
+PROFILE_COLUMN_WIDTH = 60
+
+
+def entity_rect(store, index):
+    """ブロック・敵の番号 index の範囲"""
+    return pygame.Rect(float(store.x[index]), float(store.y[index]),
+                       float(store.width[index]), float(store.height[index]))
+
+
+def entity_rects(store, mask):
+    """mask が True のブロック・敵の範囲のリスト"""
+    return [pygame.Rect(x, y, width, height) for x, y, width, height in
+            zip(store.x[mask].tolist(), store.y[mask].tolist(),
+                store.width[mask].tolist(), store.height[mask].tolist())]
+
+
+def fill_entity_rects(store, mask, rects):
+    """entity_rects と同じ範囲を rects（使い回す Rect のリスト。足りなければ増やす）の先頭に書き、数を返す
+
+    毎フレーム描く物の Rect を作らないようにする。書いた Rect は次に呼ぶと書き換わる。
+    """
+    xs = store.x[mask].tolist()
+    count = len(xs)
+    while len(rects) < count:
+        rects.append(pygame.Rect(0, 0, 0, 0))
+    for rect, x, y, width, height in zip(rects, xs, store.y[mask].tolist(),
+                                         store.width[mask].tolist(), store.height[mask].tolist()):
+        rect.update(x, y, width, height)
+    return count
+
+
+def scale_surface(surface, scale):
+    """画像・文字を scale 倍にした面（1画素より小さくしない）"""
+    width, height = surface.get_size()
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if surface.get_bitsize() in (24, 32):
+        return pygame.transform.smoothscale(surface, size)
+    return pygame.transform.scale(surface, size)
+
+
+class Renderer:
+    """ゲーム画面の描画（通常モードと差分描画モード）"""
+
+    def __init__(self, screen, font, font_small, images=None, dirty=False, scale=1.0):
+        self.font = font
+        self.font_small = font_small
+        self.images = images or {}  # ゲームの座標での大きさの画像
+        self.dirty = dirty
+        self.text_cache = TEXT_CACHE
+        self.show_background = True  # False ならタイルの代わりに1色で塗る
+
+        # 差分描画用
+        self.field_layer = None   # 背景 + 壁 + ブロック + 動かない敵 + HUD
+        self.field_enemy_rects = {}  # フィールド面に焼き込んだ敵の番号 -> 範囲
+        self.hud_state = None     # フィールド面に描いてある (score, lives)
+        self.hud_rects = []
+        self.sprite_rects = []    # 前のフレームで描いた動く物の範囲
+
+        # 毎フレーム描く物の範囲（作り直さずに書き換えて使う）
+        self.block_rects = []
+        self.enemy_rects = []
+        self.paddle_rect = pygame.Rect(0, 0, PADDLE_WIDTH, PADDLE_HEIGHT)
+
+        # ブロック・敵が壊れたときのパーティクル（main.py が ParticleSystem を入れる）
+        self.particles = None
+
+        # 処理時間の計測と表示（main.py が FrameProfiler を入れる）
+        self.profiler = NULL_PROFILER
+        self.show_profile = False
+        self.profile_layer = None
+        self.profile_frame = 0
+        self.profile_notes = []   # 表の下に出す行（AdaptiveQuality が画質の段階を入れる）
+
+        self.set_target(screen, scale)
+
+    def set_target(self, screen, scale=1.0):
+        """描く面と倍率を変え、倍率に合わせた画像・背景を作り直す（次の描画は全体を描き直す）"""
+        self.screen = screen
+        self.scale = scale
+        images = self.images
+        if scale != 1:
+            images = {name: scale_surface(image, scale) for name, image in images.items()}
+        self.paddle_img = images.get('paddle')
+        self.ball_img = images.get('ball')
+        self.block_img = images.get('block')
+        self.enemy_img = images.get('enemy')
+        # 画像が無いときのブロック・敵の枠の太さ（縮小して 0 になれば描かない）
+        self.outline = round(2 * scale)
+        self.scaled_text = {}     # 文字の面 -> 倍率に合わせた面
+        self.status_state = None  # status_text を作ったときの (score, lives)
+        self.status_text = None
+        self.profile_layer = None
+        self.build_static_layer()
+
+    def set_background(self, show):
+        """タイルの背景を描くかどうかを変える"""
+        if show != self.show_background:
+            self.show_background = show
+            self.build_static_layer()
+
+    def build_static_layer(self):
+        """変化しない背景と壁を描いておく（倍率が 1 でなければ、ゲームの座標で描いてから縮小する）"""
+        # 画面の無い画面外への描画では、変換する画面の形式が無いのでそのまま
+        width, height = self.screen.get_size()
+        scale = self.scale
+        layer = pygame.Surface((round(width / scale), round(height / scale)))
+        self.draw_background(layer)
+        self.draw_walls(layer)
+        if scale != 1:
+            layer = pygame.transform.scale(layer, (width, height))
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        self.static_layer = layer
+        # フィールド面も作り直す
+        self.field_layer = None
+        self.sprite_rects = []
+
+    def point(self, x, y):
+        """ゲームの座標を描く面の座標にする"""
+        scale = self.scale
+        if scale == 1:
+            return x, y
+        return round(x * scale), round(y * scale)
+
+    def to_target(self, rect):
+        """ゲームの座標の範囲を描く面の範囲にする（隣り合う範囲の間に隙間ができないように端を丸める）"""
+        scale = self.scale
+        if scale == 1:
+            return rect
+        left = round(rect.left * scale)
+        top = round(rect.top * scale)
+        return pygame.Rect(left, top, max(1, round(rect.right * scale) - left),
+                           max(1, round(rect.bottom * scale) - top))
+
+    def scale_text(self, text):
+        """文字の面を倍率に合わせる（同じ面は作り直さない）"""
+        if self.scale == 1:
+            return text
+        scaled = self.scaled_text.get(text)
+        if scaled is None:
+            scaled = self.scaled_text[text] = scale_surface(text, self.scale)
+        return scaled
+
+    def draw_background(self, surface):
+        """黒とグレーのタイル背景を描画（show_background が False なら1色）"""
+        if not self.show_background:
+            surface.fill(PLAIN_BACKGROUND)
+            return
+        tile_size = 32
+        dark = (20, 20, 20)
+        mid = (40, 40, 40)
+        for y in range(0, SCREEN_HEIGHT, tile_size):
+            for x in range(0, SCREEN_WIDTH, tile_size):
+                color = dark if (x // tile_size + y // tile_size) % 2 == 0 else mid
+                pygame.draw.rect(surface, color, (x, y, tile_size, tile_size))
+
+    def draw_walls(self, surface):
+        """壁を描画"""
+        # 左壁
+        pygame.draw.rect(surface, WHITE, (LEFT_WALL_X, HUD_HEIGHT, WALL_THICKNESS, SCREEN_HEIGHT - HUD_HEIGHT))
+        # 右壁
+        pygame.draw.rect(surface, WHITE, (RIGHT_WALL_X, HUD_HEIGHT, WALL_THICKNESS, SCREEN_HEIGHT - HUD_HEIGHT))
+        # 上壁（HUDのすぐ下）
+        pygame.draw.rect(surface, WHITE, (0, TOP_WALL_Y, SCREEN_WIDTH, WALL_THICKNESS))
+
+    def draw_paddle(self, surface, game):
+        """パドルを描画"""
+        if self.paddle_img:
+            return surface.blit(self.paddle_img, self.point(game.paddle_x, game.paddle_y))
+        rect = self.paddle_rect
+        rect.update(game.paddle_x, game.paddle_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+        return pygame.draw.rect(surface, CYAN, self.to_target(rect))
+
+    def draw_ball(self, surface, game):
+        """玉を描画"""
+        if self.ball_img:
+            return surface.blit(self.ball_img, self.point(int(game.ball_x - BALL_RADIUS), int(game.ball_y - BALL_RADIUS)))
+        return pygame.draw.circle(surface, YELLOW, self.point(int(game.ball_x), int(game.ball_y)),
+                                  max(1, round(BALL_RADIUS * self.scale)))
+
+    def draw_extra_balls(self, surface, game):
+        """マルチボールで増えた玉を描画し、範囲のリストを返す"""
+        balls = game.balls
+        count = balls.count
+        if count == 0:
+            return []
+        scale = self.scale
+        if self.ball_img:
+            x = np.rint((balls.x[:count] - BALL_RADIUS).astype(np.int64) * scale).astype(np.int64).tolist()
+            y = np.rint((balls.y[:count] - BALL_RADIUS).astype(np.int64) * scale).astype(np.int64).tolist()
+            return surface.blits([(self.ball_img, position) for position in zip(x, y)])
+        x = np.rint(balls.x[:count].astype(np.int64) * scale).astype(np.int64).tolist()
+        y = np.rint(balls.y[:count].astype(np.int64) * scale).astype(np.int64).tolist()
+        radius = max(1, round(BALL_RADIUS * scale))
+        return [pygame.draw.circle(surface, YELLOW, center, radius) for center in zip(x, y)]
+
+    def draw_block(self, surface, rect):
+        """ブロックを1つ描画（rect はゲームの座標。描いた範囲を返す）"""
+        rect = self.to_target(rect)
+        if self.block_img:
+            surface.blit(self.block_img, rect)
+        else:
+            pygame.draw.rect(surface, GREEN, rect)
+            if self.outline:
+                pygame.draw.rect(surface, WHITE, rect, self.outline)
+        return rect
+
+    def draw_blocks(self, surface, game):
+        """ブロックを描画"""
+        rects = self.block_rects
+        for i in range(fill_entity_rects(game.blocks, game.blocks.active, rects)):
+            self.draw_block(surface, rects[i])
+
+    def draw_enemy(self, surface, rect, trapped):
+        """敵を1体描画（rect はゲームの座標。描いた範囲を返す）"""
+        rect = self.to_target(rect)
+        if self.enemy_img:
+            surface.blit(self.enemy_img, rect)
+        else:
+            color = RED if not trapped else ORANGE
+            pygame.draw.rect(surface, color, rect)
+            if self.outline:
+                pygame.draw.rect(surface, WHITE, rect, self.outline)
+        return rect
+
+    def draw_enemies(self, surface, game):
+        """敵を描画"""
+        enemies = game.enemies
+        active = enemies.active
+        rects = self.enemy_rects
+        fill_entity_rects(enemies, active, rects)
+        for rect, trapped in zip(rects, enemies.trapped[active].tolist()):
+            self.draw_enemy(surface, rect, trapped)
+
+    def draw_status(self, surface, game):
+        """スコアとライフを描画（文字は値が変わったときだけ作り直す）"""
+        status_state = (game.score, game.lives)
+        if status_state != self.status_state:
+            self.status_text = (self.text_cache.render_number(self.font, "Score: ", game.score, WHITE),
+                                self.text_cache.render_number(self.font, "Lives: ", game.lives, WHITE))
+            if self.scale != 1:
+                self.status_text = tuple(scale_surface(text, self.scale) for text in self.status_text)
+            self.status_state = status_state
+        score_text, lives_text = self.status_text
+        return [surface.blit(score_text, self.point(*SCORE_POS)), surface.blit(lives_text, self.point(*LIVES_POS))]
+
+    def draw_message(self, surface, game):
+        """GAME OVER / LEVEL CLEARED! のメッセージを描画"""
+        rects = []
+        text_cache = self.text_cache
+        if game.game_over:
+            game_over_text = self.scale_text(text_cache.render(self.font, "GAME OVER", RED))
+            game_over_rect = game_over_text.get_rect(center=self.point(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 10))
+            rects.append(surface.blit(game_over_text, game_over_rect))
+
+            prompt_text = self.scale_text(text_cache.render(self.font_small, "PUSH SPACE KEY", WHITE))
+            prompt_rect = prompt_text.get_rect(center=self.point(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30))
+            rects.append(surface.blit(prompt_text, prompt_rect))
+
+        elif game.level_cleared:
+            clear_text = self.scale_text(text_cache.render(self.font, "LEVEL CLEARED!", YELLOW))
+            text_rect = clear_text.get_rect(center=self.point(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+            rects.append(surface.blit(clear_text, text_rect))
+        return rects
+
+    def draw_profile(self, surface):
+        """区間ごとの処理時間（p50 / p99）を右上に重ねて描く"""
+        profiler = self.profiler
+        if self.profile_layer is None or profiler.frame - self.profile_frame >= PROFILE_REFRESH:
+            self.profile_layer = self.build_profile_layer(profiler.stats())
+            if self.scale != 1:
+                self.profile_layer = scale_surface(self.profile_layer, self.scale)
+            self.profile_frame = profiler.frame
+        rect = self.profile_layer.get_rect(topright=self.point(SCREEN_WIDTH - 10, TOP_WALL_Y + WALL_THICKNESS + 10))
+        return surface.blit(self.profile_layer, rect)
+
+    def build_profile_layer(self, stats):
+        """処理時間の表（半透明の黒地）を作る（profile_notes の行を下に足す）"""
+        font = self.font_small
+        text_cache = self.text_cache
+        rows = [('ms', 'p50', 'p99')] + [(name, f"{p50:.2f}", f"{p99:.2f}") for name, p50, p99 in stats]
+        notes = self.profile_notes
+        name_width = max(font.size(name)[0] for name, _, _ in rows)
+        line_height = font.get_linesize()
+        width = max([name_width + PROFILE_COLUMN_WIDTH * 2 + 16] + [font.size(note)[0] + 16 for note in notes])
+        layer = pygame.Surface((width, line_height * (len(rows) + len(notes)) + 8), pygame.SRCALPHA)
+        layer.fill((0, 0, 0, 180))
+        for row, (name, p50, p99) in enumerate(rows):
+            y = 4 + row * line_height
+            layer.blit(text_cache.render(font, name, WHITE), (8, y))
+            # 数字は右揃え
+            for column, text in enumerate((p50, p99)):
+                text_surface = text_cache.render_number(font, '', text, WHITE)
+                right = 8 + name_width + PROFILE_COLUMN_WIDTH * (column + 1)
+                layer.blit(text_surface, (right - text_surface.get_width(), y))
+        for row, note in enumerate(notes, len(rows)):
+            layer.blit(text_cache.render(font, note, WHITE), (8, 4 + row * line_height))
+        return layer
+
+    def render(self, game, events=()):
+        """1フレーム分描画する
+
+        画面全体を描き直したときは None、差分描画では更新した範囲のリストを返す。
+        events には前回の描画以降に GameEngine.events に入った出来事を渡す。
+        """
+        if self.dirty:
+            return self.render_dirty(game, events)
+
+        screen = self.screen
+        profiler = self.profiler
+        screen.blit(self.static_layer, (0, 0))
+        profiler.lap('draw_background')
+        self.draw_blocks(screen, game)
+        profiler.lap('draw_blocks')
+        self.draw_enemies(screen, game)
+        profiler.lap('draw_enemies')
+        if self.particles is not None:
+            self.particles.draw(screen, self.scale)
+            profiler.lap('draw_particles')
+        self.draw_paddle(screen, game)
+        profiler.lap('draw_paddle')
+        self.draw_ball(screen, game)
+        self.draw_extra_balls(screen, game)
+        profiler.lap('draw_ball')
+        self.draw_status(screen, game)
+        profiler.lap('hud_text')
+        self.draw_message(screen, game)
+        profiler.lap('draw_message')
+        if self.show_profile:
+            self.draw_profile(screen)
+            profiler.lap('profile_overlay')
+        return None
+
+    def build_field_layer(self, game):
+        """フィールド面を作り直す（ゲーム開始・リセット時）"""
+        field = self.static_layer.copy()
+        self.draw_blocks(field, game)
+        # 閉じ込められている敵は動かないのでフィールド面に焼き込む
+        enemies = game.enemies
+        trapped = enemies.active & enemies.trapped
+        self.field_enemy_rects = {}
+        for index, rect in zip(np.flatnonzero(trapped).tolist(), entity_rects(enemies, trapped)):
+            self.field_enemy_rects[index] = self.draw_enemy(field, rect, True)
+        self.field_layer = field
+        self.hud_state = None
+        self.hud_rects = []
+
+    def erase_from_field(self, rect):
+        """フィールド面から物を消して背景に戻す"""
+        self.field_layer.blit(self.static_layer, rect, rect)
+
+    def render_dirty(self, game, events):
+        """変わった部分だけを描き直す"""
+        screen = self.screen
+        profiler = self.profiler
+        dirty_rects = []
+
+        # リセットより前の出来事は古いフィールドのものなので捨てる
+        resets = [i for i, (kind, _) in enumerate(events) if kind == EVENT_RESET]
+        if resets:
+            events = events[resets[-1] + 1:]
+        if self.field_layer is None or resets:
+            self.build_field_layer(game)
+            screen.blit(self.field_layer, (0, 0))
+            self.sprite_rects = []
+            dirty_rects.append(screen.get_rect())
+
+        # 前のフレームで描いた動く物を消す
+        field = self.field_layer
+        for rect in self.sprite_rects:
+            screen.blit(field, rect, rect)
+        dirty_rects.extend(self.sprite_rects)
+        profiler.lap('erase_sprites')
+
+        # 壊れたブロック・倒した敵・動き出した敵をフィールド面から消す
+        for kind, index in events:
+            if kind == EVENT_BLOCK_DESTROYED:
+                rect = self.to_target(entity_rect(game.blocks, index))
+            elif kind == EVENT_ENEMY_DESTROYED or kind == EVENT_ENEMY_FREED:
+                # 焼き込んだときの位置で消す（動き出した敵は同じフレームでもう動いている）
+                rect = self.field_enemy_rects.pop(index, None)
+                if rect is None:
+                    continue
+            else:
+                continue
+            self.erase_from_field(rect)
+            screen.blit(field, rect, rect)
+            dirty_rects.append(rect)
+        profiler.lap('erase_destroyed')
+
+        # スコアとライフは変わったときだけフィールド面に描き直す
+        hud_state = (game.score, game.lives)
+        if hud_state != self.hud_state:
+            for rect in self.hud_rects:
+                self.erase_from_field(rect)
+                screen.blit(field, rect, rect)
+            dirty_rects.extend(self.hud_rects)
+            self.hud_rects = self.draw_status(field, game)
+            for rect in self.hud_rects:
+                screen.blit(field, rect, rect)
+            dirty_rects.extend(self.hud_rects)
+            self.hud_state = hud_state
+        profiler.lap('hud_text')
+
+        # 動く物を描く
+        sprite_rects = []
+        enemies = game.enemies
+        rects = self.enemy_rects
+        for i in range(fill_entity_rects(enemies, enemies.active & ~enemies.trapped, rects)):
+            sprite_rects.append(self.draw_enemy(screen, rects[i], False))
+        profiler.lap('draw_enemies')
+        if self.particles is not None:
+            sprite_rects.extend(self.particles.draw(screen, self.scale))
+            profiler.lap('draw_particles')
+        sprite_rects.append(self.draw_paddle(screen, game))
+        profiler.lap('draw_paddle')
+        sprite_rects.append(self.draw_ball(screen, game))
+        sprite_rects.extend(self.draw_extra_balls(screen, game))
+        profiler.lap('draw_ball')
+        sprite_rects.extend(self.draw_message(screen, game))
+        profiler.lap('draw_message')
+        if self.show_profile:
+            # 動く物と同じく、次のフレームで消す
+            sprite_rects.append(self.draw_profile(screen))
+            profiler.lap('profile_overlay')
+
+        screen_rect = screen.get_rect()
+        self.sprite_rects = [rect.clip(screen_rect) for rect in sprite_rects]
+        dirty_rects.extend(self.sprite_rects)
+        return dirty_rects
@@ -0,0 +1,156 @@
+"""謎の壁 - 入力の記録と再生（リプレイ）
+
+    python replay.py recording.nzr [--frame N]
+
+記録するのはシードと1フレームごとの入力（ACTION_* のビットフラグ）だけ。
+GameEngine は同じシード・同じ入力なら同じ結果になるので、描画も時計待ちもせずに
+早送りすれば、記録したときの状態を再現できる。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダ  b'NZKR', 形式番号 (B), シード (q, 無しは -1), フレーム数 (I), 設定の長さ (H)
+    設定    GameConfig の JSON（UTF-8）
+    入力    同じ入力が続く回数 n と入力 a を (n << 3 | a) にして、7ビットずつの可変長整数で並べる
+"""
+import argparse
+import dataclasses
+import json
+import os
+import struct
+import time
+
+from engine import GameConfig, GameEngine
+
+MAGIC = b'NZKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBqIH')
+ACTION_BITS = 3  # ACTION_LEFT | ACTION_RIGHT | ACTION_FIRE が入るビット数
+ACTION_MASK = (1 << ACTION_BITS) - 1
+
+
+class ReplayRecorder:
+    """1フレームごとの入力を、同じ入力が続く回数にまとめながら記録する"""
+
+    def __init__(self, seed=None, config=None):
+        self.seed = seed
+        self.config = config if config is not None else GameConfig()
+        self.runs = []  # [入力, 続いた回数]
+        self.frames = 0
+
+    def record(self, action):
+        """1フレーム分の入力（GameEngine.step() に渡したもの）を記録"""
+        if self.runs and self.runs[-1][0] == action:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([action, 1])
+        self.frames += 1
+
+    def save(self, path):
+        """ファイルに書き出す（書き終えてから名前を変えるので、途中で落ちても壊れない）"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(encode_replay(self.seed, self.config, self.runs))
+        os.replace(temp_path, path)
+
+
+class Replay:
+    """読み込んだリプレイ"""
+
+    def __init__(self, seed, config, runs):
+        self.seed = seed
+        self.config = config
+        self.runs = runs  # [(入力, 続いた回数), ...]
+        self.frames = sum(count for _, count in runs)
+
+    def actions(self):
+        """1フレームごとの入力を順に返す"""
+        for action, count in self.runs:
+            for _ in range(count):
+                yield action
+
+
+def encode_replay(seed, config, runs):
+    """リプレイをバイト列にする"""
+    config_data = json.dumps(dataclasses.asdict(config), separators=(',', ':')).encode('utf-8')
+    frames = sum(count for _, count in runs)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, -1 if seed is None else seed, frames, len(config_data)))
+    out += config_data
+    for action, count in runs:
+        value = count << ACTION_BITS | action
+        # 7ビットずつ、続きがあれば最上位ビットを立てる
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_replay(data):
+    """バイト列から Replay を作る（形式が違えば ValueError）"""
+    if len(data) < HEADER.size:
+        raise ValueError("リプレイのヘッダが短すぎる")
+    magic, version, seed, frames, config_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("リプレイのファイルではない")
+    if version != VERSION:
+        raise ValueError(f"対応していないリプレイの形式: {version}")
+    position = HEADER.size
+    config = GameConfig(**json.loads(data[position:position + config_size].decode('utf-8')))
+    position += config_size
+
+    runs = []
+    value = shift = 0
+    for byte in data[position:]:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            runs.append((value & ACTION_MASK, value >> ACTION_BITS))
+            value = shift = 0
+    replay = Replay(None if seed == -1 else seed, config, runs)
+    if shift or replay.frames != frames:
+        raise ValueError("リプレイの入力が途中で切れている")
+    return replay
+
+
+def load_replay(path):
+    """ファイルからリプレイを読む"""
+    with open(path, 'rb') as f:
+        return decode_replay(f.read())
+
+
+def play(replay, frames=None):
+    """描画せずに入力を流し込み、frames フレーム目（省略時は最後）まで進めた GameEngine を返す"""
+    game = GameEngine(replay.seed, replay.config)
+    remaining = replay.frames if frames is None else min(frames, replay.frames)
+    step = game.step
+    for action, count in replay.runs:
+        if remaining <= 0:
+            break
+        count = min(count, remaining)
+        remaining -= count
+        for _ in range(count):
+            step(action)
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description='リプレイを画面無しで再生する')
+    parser.add_argument('path', help='main.py --record で記録したファイル')
+    parser.add_argument('--frame', type=int, default=None, help='このフレームまで進めて止める')
+    args = parser.parse_args()
+
+    replay = load_replay(args.path)
+    start = time.perf_counter()
+    game = play(replay, args.frame)
+    elapsed = time.perf_counter() - start
+
+    print(f"シード {replay.seed}, {replay.frames} フレーム, 入力の区間 {len(replay.runs)} 個"
+          f"（{os.path.getsize(args.path)} バイト）")
+    print(f"フレーム {game.frame}: スコア {game.score}, ライフ {game.lives}, "
+          f"ブロック {game.blocks.live}, 敵 {game.enemies.live}, "
+          f"ゲームオーバー {'はい' if game.game_over else 'いいえ'}, "
+          f"クリア {'はい' if game.level_cleared else 'いいえ'}")
+    if elapsed > 0:
+        print(f"再生 {elapsed:.3f} 秒（実時間の {game.frame / 60 / elapsed:.0f} 倍）")
+
+if __name__ == '__main__':
+    main()
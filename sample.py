@@ -1,52 +1,71 @@
 import pygame
-from pygame import mixer
-import random
-import math
+import numpy as np
 
+from assets import AssetManager
+from pool import Pool, find_hits
+from sound import SoundBank, init_mixer
+from text_cache import TEXT_CACHE, get_font
+
+init_mixer()
 pygame.init()
 
 screen = pygame.display.set_mode((800, 600))
 # screen.fill((150, 150, 150))
 pygame.display.set_caption('Invaders Game')
 
+# Images (decoded once, converted to the display format and cached as one atlas)
+sprites = AssetManager().load_sprites({
+    'player': ('player.png', None),
+    'enemy': ('enemy.png', None),
+    'bullet': ('bullet.png', None),
+})
+
 # Player
-playerImg = pygame.image.load('player.png')
+playerImg = sprites['player']
 playerX, playerY = 370, 480
 PlayerX_change = 0
 
-# Enemy
-enemyImg = pygame.image.load('enemy.png')
-enemyX = random.randint(0, 736)
-enemyY = random.randint(50, 150)
+# Enemies (a fixed-capacity pool; every cleared wave brings a bigger one)
+enemyImg = sprites['enemy']
+ENEMY_CAPACITY = 1024
+FIRST_WAVE, WAVE_GROWTH = 8, 2
+enemies = Pool(ENEMY_CAPACITY)
+wave_size = FIRST_WAVE
 enemyX_change, enemyY_change = 1, 40
 
-# Bullet
-bulletImg = pygame.image.load('bullet.png')
-bulletX, bulletY = 0, 480
-bulletX_change, bulletY_change = 0, 3
-bullet_state = 'ready'
+# Bullets (a fixed-capacity pool; holding space fires every FIRE_INTERVAL frames)
+bulletImg = sprites['bullet']
+BULLET_CAPACITY = 256
+FIRE_INTERVAL = 8
+bullets = Pool(BULLET_CAPACITY)
+bulletY, bulletY_change = 480, 3
+fire_cooldown = 0
 
-# mixer.Sound('laser.wav').play()
+# Sounds (decoded once at startup)
+sounds = SoundBank({'laser': ('laser.wav', 1.0)})
 
 # Score
 Score_value = 0
+font = get_font(None, 32)
+score = None
+score_shown = None  # Score_value that score was rendered for
 
 def player(x, y):
     screen.blit(playerImg, (x, y))
 
-def enemy(x, y):
-    screen.blit(enemyImg, (x, y))
+def spawn_wave(count):
+    count = min(count, ENEMY_CAPACITY)
+    enemies.spawn_many(np.random.randint(0, 737, count), np.random.randint(50, 151, count),
+                       np.random.choice([-enemyX_change, enemyX_change], count), 0)
 
-def fire_bullet(x, y):
-    global bullet_state
-    bullet_state = 'fire'
-    screen.blit(bulletImg, (x + 16, y + 10))
+def draw_pool(image, pool, offset_x=0, offset_y=0):
+    # One Surface.blits call for every live object in the pool
+    alive = pool.active
+    xs = (pool.x[alive] + offset_x).tolist()
+    ys = (pool.y[alive] + offset_y).tolist()
+    screen.blits([(image, (x, y)) for x, y in zip(xs, ys)], doreturn=False)
 
-def isCollision(enemyX, enemyY, bulletX, bulletY):
-    distance = math.sqrt(math.pow(enemyX - bulletX, 2) + math.pow(enemyY - bulletY, 2))
-    if distance < 27:
-        return True
-    return False
+spawn_wave(wave_size)
 
 running = True
 while running:
@@ -64,10 +83,6 @@ while running:
                 PlayerX_change = -1.5
             if event.key == pygame.K_RIGHT:
                 PlayerX_change = 1.5
-            if event.key == pygame.K_SPACE:
-               if bullet_state == 'ready':
-                    bulletX = playerX
-                    fire_bullet(bulletX, bulletY)
 
         if event.type == pygame.KEYUP:
             if event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
@@ -80,40 +95,45 @@ while running:
     elif playerX >= 736:
         playerX = 736
 
-    # Enemy
-    if enemyY > 440:
+    # Rapid fire while space is held
+    if fire_cooldown > 0:
+        fire_cooldown -= 1
+    if pygame.key.get_pressed()[pygame.K_SPACE] and fire_cooldown == 0:
+        if bullets.spawn(playerX, bulletY, 0, -bulletY_change) >= 0:
+            fire_cooldown = FIRE_INTERVAL
+
+    # Enemies (all at once; bounce off the edges and step down)
+    if (enemies.active & (enemies.y > 440)).any():
         break
-    enemyX += enemyX_change
-    if enemyX <= 0:
-        enemyX_change = 1
-        enemyY += enemyY_change
-    elif enemyX >= 736:
-        enemyX_change = -1
-        enemyY += enemyY_change
-
-    collision = isCollision(enemyX, enemyY, bulletX, bulletY)
-    if collision:
-        mixer.Sound('laser.wav').play()
-        bulletY = 480
-        bullet_state = 'ready'
-        Score_value += 1
-        enemyX = random.randint(0, 736)
-        enemyY = random.randint(50, 150)
+    enemies.move()
+    at_left = enemies.active & (enemies.x <= 0)
+    at_right = enemies.active & (enemies.x >= 736)
+    enemies.dx[at_left] = enemyX_change
+    enemies.dx[at_right] = -enemyX_change
+    enemies.y[at_left | at_right] += enemyY_change
+
+    # Every bullet against every enemy in one squared-distance pass
+    hit_bullets, hit_enemies = find_hits(bullets, enemies, 27)
+    if len(hit_bullets):
+        sounds.play('laser')
+        Score_value += len(hit_bullets)
+        bullets.release(hit_bullets)
+        enemies.release(hit_enemies)
+        if len(enemies) == 0:
+            wave_size *= WAVE_GROWTH
+            spawn_wave(wave_size)
 
     # Bullet Movement
-    if bulletY <=0:
-        bulletY = 480
-        bullet_state = 'ready'
-
-    if bullet_state == 'fire':
-        fire_bullet(bulletX, bulletY)
-        bulletY -= bulletY_change
-
-    # Score
-    font = pygame.font.SysFont(None, 32)
-    score = font.render(f"Score: {str(Score_value)}", True, (255, 255, 255))
+    bullets.release(np.flatnonzero(bullets.active & (bullets.y <= 0)))
+    draw_pool(bulletImg, bullets, 16, 10)
+    bullets.move()
+
+    # Score (re-render only when the value changes)
+    if Score_value != score_shown:
+        score = TEXT_CACHE.render_number(font, "Score: ", Score_value, (255, 255, 255))
+        score_shown = Score_value
     screen.blit(score, (20, 50))
 
     player(playerX, playerY)
-    enemy(enemyX, enemyY)
+    draw_pool(enemyImg, enemies)
     pygame.display.update()
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""ゲーム状態のスナップショット（保存・巻き戻し・探索の分岐用）
+
+    snapshot = take_snapshot(game)
+    ...game.step(...) を何回か...
+    restore_snapshot(game, snapshot)   # 撮ったときの状態に戻る
+
+玉・パドル・ライフ・スコア・フラグと、ブロック・敵・増えた玉の全ての項目を持つ。
+ブロックは壊れるだけなので、生きているブロックが変わっていなければ
+直前のスナップショットと同じバイト列を共有する（毎フレーム撮ってもコピーしない）。
+ブロック・敵の位置や大きさは GameConfig で決まるので、同じ設定の GameEngine にだけ戻せる。
+GameEngine.rng は使われていないので含めない。
+
+バイト列の形式（リトルエンディアン）:
+    ヘッダ  b'NZKS', 形式番号 (B), 玉・パドル・ライフなど (SCALARS), ブロック数 (I), 敵の数 (I),
+            増えた玉の数 (I)
+    ブロック  生きているか（1ビットずつ）
+    敵      x, y (float32), 上・下に残っているブロックの数 (int32), 移動方向・速さ (int8),
+            下に移動するタイマー (int16), 生きているか・阻まれているか・判定待ちか（1ビットずつ）
+    増えた玉  x, y, dx, dy (float64)
+"""
+import struct
+from collections import deque
+
+import numpy as np
+
+from engine import EVENT_RESET
+from entities import POSITION_DTYPE
+
+MAGIC = b'NZKS'
+VERSION = 3
+HEADER = struct.Struct('<4sB')
+# frame, paddle_x, paddle_prev_x, paddle_direction, ball_x, ball_y, ball_dx, ball_dy, ball_speed,
+# ball_active, lives, score, level_cleared, game_over, blocks_destroyed
+SCALARS = struct.Struct('<Iiibddddd?ii??I')
+COUNTS = struct.Struct('<III')
+BALL_DTYPE = np.float64
+COUNTER_DTYPE = np.int32
+
+# 巻き戻し用に持っておく時間（フレーム）
+REWIND_FRAMES = 5 * 60
+# ライフが減ったとき、この時間（フレーム）だけ前の状態を覚えておく
+DEATH_REWIND_FRAMES = 2 * 60
+
+
+class Snapshot:
+    """ある時点のゲーム状態"""
+
+    __slots__ = ('scalars', 'block_count', 'enemy_count', 'ball_count', 'blocks', 'enemies', 'balls',
+                 'block_store', 'block_version')
+
+    def __init__(self, scalars, block_count, enemy_count, ball_count, blocks, enemies, balls,
+                 block_store=None, block_version=None):
+        self.scalars = scalars  # SCALARS の順のタプル
+        self.block_count = block_count
+        self.enemy_count = enemy_count
+        self.ball_count = ball_count
+        self.blocks = blocks    # ブロック部分のバイト列（前のスナップショットと共有することがある）
+        self.enemies = enemies  # 敵部分のバイト列
+        self.balls = balls      # 増えた玉の部分のバイト列
+        # ブロック部分を撮ったときの BlockStore と版（使い回せるかの判定用）
+        self.block_store = block_store
+        self.block_version = block_version
+
+    @property
+    def frame(self):
+        return self.scalars[0]
+
+    @property
+    def lives(self):
+        return self.scalars[10]
+
+
+def take_snapshot(game, previous=None):
+    """game の今の状態を撮る（ブロックが previous から変わっていなければ共有する）"""
+    blocks = game.blocks
+    if (previous is not None and previous.block_store is blocks and
+            previous.block_version == blocks.version):
+        block_data = previous.blocks
+    else:
+        block_data = np.packbits(blocks.active).tobytes()
+
+    enemies = game.enemies
+    flags = np.concatenate((enemies.active, enemies.trapped, np.zeros(len(enemies), dtype=bool)))
+    if game.trap_check_pending:
+        flags[2 * len(enemies) + np.fromiter(game.trap_check_pending, dtype=np.int64)] = True
+    enemy_data = b''.join((enemies.x.tobytes(), enemies.y.tobytes(),
+                           np.array(game.enemy_blocks_above, dtype=COUNTER_DTYPE).tobytes(),
+                           np.array(game.enemy_blocks_below, dtype=COUNTER_DTYPE).tobytes(),
+                           enemies.direction.tobytes(), enemies.speed.tobytes(),
+                           enemies.move_down_timer.tobytes(), np.packbits(flags).tobytes()))
+
+    balls = game.balls
+    ball_data = b''.join(values[:balls.count].tobytes() for values in (balls.x, balls.y, balls.dx, balls.dy))
+
+    scalars = (game.frame, game.paddle_x, game.paddle_prev_x, game.paddle_direction,
+               game.ball_x, game.ball_y, game.ball_dx, game.ball_dy, game.ball_speed,
+               game.ball_active, game.lives, game.score, game.level_cleared, game.game_over,
+               game.blocks_destroyed)
+    return Snapshot(scalars, len(blocks), len(enemies), balls.count, block_data, enemy_data, ball_data,
+                    blocks, blocks.version)
+
+
+def restore_snapshot(game, snapshot):
+    """game を snapshot の状態に戻す（ステージの大きさが違えば ValueError）"""
+    blocks = game.blocks
+    enemies = game.enemies
+    count = len(enemies)
+    if snapshot.block_count != len(blocks) or snapshot.enemy_count != count:
+        raise ValueError("スナップショットとステージの大きさが違う")
+    if snapshot.ball_count > game.balls.capacity:
+        raise ValueError("スナップショットの増えた玉が多すぎる")
+
+    (game.frame, game.paddle_x, game.paddle_prev_x, game.paddle_direction,
+     game.ball_x, game.ball_y, game.ball_dx, game.ball_dy, game.ball_speed,
+     game.ball_active, game.lives, game.score, game.level_cleared, game.game_over,
+     game.blocks_destroyed) = snapshot.scalars
+
+    blocks.set_active(np.unpackbits(np.frombuffer(snapshot.blocks, dtype=np.uint8), count=len(blocks)))
+
+    data = snapshot.enemies
+    position = 0
+
+    def read(dtype):
+        nonlocal position
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=position)
+        position += values.nbytes
+        return values
+
+    enemies.x[:] = read(POSITION_DTYPE)
+    enemies.y[:] = read(POSITION_DTYPE)
+    game.enemy_blocks_above = read(COUNTER_DTYPE).tolist()
+    game.enemy_blocks_below = read(COUNTER_DTYPE).tolist()
+    enemies.direction[:] = read(enemies.direction.dtype)
+    enemies.speed[:] = read(enemies.speed.dtype)
+    enemies.move_down_timer[:] = read(enemies.move_down_timer.dtype)
+    flags = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=position), count=3 * count).view(bool)
+    enemies.active[:] = flags[:count]
+    enemies.trapped[:] = flags[count:2 * count]
+    enemies.live = int(enemies.active.sum())
+
+    # 閉じ込められている敵は最初の位置から動いていないので、列ごとの敵は最初と同じ
+    game.column_trapped_enemies = [list(column) for column in game.column_enemies]
+    game.trap_check_pending = set(np.flatnonzero(flags[2 * count:]).tolist())
+
+    balls = game.balls
+    ball_count = snapshot.ball_count
+    values = np.frombuffer(snapshot.balls, dtype=BALL_DTYPE).reshape(4, ball_count)
+    for target, source in zip((balls.x, balls.y, balls.dx, balls.dy), values):
+        target[:ball_count] = source
+    balls.count = ball_count
+    game.balls_pending = 0
+    # 描画側にはステージを作り直したことにして、全体を描き直してもらう
+    game.events = [(EVENT_RESET, None)]
+
+
+def enemy_data_size(count):
+    """敵 count 体分のバイト数"""
+    position_size = np.dtype(POSITION_DTYPE).itemsize
+    return count * (2 * position_size + 2 * np.dtype(COUNTER_DTYPE).itemsize + 1 + 1 + 2) + (3 * count + 7) // 8
+
+
+def ball_data_size(count):
+    """増えた玉 count 個分のバイト数"""
+    return 4 * count * np.dtype(BALL_DTYPE).itemsize
+
+
+def encode_snapshot(snapshot):
+    """スナップショットをバイト列にする"""
+    return b''.join((HEADER.pack(MAGIC, VERSION), SCALARS.pack(*snapshot.scalars),
+                     COUNTS.pack(snapshot.block_count, snapshot.enemy_count, snapshot.ball_count),
+                     snapshot.blocks, snapshot.enemies, snapshot.balls))
+
+
+def decode_snapshot(data):
+    """バイト列から Snapshot を作る（形式が違えば ValueError）"""
+    fixed_size = HEADER.size + SCALARS.size + COUNTS.size
+    if len(data) < fixed_size:
+        raise ValueError("スナップショットのヘッダが短すぎる")
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("スナップショットではない")
+    if version != VERSION:
+        raise ValueError(f"対応していないスナップショットの形式: {version}")
+    scalars = SCALARS.unpack_from(data, HEADER.size)
+    block_count, enemy_count, ball_count = COUNTS.unpack_from(data, HEADER.size + SCALARS.size)
+    block_size = (block_count + 7) // 8
+    enemy_end = fixed_size + block_size + enemy_data_size(enemy_count)
+    if len(data) != enemy_end + ball_data_size(ball_count):
+        raise ValueError("スナップショットの長さが合わない")
+    blocks = data[fixed_size:fixed_size + block_size]
+    enemies = data[fixed_size + block_size:enemy_end]
+    balls = data[enemy_end:]
+    return Snapshot(scalars, block_count, enemy_count, ball_count, blocks, enemies, balls)
+
+
+class SnapshotRing:
+    """最近のスナップショットを毎フレーム撮っておく（巻き戻し・死ぬ前に戻す用）"""
+
+    def __init__(self, capacity=REWIND_FRAMES, death_frames=DEATH_REWIND_FRAMES):
+        self.snapshots = deque(maxlen=capacity)
+        self.death_frames = death_frames
+        self.before_death = None  # 最後にライフが減った少し前のスナップショット
+
+    def record(self, game):
+        """今の状態を撮る（ライフが減っていたら、その少し前の状態を覚えておく）"""
+        previous = self.snapshots[-1] if self.snapshots else None
+        snapshot = take_snapshot(game, previous)
+        if previous is not None and snapshot.lives < previous.lives:
+            # 古い方から death_frames 以内で一番古いもの
+            index = max(0, len(self.snapshots) - self.death_frames)
+            self.before_death = self.snapshots[index]
+        self.snapshots.append(snapshot)
+
+    def rewind(self, game):
+        """1フレーム前の状態に戻す（戻れなければ False）"""
+        if len(self.snapshots) < 2:
+            return False
+        self.snapshots.pop()
+        restore_snapshot(game, self.snapshots[-1])
+        return True
+
+    def restore_before_death(self, game):
+        """最後にライフが減った少し前の状態に戻す（まだ減っていなければ False）"""
+        if self.before_death is None:
+            return False
+        restore_snapshot(game, self.before_death)
+        self.snapshots.clear()
+        self.snapshots.append(self.before_death)
+        return True
@@ -0,0 +1,83 @@
+"""効果音（起動時にまとめてデコードし、予約したチャンネルで鳴らす）
+
+    init_mixer()        # pygame.init() より前に呼ぶ（バッファを小さくして遅延を減らす）
+    pygame.init()
+    sounds = SoundBank({'hit': ('laser.wav', 1.0)})
+    sounds.play('hit')
+
+鳴らすときにファイルを読んだりデコードしたりしないので、フレームが引っかからない。
+チャンネルが全部使われているときは、一番前から鳴っている音を止めて鳴らす。
+同じ音は min_interval 秒に1回までしか鳴らさない（同じフレームに何個も当たったときなど）。
+"""
+import sys
+import time
+
+import pygame
+
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 512        # サンプル数（小さいほど遅延が少ないが、音が途切れやすい）
+SOUND_CHANNELS = 8        # 効果音用に予約するチャンネル数
+RETRIGGER_INTERVAL = 0.05  # 同じ音を続けて鳴らせる最短の間隔（秒）
+
+
+def init_mixer(buffer=MIXER_BUFFER, frequency=MIXER_FREQUENCY):
+    """ミキサーの設定（pygame.init() より前に呼ぶ）"""
+    pygame.mixer.pre_init(frequency, -16, 2, buffer)
+
+
+class SoundBank:
+    """名前で鳴らす効果音の集まり"""
+
+    def __init__(self, specs, channels=SOUND_CHANNELS, min_interval=RETRIGGER_INTERVAL):
+        """specs は 名前 -> (WAV などのパス, 音量 0〜1)"""
+        self.min_interval = min_interval
+        self.sounds = {}        # 名前 -> (Sound, 音量)
+        self.last_played = {}  # 名前 -> 最後に鳴らした時刻
+        self.channels = []
+        self.started = []       # チャンネルごとの、今の音を鳴らし始めた時刻
+        if not pygame.mixer.get_init():
+            print("ミキサーを初期化できないので効果音は鳴らさない", file=sys.stderr)
+            return
+
+        # 先頭の channels 個を予約しておき、Sound.play() の自動割り当てには使わせない
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+        pygame.mixer.set_reserved(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.started = [0.0] * channels
+
+        decoded = {}  # 同じファイルは1回だけデコードする
+        for name, (path, volume) in specs.items():
+            if path not in decoded:
+                try:
+                    decoded[path] = pygame.mixer.Sound(path)
+                except (pygame.error, OSError) as error:
+                    print(f"効果音を読み込めない: {path}: {error}", file=sys.stderr)
+                    decoded[path] = None
+            if decoded[path] is not None:
+                self.sounds[name] = (decoded[path], volume)
+
+    def play(self, name, now=None):
+        """name の音を鳴らし、使ったチャンネルを返す（鳴らさなかったときは None）"""
+        entry = self.sounds.get(name)
+        if entry is None:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        last = self.last_played.get(name)
+        if last is not None and now - last < self.min_interval:
+            return None
+
+        # 空いているチャンネル、無ければ一番前から鳴っているチャンネル
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                break
+        else:
+            index = min(range(len(self.channels)), key=self.started.__getitem__)
+            channel = self.channels[index]
+
+        sound, volume = entry
+        channel.play(sound)
+        channel.set_volume(volume)
+        self.started[index] = now
+        self.last_played[name] = now
+        return channel
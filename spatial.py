@@ -0,0 +1,121 @@
+"""当たり判定用の空間インデックス（一様グリッドのセルによる粗い判定）"""
+import numpy as np
+
+# これ以下の数なら、セルに分けずに総当たりで比べる方が速い
+BRUTE_FORCE_LIMIT = 64
+
+# (行のずれ, 列のずれ)。対称なので隣のセルの半分だけ調べれば全ての組が見つかる
+NEIGHBOR_OFFSETS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def touching_pairs(left, top, right, bottom, cell_size):
+    """矩形の配列のうち、接する・重なる矩形の番号の組 (first, second) を返す
+
+    矩形を左上の角があるセルに振り分け、同じセルと隣のセルの組だけを比べる。
+    cell_size は全ての矩形の幅・高さ以上にすること。組は片方の向きだけ入り、同じ組が2回入ることもある。
+    """
+    count = len(left)
+    if count < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    if count <= BRUTE_FORCE_LIMIT:
+        touching = ((left[:, None] <= right[None, :]) & (left[None, :] <= right[:, None]) &
+                    (top[:, None] <= bottom[None, :]) & (top[None, :] <= bottom[:, None]))
+        np.fill_diagonal(touching, False)
+        return np.nonzero(np.triu(touching))
+
+    cell_x = np.floor_divide(left, cell_size).astype(np.int64)
+    cell_y = np.floor_divide(top, cell_size).astype(np.int64)
+    cell_x -= cell_x.min() - 1  # 左隣のセルも 0 以上になるようにずらす
+    cell_y -= cell_y.min()
+    stride = int(cell_x.max()) + 2
+    keys = cell_y * stride + cell_x
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    everyone = np.arange(count)
+    found_first = []
+    found_second = []
+    for offset_y, offset_x in NEIGHBOR_OFFSETS:
+        targets = keys + (offset_y * stride + offset_x)
+        starts = np.searchsorted(sorted_keys, targets, side='left')
+        counts = np.searchsorted(sorted_keys, targets, side='right') - starts
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        # (自分, 相手) の組を並べる
+        first = np.repeat(everyone, counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(starts, counts) + np.arange(total) - run_starts]
+
+        touching = ((first != second) &
+                    (left[first] <= right[second]) & (left[second] <= right[first]) &
+                    (top[first] <= bottom[second]) & (top[second] <= bottom[first]))
+        found_first.append(first[touching])
+        found_second.append(second[touching])
+    if not found_first:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(found_first), np.concatenate(found_second)
+
+
+class CellIndex:
+    """矩形を左上の角があるセルの順に並べておき、範囲の配列と重なりうる矩形の組をまとめて集める
+
+    矩形の幅・高さは cell_width・cell_height 以下であること（物が動いたら作り直す）。
+    1行分のセルはキーが続いているので、範囲の行ごとに二分探索1回で候補が取れる。
+    候補には重ならないものも入る（重なるかは呼び出し側で調べる）。
+    """
+
+    def __init__(self, x, y, items, cell_width, cell_height):
+        """items は x, y と同じ長さの番号の配列"""
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        col = np.floor_divide(x, cell_width).astype(np.int64)
+        row = np.floor_divide(y, cell_height).astype(np.int64)
+        self.col0 = int(col.min())
+        self.row0 = int(row.min())
+        self.cols = int(col.max()) - self.col0 + 1
+        self.rows = int(row.max()) - self.row0 + 1
+        keys = (row - self.row0) * self.cols + (col - self.col0)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.items = np.asarray(items)[order]
+
+    def cell_ranges(self, left, top, right, bottom):
+        """範囲（端を含む）と重なりうる矩形の左上の角があるセルの (最初の列, 最後の列, 最初の行, 最後の行)
+
+        重なりうるセルが無い向きは 最初 > 最後 になる。
+        """
+        # 左上の角は範囲の左上から幅・高さ（と丸めの分の 1）だけ左上まで
+        width = self.cell_width
+        height = self.cell_height
+        c0 = np.floor_divide(np.subtract(left, width + 1), width).astype(np.int64) - self.col0
+        c1 = np.floor_divide(right, width).astype(np.int64) - self.col0
+        r0 = np.floor_divide(np.subtract(top, height + 1), height).astype(np.int64) - self.row0
+        r1 = np.floor_divide(bottom, height).astype(np.int64) - self.row0
+        return (np.maximum(c0, 0), np.minimum(c1, self.cols - 1),
+                np.maximum(r0, 0), np.minimum(r1, self.rows - 1))
+
+    def pairs(self, left, top, right, bottom):
+        """範囲の配列に対して、(範囲の番号, 重なりうる矩形の番号) の組の配列を返す"""
+        c0, c1, r0, r1 = self.cell_ranges(left, top, right, bottom)
+        queries = np.arange(len(c0))
+        found_query = []
+        found_item = []
+        for row_offset in range(max(int((r1 - r0).max()) + 1, 0)):
+            row = (r0 + row_offset) * self.cols
+            starts = np.searchsorted(self.keys, row + c0, side='left')
+            counts = np.searchsorted(self.keys, row + c1, side='right') - starts
+            counts[(r0 + row_offset > r1) | (c0 > c1)] = 0
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # (範囲, 候補) の組を並べる
+            run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+            found_query.append(np.repeat(queries, counts))
+            found_item.append(self.items[np.repeat(starts, counts) + np.arange(total) - run_starts])
+        if not found_query:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(found_query), np.concatenate(found_item)
@@ -0,0 +1,308 @@
+"""謎の壁 - 描いたフレームを別のプロセスで録画・観戦する
+
+    python main.py --video frames/        # PNG の連番に保存
+    python main.py --video play.raw       # 生の画素を1つのファイルに続けて書く
+    python main.py --spectate             # 別のウィンドウに同じ画面を映す
+
+ゲームのプロセスは描き終えたフレームを共有メモリ（multiprocessing.shared_memory）の
+リングバッファにコピーするだけで、PNG の圧縮やファイルへの書き込みは
+このファイルを実行した別のプロセス（python spectator.py 共有メモリの名前 ...）が行う。
+録画側が追いつかずにリングが一杯のときは、待たずにそのフレームを捨てて数える
+（ゲームは止まらない。捨てた数は終わったときに表示する）。
+
+共有メモリの形式: ヘッダ（int64 × HEADER_FIELDS）、スロットごとのフレーム番号（int64）、
+スロット（高さ × 幅 × 4 バイト。画面と同じ 32 ビットの XRGB なので、画面の画素をそのまま
+1回のコピーで写せる）。書き込みはゲームのプロセス、読み出しは録画のプロセスの
+1つずつなので、書いた数・読んだ数をそれぞれ片方だけが増やせば鍵は要らない。
+共有メモリの名前は、録画のプロセスが開いたら（OPENED）すぐにゲームのプロセスが消す
+（開いた後は名前が無くても使える。ゲームのプロセスが落ちても共有メモリが残らない）。
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+RING_SLOTS = 8           # リングに入るフレーム数
+POLL_INTERVAL = 0.002    # 録画側でフレームが来ていないときに待つ時間（秒）
+CLOSE_TIMEOUT = 10.0     # 終わるときに録画側が残りを書き終えるのを待つ時間（秒）
+
+# ヘッダの項目（int64 の番号）
+WRITTEN, READ, DROPPED, CLOSED, WIDTH, HEIGHT, SLOTS, OPENED = range(8)
+HEADER_FIELDS = 8
+
+# スロットの画素の形式（R, G, B のマスク）と、メモリ上のバイトの並びでの名前・使っていないバイトの位置
+FRAME_MASKS = (0xff0000, 0x00ff00, 0x0000ff)
+FRAME_FORMAT, UNUSED_BYTE = ('BGRA', 3) if sys.byteorder == 'little' else ('ARGB', 0)
+
+
+class FrameRing:
+    """共有メモリのフレームのリングバッファ（作る側がゲーム、開く側が録画）"""
+
+    def __init__(self, shm, create):
+        self.shm = shm
+        self.create = create
+        self.header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=shm.buf)
+        self.width = int(self.header[WIDTH])
+        self.height = int(self.header[HEIGHT])
+        self.slots = int(self.header[SLOTS])
+        offset = self.header.nbytes
+        self.frame_numbers = np.ndarray(self.slots, dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.frame_numbers.nbytes
+        self.frames = np.ndarray((self.slots, self.height, self.width, 4), dtype=np.uint8,
+                                 buffer=shm.buf, offset=offset)
+        self.staging = None  # 形式の違う面を変換するための面
+
+    @classmethod
+    def create_ring(cls, size, slots=RING_SLOTS):
+        """(幅, 高さ) のフレームが slots 枚入るリングを作る"""
+        width, height = size
+        nbytes = (HEADER_FIELDS + slots) * 8 + slots * height * width * 4
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[WIDTH], header[HEIGHT], header[SLOTS] = width, height, slots
+        del header
+        return cls(shm, create=True)
+
+    @classmethod
+    def open_ring(cls, name):
+        """作ってあるリングを名前で開く"""
+        if sys.version_info >= (3, 13):
+            # 開いただけのプロセスの後始末の対象にしない（消すのは作ったゲームのプロセス）
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # 3.12 までは開いた側も後始末の対象になる（外す公開の方法は無い）。名前はゲームのプロセスが
+            # 先に消すので、終わるときの後始末は消すものが無いと警告するだけ
+            shm = shared_memory.SharedMemory(name=name)
+        ring = cls(shm, create=False)
+        ring.header[OPENED] = 1
+        return ring
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def dropped(self):
+        return int(self.header[DROPPED])
+
+    def publish(self, surface, frame_number):
+        """面の画素をリングにコピーする（一杯なら捨てて False）"""
+        header = self.header
+        written = int(header[WRITTEN])
+        if written - int(header[READ]) >= self.slots:
+            header[DROPPED] += 1
+            return False
+        if (surface.get_bitsize() != 32 or surface.get_masks()[:3] != FRAME_MASKS or
+                surface.get_pitch() != self.width * 4):
+            # 画面と形式が違う面は、一度スロットと同じ形式の面に写す
+            if self.staging is None:
+                self.staging = pygame.Surface((self.width, self.height), depth=32, masks=FRAME_MASKS + (0,))
+            self.staging.blit(surface, (0, 0))
+            surface = self.staging
+        slot = written % self.slots
+        pixels = np.frombuffer(surface.get_buffer(), dtype=np.uint8)
+        np.copyto(self.frames[slot], pixels.reshape(self.height, self.width, 4))
+        del pixels  # 面のロックを外す
+        self.frame_numbers[slot] = frame_number
+        # コピーし終えてから数を増やす（録画側は数を見てから読む）
+        header[WRITTEN] = written + 1
+        return True
+
+    def next_frame(self):
+        """次のフレーム (フレーム番号, 配列) を返す（無ければ None）。使い終えたら release() を呼ぶ"""
+        header = self.header
+        read = int(header[READ])
+        if read >= int(header[WRITTEN]):
+            return None
+        slot = read % self.slots
+        return int(self.frame_numbers[slot]), self.frames[slot]
+
+    def release(self):
+        """next_frame で読んだスロットを書き込みに返す"""
+        self.header[READ] += 1
+
+    @property
+    def opened(self):
+        return bool(self.header[OPENED])
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def finish(self):
+        """もう書かないことを読む側に知らせる"""
+        self.header[CLOSED] = 1
+
+    def unlink(self):
+        """作った側が共有メモリの名前を消す（開いているプロセスは close するまでそのまま使える）"""
+        if self.create:
+            self.shm.unlink()
+            self.create = False
+
+    def close(self):
+        """使い終える"""
+        # 共有メモリのビューを残したままだと閉じられない
+        del self.header, self.frame_numbers, self.frames
+        self.shm.close()
+
+
+class Spectator:
+    """ゲームのプロセス側: リングを作り、録画のプロセスを起動してフレームを送る"""
+
+    def __init__(self, size, output=None, window=False, slots=RING_SLOTS):
+        self.ring = FrameRing.create_ring(size, slots)
+        self.sent = 0
+        command = [sys.executable, os.path.abspath(__file__), self.ring.name]
+        if sys.version_info < (3, 13):
+            # 録画のプロセスの後始末（3.12 まで）は、消した名前を消そうとして警告するので出さない
+            # （-W は後始末のプロセスにも引き継がれる）
+            command[1:1] = ['-W', 'ignore:resource_tracker:UserWarning:multiprocessing.resource_tracker']
+        if output is not None:
+            command += ['--output', output]
+        if window:
+            command.append('--window')
+        self.process = subprocess.Popen(command)
+
+    def send(self, surface, frame_number):
+        """描き終えた面を送る（録画が追いついていなければ捨てる）"""
+        ring = self.ring
+        if ring.create and ring.opened:
+            ring.unlink()
+        if ring.publish(surface, frame_number):
+            self.sent += 1
+
+    def close(self):
+        """録画のプロセスが残りを書き終えるのを待って終わる"""
+        ring = self.ring
+        dropped = ring.dropped
+        ring.finish()
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        # まだ開かれていなければ、開くか終わるのを待ってから名前を消す
+        while ring.create and not ring.opened and self.process.poll() is None and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        ring.unlink()
+        try:
+            self.process.wait(max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print("録画のプロセスが終わらないので止める", file=sys.stderr)
+            self.process.kill()
+        ring.close()
+        print(f"録画: {self.sent} フレームを送り、{dropped} フレームを捨てた", file=sys.stderr)
+
+
+class ImageSequenceWriter:
+    """PNG などの連番の画像に保存する（ディレクトリ）"""
+
+    def __init__(self, directory, size):
+        self.directory = directory
+        self.size = size
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame_number, pixels):
+        surface = pygame.image.frombuffer(pixels.data, self.size, FRAME_FORMAT)
+        pygame.image.save(surface, os.path.join(self.directory, f"frame-{frame_number:06d}.png"))
+
+    def close(self):
+        pass
+
+
+class RawVideoWriter:
+    """生の画素（スロットと同じ 32 ビット）を1つのファイルに続けて書く"""
+
+    def __init__(self, path, size):
+        self.file = open(path, 'wb')
+        width, height = size
+        pixel_format = FRAME_FORMAT.lower()
+        print(f"動画にするには: ffmpeg -f rawvideo -pix_fmt {pixel_format} -s {width}x{height} -r 60"
+              f" -i {path} out.mp4", file=sys.stderr)
+
+    def write(self, frame_number, pixels):
+        self.file.write(pixels.data)
+
+    def close(self):
+        self.file.close()
+
+
+class WindowMirror:
+    """別のウィンドウに映す"""
+
+    def __init__(self, size):
+        pygame.display.init()
+        self.size = size
+        self.screen = pygame.display.set_mode(size)
+        pygame.display.set_caption('謎の壁 - 観戦')
+
+    def write(self, frame_number, pixels):
+        pygame.event.pump()
+        self.screen.blit(pygame.image.frombuffer(pixels.data, self.size, FRAME_FORMAT), (0, 0))
+        pygame.display.flip()
+
+    def close(self):
+        pygame.display.quit()
+
+
+def make_writers(output, window, size):
+    """--output と --window から書き出し先を作る（.raw なら生の画素、それ以外は連番の画像のディレクトリ）"""
+    writers = []
+    if output is not None:
+        if output.endswith('.raw'):
+            writers.append(RawVideoWriter(output, size))
+        else:
+            writers.append(ImageSequenceWriter(output, size))
+    if window:
+        writers.append(WindowMirror(size))
+    return writers
+
+
+def run(name, output=None, window=False):
+    """リングからフレームを読んで書き出す（ゲームが終わり、残りを書き終えたら戻る）。書いた数を返す"""
+    parent = os.getppid()
+    ring = FrameRing.open_ring(name)
+    size = (ring.width, ring.height)
+    writers = make_writers(output, window, size)
+    count = 0
+    try:
+        while True:
+            entry = ring.next_frame()
+            if entry is None:
+                # ゲームが終わった（落ちて知らせが来ないときは、親のプロセスが変わる）
+                if ring.closed or os.getppid() != parent:
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+            frame_number, pixels = entry
+            # 画面の使っていないバイトはアルファとして読まれるので、不透明にしておく
+            pixels[..., UNUSED_BYTE] = 255
+            for writer in writers:
+                writer.write(frame_number, pixels)
+            del pixels, entry
+            ring.release()
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+        ring.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('name', help='共有メモリの名前（ゲームのプロセスが渡す）')
+    parser.add_argument('--output', help='保存先（.raw なら生の画素、それ以外は PNG の連番のディレクトリ）')
+    parser.add_argument('--window', action='store_true', help='別のウィンドウに映す')
+    args = parser.parse_args()
+    # Ctrl+C はゲームのプロセスにも届くので、こちらは無視して、知らせを受けてから残りを書いて終わる
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    count = run(args.name, args.output, args.window)
+    print(f"録画: {count} フレームを書いた", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
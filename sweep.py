@@ -0,0 +1,232 @@
+"""謎の壁 - バランス調整用のパラメータスイープ
+
+    python sweep.py --out results/ --paddle-max-tilt 45,60,75 --min-angle 20,30 \\
+        --ball-speed 6,8,10 --paddle-speed 10 --move-down-interval 30,60 --seeds 200
+
+調整値の組み合わせ（セル）ごとに、シードで決まる自動プレイヤーのゲームを画面無しで遊ばせ、
+結果を列ごとの配列として out ディレクトリに書き出す。
+--policy autopilot にすると、玉の落下位置を予測して受ける強いプレイヤー（predict.py）で遊ばせる
+（予測にシードごとのずれを足すので、シードごとに違うゲームになる）。
+
+- 仕事はセル × シードの塊（--chunk-size 個のゲーム）に分け、全コアのプロセスプールで処理する。
+  1つの塊は VectorGameEngine でまとめて進めるので、1ゲームあたりの手間は小さい。
+- 終わった塊は1つずつ chunk-*.npz に書き出す。同じ条件でもう一度実行すると、
+  書き出し済みの塊は飛ばして続きから再開する。
+- 結果は load_results(out) で列ごとの配列（dict）として読める。
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from engine import (
+    GameConfig, PADDLE_WIDTH, PADDLE_MAX_TILT, MIN_ANGLE, BALL_SPEED, PADDLE_SPEED,
+    ENEMY_MOVE_DOWN_INTERVAL, START_LIVES, ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE,
+)
+from predict import autopilot_action, predict_landing
+from vector_env import VectorGameEngine
+
+# スイープする調整値（列名, コマンドライン引数, 既定値, 型）。角度は度で指定する
+PARAMETERS = [
+    ('paddle_max_tilt', '--paddle-max-tilt', round(math.degrees(PADDLE_MAX_TILT), 6), float),
+    ('min_angle', '--min-angle', round(math.degrees(MIN_ANGLE), 6), float),
+    ('ball_speed', '--ball-speed', BALL_SPEED, float),
+    ('paddle_speed', '--paddle-speed', PADDLE_SPEED, int),
+    ('move_down_interval', '--move-down-interval', ENEMY_MOVE_DOWN_INTERVAL, int),
+]
+
+# 結果の列（1行が1ゲーム）
+RESULT_COLUMNS = ['seed', 'score', 'frames', 'lives_lost', 'clear_frame']
+
+# 自動プレイヤーの癖
+AIM_ERROR = 40        # 狙う位置のずれの最大（ピクセル）
+AIM_HOLD_FRAMES = 30  # 狙う位置を変える間隔（フレーム）
+IDLE_RATE = 0.1       # 何もしないフレームの割合
+AUTOPILOT_ERROR = 8   # 自動操縦の落下位置の予測のずれの最大（ピクセル。狙う位置と同じ間隔で変える）
+
+
+def cell_config(cell):
+    """セル（調整値の dict）から GameConfig を作る"""
+    return GameConfig(paddle_max_tilt=math.radians(cell['paddle_max_tilt']),
+                      min_angle=math.radians(cell['min_angle']),
+                      ball_speed=cell['ball_speed'],
+                      paddle_speed=cell['paddle_speed'],
+                      enemy_move_down_interval=cell['move_down_interval'])
+
+
+def seeded_random(seeds, counter):
+    """シードとカウンタだけで決まる 0〜1 の乱数（splitmix64）
+
+    同じシードのゲームは、どの塊で何個と一緒に進めても同じ入力になる。
+    """
+    x = seeds.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(counter)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def bot_actions(game, seeds, frame):
+    """玉を追いかける自動プレイヤーの入力（シードごとに狙いのずれ・迷いが違う）"""
+    aim = (seeded_random(seeds, 2 * (frame // AIM_HOLD_FRAMES)) * 2 - 1) * AIM_ERROR
+    idle = seeded_random(seeds, 2 * frame + 1) < IDLE_RATE
+    target = game.ball_x + aim
+    center = game.paddle_x + PADDLE_WIDTH / 2
+    actions = np.where(center < target - game.paddle_speed / 2, ACTION_RIGHT,
+                       np.where(center > target + game.paddle_speed / 2, ACTION_LEFT, ACTION_NONE))
+    actions[idle] = ACTION_NONE
+    actions[~game.ball_active] |= ACTION_FIRE
+    return actions
+
+
+def autopilot_actions(game, seeds, frame):
+    """玉の落下位置を予測して受ける自動操縦の入力（predict.autopilot_action）
+
+    自動操縦は入力がゲームの状態だけで決まるので、予測した落下位置にシードごとのずれを足す
+    （足さなければ、同じセルのゲームは全て同じ結果になる）。
+    """
+    landing_x, _ = predict_landing(game)
+    error = (seeded_random(seeds, 2 * (frame // AIM_HOLD_FRAMES)) * 2 - 1) * AUTOPILOT_ERROR
+    return autopilot_action(game, landing_x + error)
+
+
+# 自動プレイヤーの種類（--policy）
+POLICIES = {'bot': bot_actions, 'autopilot': autopilot_actions}
+
+
+def play_games(cell, seeds, max_frames, policy='bot'):
+    """1つのセルでシードの数だけゲームを遊ばせ、結果の列を返す
+
+    ライフが無くなるか、レベルクリアするか、max_frames に達したらそのゲームは終わり。
+    """
+    seeds = np.asarray(seeds, dtype=np.int64)
+    count = len(seeds)
+    game = VectorGameEngine(count, cell_config(cell))
+    score = np.zeros(count, dtype=np.int64)
+    frames = np.full(count, max_frames, dtype=np.int64)
+    lives_lost = np.zeros(count, dtype=np.int64)
+    clear_frame = np.full(count, -1, dtype=np.int64)
+    playing = np.ones(count, dtype=bool)
+    actions = POLICIES[policy]
+
+    for frame in range(1, max_frames + 1):
+        _, done = game.step(actions(game, seeds, frame))
+        finished = done & playing
+        score[finished] = game.final_score[finished]
+        frames[finished] = frame
+        lives_lost[finished] = START_LIVES - game.final_lives[finished]
+        clear_frame[finished & game.final_level_cleared] = frame
+        playing &= ~done
+        if not playing.any():
+            break
+
+    # 最後まで続いたゲーム
+    score[playing] = game.score[playing]
+    lives_lost[playing] = START_LIVES - game.lives[playing]
+    return {'seed': seeds, 'score': score, 'frames': frames,
+            'lives_lost': lives_lost, 'clear_frame': clear_frame}
+
+
+def chunk_path(out_dir, cell, seeds, max_frames, policy):
+    """塊の結果のファイル名（セル・シード・フレーム数・プレイヤーで決まるので、再開時に同じ名前になる）"""
+    key = json.dumps([cell, seeds[0], seeds[-1], max_frames, policy], sort_keys=True)
+    return os.path.join(out_dir, f"chunk-{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz")
+
+
+def run_chunk(task):
+    """プロセスプールで1つの塊を処理し、結果をファイルに書く"""
+    path, cell, seeds, max_frames, policy = task
+    results = play_games(cell, seeds, max_frames, policy)
+    columns = {name: np.full(len(seeds), cell[name]) for name, *_ in PARAMETERS}
+    columns.update(results)
+    # 書きかけのファイルが残らないように、書き終えてから名前を変える
+    temp_path = path + '.tmp.npz'
+    np.savez(temp_path, **columns)
+    os.replace(temp_path, path)
+    return path
+
+
+def make_tasks(out_dir, grid, seeds, chunk_size, max_frames, policy='bot'):
+    """全ての塊と、そのうちまだ結果が無いものを返す"""
+    tasks = []
+    names = [name for name, *_ in PARAMETERS]
+    for values in itertools.product(*(grid[name] for name in names)):
+        cell = dict(zip(names, values))
+        for start in range(0, len(seeds), chunk_size):
+            chunk_seeds = seeds[start:start + chunk_size]
+            tasks.append((chunk_path(out_dir, cell, chunk_seeds, max_frames, policy),
+                          cell, chunk_seeds, max_frames, policy))
+    pending = [task for task in tasks if not os.path.exists(task[0])]
+    return tasks, pending
+
+
+def load_results(out_dir, paths=None):
+    """書き出した結果を列ごとの配列（dict）にまとめて読む"""
+    if paths is None:
+        paths = sorted(os.path.join(out_dir, name) for name in os.listdir(out_dir)
+                       if name.startswith('chunk-') and name.endswith('.npz') and '.tmp' not in name)
+    columns = {name: [] for name, *_ in PARAMETERS}
+    columns.update({name: [] for name in RESULT_COLUMNS})
+    for path in paths:
+        with np.load(path) as data:
+            for name in columns:
+                columns[name].append(data[name])
+    return {name: np.concatenate(parts) if parts else np.zeros(0) for name, parts in columns.items()}
+
+
+def print_summary(results):
+    """セルごとの平均を表示"""
+    names = [name for name, *_ in PARAMETERS]
+    cells = sorted(set(zip(*(results[name].tolist() for name in names))))
+    print(' '.join(f"{name:>18}" for name in names) +
+          f" {'ゲーム数':>6} {'平均点':>8} {'フレーム':>8} {'失ったライフ':>6} {'クリア率':>8}")
+    for cell in cells:
+        mask = np.ones(len(results['seed']), dtype=bool)
+        for name, value in zip(names, cell):
+            mask &= results[name] == value
+        cleared = results['clear_frame'][mask] >= 0
+        print(' '.join(f"{value:>18g}" for value in cell) +
+              f" {mask.sum():>6} {results['score'][mask].mean():>8.1f}"
+              f" {results['frames'][mask].mean():>8.0f} {results['lives_lost'][mask].mean():>6.2f}"
+              f" {cleared.mean():>8.1%}")
+
+
+def parse_values(kind):
+    """'45,60,75' のようなカンマ区切りの値を読む"""
+    return lambda text: [kind(value) for value in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', required=True, help='結果を書き出すディレクトリ')
+    for name, option, default, kind in PARAMETERS:
+        parser.add_argument(option, dest=name, type=parse_values(kind), default=[kind(default)],
+                            help=f'試す値（カンマ区切り、既定 {default:g}）')
+    parser.add_argument('--seeds', type=int, default=100, help='セルごとのゲーム数（シード 0〜N-1）')
+    parser.add_argument('--max-frames', type=int, default=20000, help='1ゲームの最大フレーム数')
+    parser.add_argument('--chunk-size', type=int, default=50, help='1つの塊のゲーム数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='プロセス数')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='bot',
+                        help='自動プレイヤー（autopilot は玉の落下位置を予測して受ける）')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    grid = {name: getattr(args, name) for name, *_ in PARAMETERS}
+    tasks, pending = make_tasks(args.out, grid, list(range(args.seeds)), args.chunk_size, args.max_frames,
+                                args.policy)
+    print(f"塊 {len(tasks)} 個（書き出し済み {len(tasks) - len(pending)} 個）")
+
+    with Pool(args.workers) as pool:
+        for done, path in enumerate(pool.imap_unordered(run_chunk, pending), 1):
+            print(f"[{done}/{len(pending)}] {os.path.basename(path)}", flush=True)
+
+    print_summary(load_results(args.out, [task[0] for task in tasks]))
+
+
+if __name__ == '__main__':
+    main()
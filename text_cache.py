@@ -0,0 +1,65 @@
+"""文字の描画結果のキャッシュ
+
+font.render は遅いので、(フォント, 文字列, 色, アンチエイリアス) ごとに結果を覚えておき、
+長く使われていないものから捨てる（LRU）。スコアのように値が変わり続ける数字は
+1文字ずつキャッシュした字形を並べて作るので、値ごとにキャッシュが増えていかない。
+"""
+import functools
+from collections import OrderedDict
+
+import pygame
+
+# 覚えておく描画結果の数
+TEXT_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(name, size):
+    """フォントを作る（同じ名前・大きさなら同じオブジェクトを返す）"""
+    return pygame.font.SysFont(name, size)
+
+
+class TextCache:
+    """font.render の結果を LRU で覚えておく"""
+
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()  # (フォント, 文字列, 色, アンチエイリアス) -> Surface
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """font.render(text, antialias, color) と同じ面（中身を書き換えないこと）"""
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def render_number(self, font, prefix, number, color, antialias=True):
+        """prefix の後に number（整数や '0.12' のような文字列）を続けた面を作る
+
+        prefix と1文字ずつの字形はキャッシュから取り、並べて1枚の面にする。
+        できた面はキャッシュしない（値が変わったときだけ呼ぶ）。
+        """
+        parts = [self.render(font, prefix, color, antialias)] if prefix else []
+        parts.extend(self.render(font, char, color, antialias) for char in str(number))
+        surface = pygame.Surface((sum(part.get_width() for part in parts), font.get_height()),
+                                 pygame.SRCALPHA)
+        x = 0
+        for part in parts:
+            # 透明な面の上に並べるだけなので、色とアルファをそのまま写す
+            surface.blit(part, (x, 0), special_flags=pygame.BLEND_RGBA_MAX if antialias else 0)
+            x += part.get_width()
+        return surface
+
+
+# main.py・renderer.py・sample.py で共有するキャッシュ
+TEXT_CACHE = TextCache()
@@ -0,0 +1,136 @@
+"""固定の tick でシミュレーションを進め、描画は tick の間を補間する
+
+GameEngine の速さは全て1 tick あたり（玉 8 px、パドル 10 px、敵が手前に動くのは 60 tick ごと）
+なので、描画の速さに関係なく tick を TICK_RATE 回/秒で回す。
+
+    timestep = FixedTimestep()
+    while True:
+        for _ in range(timestep.advance(time.perf_counter())):
+            previous = capture_positions(game)
+            game.step(action)
+        if not timestep.skip_render():
+            renderer.render(InterpolatedGame(game, previous, timestep.alpha))
+
+描画が間に合わないときは、1回に回す tick を MAX_CATCH_UP_TICKS までにし、
+それでも追いつかない分の時間は捨てる（ゲームが遅くなるだけで、止まらなくなることはない）。
+追いついていない間は描画を MAX_SKIPPED_RENDERS 回まで飛ばして tick に時間を回す。
+"""
+import numpy as np
+
+from engine import EVENT_BALL_PROMOTED, EVENT_RESET
+
+TICK_RATE = 60            # 1秒あたりの tick 数
+MAX_CATCH_UP_TICKS = 5    # 1回の描画の間に回す tick の最大数
+MAX_SKIPPED_RENDERS = 3   # 続けて飛ばしてよい描画の数
+
+
+class FixedTimestep:
+    """経過時間を積み立てて、回す tick の数を決める"""
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=MAX_CATCH_UP_TICKS, max_skipped=MAX_SKIPPED_RENDERS):
+        self.tick = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.max_skipped = max_skipped
+        self.accumulator = 0.0
+        self.last_time = None
+        self.behind = False        # 前回の advance で tick が追いつかなかった
+        self.skipped_renders = 0   # 続けて飛ばした描画の数
+        self.dropped_ticks = 0     # 追いつけずに捨てた tick の数（累計）
+
+    def advance(self, now):
+        """now（秒）までに回すべき tick の数"""
+        if self.last_time is None:
+            # 最初の1回は1 tick だけ回す
+            self.last_time = now
+            return 1
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        ticks = int(self.accumulator / self.tick)
+        self.behind = ticks > self.max_ticks
+        if self.behind:
+            # 追いつけない分は捨てる（補間用の端数は残す）
+            self.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+            self.accumulator %= self.tick
+        else:
+            self.accumulator -= ticks * self.tick
+        return ticks
+
+    def skip_render(self):
+        """今回の描画を飛ばすか（追いついていない間、続けて max_skipped 回まで）"""
+        if self.behind and self.skipped_renders < self.max_skipped:
+            self.skipped_renders += 1
+            return True
+        self.skipped_renders = 0
+        return False
+
+    @property
+    def alpha(self):
+        """最後の tick から次の tick までの進み具合（0〜1）"""
+        return min(self.accumulator / self.tick, 1.0)
+
+
+def capture_positions(game):
+    """補間用に、tick を進める前の位置を覚えておく"""
+    enemies = game.enemies
+    balls = game.balls
+    return (game.ball_x, game.ball_y, game.paddle_x, game.lives, enemies, enemies.x.copy(), enemies.y.copy(),
+            balls.removed, balls.x[:balls.count].copy(), balls.y[:balls.count].copy())
+
+
+class InterpolatedStore:
+    """EnemyStore・BallStore の代わりに、x, y だけ前の tick との間の位置を返す"""
+
+    def __init__(self, store, x, y):
+        self.store = store
+        self.x = x
+        self.y = y
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def __len__(self):
+        return len(self.store)
+
+
+def interpolate(previous, current, alpha):
+    """前の tick の位置 previous と今の位置 current の間（current と同じ型）"""
+    return (previous + (current - previous) * np.float32(alpha)).astype(current.dtype)
+
+
+class InterpolatedGame:
+    """描画用に、玉・パドル・敵の位置を前の tick と今の tick の間にした GameEngine の代わり
+
+    ステージの作り直し・ライフが減って玉が戻ったとき・増えた玉が主の玉になったときは瞬間移動なので補間しない。
+    増えた玉は、消えた玉があって番号がずれたときは補間せず、このフレームで増えた玉は今の位置に描く。
+    """
+
+    def __init__(self, game, previous, alpha, events=()):
+        self.game = game
+        ball_x, ball_y, paddle_x, lives, enemies, enemy_x, enemy_y, removed, extra_x, extra_y = previous
+        if (any(kind == EVENT_RESET or kind == EVENT_BALL_PROMOTED for kind, _ in events) or
+                lives != game.lives or enemies is not game.enemies):
+            alpha = 1.0
+        self.ball_x = ball_x + (game.ball_x - ball_x) * alpha
+        self.ball_y = ball_y + (game.ball_y - ball_y) * alpha
+        self.paddle_x = paddle_x + (game.paddle_x - paddle_x) * alpha
+        if alpha >= 1.0:
+            self.enemies = game.enemies
+        else:
+            store = game.enemies
+            self.enemies = InterpolatedStore(store, interpolate(enemy_x, store.x, alpha),
+                                             interpolate(enemy_y, store.y, alpha))
+        balls = game.balls
+        if alpha >= 1.0 or removed != balls.removed or not len(extra_x):
+            self.balls = balls
+        else:
+            # 前の tick からある玉（先頭の方）だけ補間する
+            kept = len(extra_x)
+            x = balls.x[:balls.count].copy()
+            y = balls.y[:balls.count].copy()
+            x[:kept] = interpolate(extra_x, x[:kept], alpha)
+            y[:kept] = interpolate(extra_y, y[:kept], alpha)
+            self.balls = InterpolatedStore(balls, x, y)
+
+    def __getattr__(self, name):
+        return getattr(self.game, name)
@@ -0,0 +1,346 @@
+"""謎の壁 - N 個のゲームを同時に進めるベクトル環境（ボットの学習・バランス調整用）
+
+N 個のゲームの玉・パドル・ブロック・敵の状態を (N, ...) の配列で持ち、
+VectorGameEngine.step(actions) 1回で全てのゲームを1フレーム進める。
+結果は GameEngine を N 個動かした場合と同じになる（python -m benchmarks.vector_env --check で確認できる）。
+"""
+import math
+
+import numpy as np
+
+from engine import (
+    GameConfig, GameEngine, bounce_velocities, paddle_velocities,
+    WALL_THICKNESS, LEFT_WALL_X, TOP_WALL_Y,
+    PADDLE_WIDTH, PADDLE_HEIGHT, BALL_RADIUS, ENEMY_WIDTH, ENEMY_HEIGHT,
+    ENEMY_MOVE_DOWN_STEP, MIN_DISTANCE_FROM_PADDLE,
+    START_LIVES, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE,
+)
+
+
+class VectorGameEngine:
+    """同じ大きさのステージで遊ぶ N 個のゲーム
+
+    ライフが 0 になった・レベルクリアしたゲームは、その step の最後に最初からやり直す
+    （GameEngine.reset() と同じ状態に戻す）。
+    """
+
+    def __init__(self, num_games, config=None):
+        self.num_games = num_games
+        self.config = config if config is not None else GameConfig()
+        if self.config.continuous_collision:
+            raise ValueError("VectorGameEngine は continuous_collision に対応していない")
+        if self.config.multi_ball:
+            raise ValueError("VectorGameEngine は multi_ball に対応していない")
+        self.screen_width = self.config.screen_width
+        self.right_wall_x = self.config.screen_width - WALL_THICKNESS
+        self.bottom_y = self.config.screen_height
+        self.paddle_y = self.bottom_y - 50
+        self.paddle_speed = self.config.paddle_speed
+        self.paddle_max_tilt = self.config.paddle_max_tilt
+        self.min_angle = self.config.min_angle
+        self.ball_speed = self.config.ball_speed
+        self.enemy_move_down_interval = self.config.enemy_move_down_interval
+
+        # ブロック・敵の初期配置はステージの大きさだけで決まるので、GameEngine から借りる
+        layout = GameEngine(None, self.config)
+        blocks = layout.blocks
+        enemies = layout.enemies
+        self.block_x = blocks.x.astype(np.float64)
+        self.block_y = blocks.y.astype(np.float64)
+        self.block_width = blocks.width.astype(np.float64)
+        self.block_height = blocks.height.astype(np.float64)
+        self.block_right = np.add(blocks.x, blocks.width, dtype=np.float64)
+        self.block_bottom = np.add(blocks.y, blocks.height, dtype=np.float64)
+        self.initial_enemy_x = enemies.x.copy()
+        self.initial_enemy_y = enemies.y.copy()
+        self.initial_enemy_direction = enemies.direction.copy()
+        self.enemy_width = enemies.width.copy()
+        self.enemy_height = enemies.height.copy()
+        self.enemy_speed = enemies.speed.copy()
+
+        # 敵ごとに、同じ列で上・下にあるブロック（閉じ込められた敵は動かないので初期位置で決まる）
+        enemy_x = enemies.x.astype(np.float64)[:, None]
+        enemy_y = enemies.y.astype(np.float64)[:, None]
+        same_column = ((self.block_right > enemy_x) &
+                       (self.block_x < enemy_x + enemies.width[:, None]))
+        self.blocks_above = (same_column & (self.block_y < enemy_y)).T.astype(np.int32)
+        self.blocks_below = (same_column &
+                             (self.block_y > enemy_y + enemies.height[:, None])).T.astype(np.int32)
+
+        count = num_games
+        self.paddle_x = np.zeros(count, dtype=np.int64)
+        self.ball_x = np.zeros(count)
+        self.ball_y = np.zeros(count)
+        self.ball_dx = np.zeros(count)
+        self.ball_dy = np.zeros(count)
+        self.ball_active = np.zeros(count, dtype=bool)
+        self.lives = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        # 最後に終わったゲームのスコア・残りライフ・レベルクリアしたか
+        self.final_score = np.zeros(count, dtype=np.int64)
+        self.final_lives = np.zeros(count, dtype=np.int64)
+        self.final_level_cleared = np.zeros(count, dtype=bool)
+        self.level_cleared = np.zeros(count, dtype=bool)
+        self.game_over = np.zeros(count, dtype=bool)
+        self.block_active = np.ones((count, len(blocks)), dtype=bool)
+        self.enemy_x = np.zeros((count, len(enemies)), dtype=enemies.x.dtype)
+        self.enemy_y = np.zeros((count, len(enemies)), dtype=enemies.y.dtype)
+        self.enemy_active = np.ones((count, len(enemies)), dtype=bool)
+        self.enemy_trapped = np.ones((count, len(enemies)), dtype=bool)
+        self.enemy_direction = np.zeros((count, len(enemies)), dtype=np.int8)
+        self.enemy_move_down_timer = np.zeros((count, len(enemies)), dtype=np.int16)
+        self.trap_check_pending = np.ones(count, dtype=bool)
+        self.frame = 0
+        self.reset()
+
+    def reset(self):
+        """全てのゲームを最初からやり直す"""
+        self.frame = 0
+        self.reset_games(np.ones(self.num_games, dtype=bool))
+
+    def reset_games(self, mask):
+        """mask が True のゲームを最初からやり直す"""
+        self.paddle_x[mask] = self.screen_width // 2 - PADDLE_WIDTH // 2
+        self.lives[mask] = START_LIVES
+        self.score[mask] = 0
+        self.level_cleared[mask] = False
+        self.game_over[mask] = False
+        self.block_active[mask] = True
+        self.enemy_x[mask] = self.initial_enemy_x
+        self.enemy_y[mask] = self.initial_enemy_y
+        self.enemy_active[mask] = True
+        self.enemy_trapped[mask] = True
+        self.enemy_direction[mask] = self.initial_enemy_direction
+        self.enemy_move_down_timer[mask] = 0
+        self.trap_check_pending[mask] = True
+        self.reset_balls(mask)
+
+    def reset_balls(self, mask):
+        """mask が True のゲームの玉をパドルの上に戻す"""
+        ball_angle = -math.pi / 4
+        self.ball_x[mask] = self.paddle_x[mask] + PADDLE_WIDTH // 2
+        self.ball_y[mask] = self.paddle_y - BALL_RADIUS - 5
+        self.ball_dx[mask] = self.ball_speed * math.cos(ball_angle)
+        self.ball_dy[mask] = self.ball_speed * math.sin(ball_angle)
+        self.ball_active[mask] = False
+
+    def check_ball_wall_collision(self, moving):
+        """玉と壁の衝突判定"""
+        # 左壁
+        hit = moving & (self.ball_x - BALL_RADIUS <= LEFT_WALL_X + WALL_THICKNESS)
+        self.ball_x[hit] = LEFT_WALL_X + WALL_THICKNESS + BALL_RADIUS
+        self.ball_dx[hit] = np.abs(self.ball_dx[hit])
+
+        # 右壁
+        hit = moving & (self.ball_x + BALL_RADIUS >= self.right_wall_x)
+        self.ball_x[hit] = self.right_wall_x - BALL_RADIUS
+        self.ball_dx[hit] = -np.abs(self.ball_dx[hit])
+
+        # 上壁
+        hit = moving & (self.ball_y - BALL_RADIUS <= TOP_WALL_Y + WALL_THICKNESS)
+        self.ball_y[hit] = TOP_WALL_Y + WALL_THICKNESS + BALL_RADIUS
+        self.ball_dy[hit] = np.abs(self.ball_dy[hit])
+
+    def check_ball_paddle_collision(self, moving):
+        """玉とパドルの衝突判定（GameEngine.check_ball_paddle_collision と同じ反射）"""
+        hit = np.flatnonzero(moving &
+                             (self.ball_y + BALL_RADIUS >= self.paddle_y) &
+                             (self.ball_y - BALL_RADIUS <= self.paddle_y + PADDLE_HEIGHT) &
+                             (self.ball_x + BALL_RADIUS >= self.paddle_x) &
+                             (self.ball_x - BALL_RADIUS <= self.paddle_x + PADDLE_WIDTH))
+        if hit.size == 0:
+            return
+
+        # パドルのどの位置に当たったか（-1.0: 左端 〜 1.0: 右端）
+        hit_pos = (self.ball_x[hit] - self.paddle_x[hit]) / PADDLE_WIDTH
+        offset = (hit_pos - 0.5) * 2.0
+        self.ball_dx[hit], self.ball_dy[hit] = paddle_velocities(offset, self.ball_speed,
+                                                                 self.paddle_max_tilt)
+        self.ball_y[hit] = self.paddle_y - BALL_RADIUS
+
+    def bounce_balls(self, games, x, y, width, height):
+        """ブロック・敵に当たった玉を反射させる（GameEngine.bounce_ball と同じ）"""
+        self.ball_dx[games], self.ball_dy[games] = bounce_velocities(
+            self.ball_x[games], self.ball_y[games], self.ball_dx[games], self.ball_dy[games],
+            x, y, width, height, self.min_angle)
+
+    def check_ball_block_collision(self, moving):
+        """玉とブロックの衝突判定（番号が最小のブロック1つだけ）"""
+        games = np.flatnonzero(moving)
+        x = self.ball_x[games, None]
+        y = self.ball_y[games, None]
+        hit = (self.block_active[games] &
+               (self.block_x <= x + BALL_RADIUS) & (self.block_right >= x - BALL_RADIUS) &
+               (self.block_y <= y + BALL_RADIUS) & (self.block_bottom >= y - BALL_RADIUS))
+        found = hit.any(axis=1)
+        games = games[found]
+        if games.size == 0:
+            return
+        index = hit[found].argmax(axis=1)
+
+        self.bounce_balls(games, self.block_x[index], self.block_y[index],
+                          self.block_width[index], self.block_height[index])
+        self.block_active[games, index] = False
+        self.trap_check_pending[games] = True
+        self.score[games] += 10
+
+    def check_ball_enemy_collision(self, moving):
+        """玉と敵の衝突判定（番号が最小の敵1体だけ）"""
+        games = np.flatnonzero(moving)
+        x = self.ball_x[games, None]
+        y = self.ball_y[games, None]
+        enemy_x = self.enemy_x[games]
+        enemy_y = self.enemy_y[games]
+        hit = (self.enemy_active[games] &
+               (enemy_x <= x + BALL_RADIUS) &
+               (np.add(enemy_x, self.enemy_width, dtype=np.float64) >= x - BALL_RADIUS) &
+               (enemy_y <= y + BALL_RADIUS) &
+               (np.add(enemy_y, self.enemy_height, dtype=np.float64) >= y - BALL_RADIUS))
+        found = hit.any(axis=1)
+        games = games[found]
+        if games.size == 0:
+            return
+        index = hit[found].argmax(axis=1)
+
+        self.bounce_balls(games, self.enemy_x[games, index].astype(np.float64),
+                          self.enemy_y[games, index].astype(np.float64),
+                          self.enemy_width[index].astype(np.float64),
+                          self.enemy_height[index].astype(np.float64))
+        self.enemy_active[games, index] = False
+        self.score[games] += 20
+
+    def check_enemy_trapped(self, playing):
+        """ブロックが壊れたゲームで、動けるようになった敵の trapped を外す"""
+        games = np.flatnonzero(playing & self.trap_check_pending)
+        if games.size == 0:
+            return
+        block_active = self.block_active[games].astype(np.int32)
+        above = block_active @ self.blocks_above
+        below = block_active @ self.blocks_below
+        # 上下のブロック行にブロックが残っていれば阻まれている（倒された敵はそのまま）
+        trapped = (above > 0) & (below > 0)
+        self.enemy_trapped[games] &= trapped | ~self.enemy_active[games]
+        self.trap_check_pending[games] = False
+
+    def check_enemy_positions_valid(self, games, index, x, y):
+        """games のゲームで、敵 index を (x, y) に置けるか（GameEngine.check_enemy_position_valid と同じ）"""
+        valid = ((x >= LEFT_WALL_X + WALL_THICKNESS) &
+                 (x + ENEMY_WIDTH <= self.right_wall_x) &
+                 (y >= TOP_WALL_Y + WALL_THICKNESS) &
+                 (y + ENEMY_HEIGHT <= self.paddle_y - MIN_DISTANCE_FROM_PADDLE))
+
+        x = x[:, None]
+        y = y[:, None]
+        blocks = (self.block_active[games] &
+                  (x + ENEMY_WIDTH > self.block_x) & (x < self.block_right) &
+                  (y + ENEMY_HEIGHT > self.block_y) & (y < self.block_bottom))
+        valid &= ~blocks.any(axis=1)
+
+        enemy_x = self.enemy_x[games]
+        enemy_y = self.enemy_y[games]
+        others = (self.enemy_active[games] &
+                  (x + ENEMY_WIDTH > enemy_x) &
+                  (x < np.add(enemy_x, self.enemy_width, dtype=np.float64)) &
+                  (y + ENEMY_HEIGHT > enemy_y) &
+                  (y < np.add(enemy_y, self.enemy_height, dtype=np.float64)))
+        others[:, index] = False
+        valid &= ~others.any(axis=1)
+        return valid
+
+    def update_enemies(self, playing):
+        """敵の移動（GameEngine.update_enemies と同じ）
+
+        1つのゲームの中では番号順に動かす必要があるので、敵の番号ごとに全てのゲームをまとめて動かす。
+        """
+        moving = self.enemy_active & ~self.enemy_trapped & playing[:, None]
+        for index in np.flatnonzero(moving.any(axis=0)).tolist():
+            games = np.flatnonzero(moving[:, index])
+
+            # タイマーを更新し、一定時間ごとに手前に移動を試みる
+            timer = self.enemy_move_down_timer[games, index] + 1
+            move_down = timer >= self.enemy_move_down_interval
+            timer[move_down] = 0
+            self.enemy_move_down_timer[games, index] = timer
+
+            x = self.enemy_x[games, index].astype(np.float64)
+            y = self.enemy_y[games, index].astype(np.float64)
+            width = float(self.enemy_width[index])
+            direction = self.enemy_direction[games, index]
+            new_x = x + direction * int(self.enemy_speed[index])
+
+            # まず横方向の移動を試みる
+            valid = self.check_enemy_positions_valid(games, index, new_x, y)
+            blocked = ~valid
+            x = np.where(valid, new_x, x)
+            # 壁に当たったら方向転換
+            turn_right = blocked & (new_x <= LEFT_WALL_X + WALL_THICKNESS)
+            turn_left = blocked & ~turn_right & (new_x + width >= self.right_wall_x)
+            x[turn_right] = LEFT_WALL_X + WALL_THICKNESS
+            x[turn_left] = self.right_wall_x - width
+            direction[turn_right] = 1
+            direction[turn_left] = -1
+            self.enemy_x[games, index] = x
+            self.enemy_direction[games, index] = direction
+
+            # 横に移動できない場合は下に移動を試みる
+            move_down |= blocked
+            new_y = y + ENEMY_MOVE_DOWN_STEP
+            move_down &= self.check_enemy_positions_valid(games, index, x, new_y)
+            self.enemy_y[games, index] = np.where(move_down, new_y, y)
+
+    def step(self, actions):
+        """全てのゲームを1フレーム進める
+
+        actions は ACTION_* のビットフラグの配列（ゲームごと）。
+        (このフレームで増えたスコア, 終わってやり直したゲーム) の配列を返す。
+        終わったゲームの最後の状態は final_score などに入る。
+        """
+        actions = np.asarray(actions)
+        self.frame += 1
+        score_before = self.score.copy()
+
+        # スペースキー（終わったゲームはすぐにやり直しているので、玉の発射だけ）
+        self.ball_active |= (actions & ACTION_FIRE) != 0
+
+        # パドルの移動
+        left = ((actions & ACTION_LEFT) != 0) & (self.paddle_x > LEFT_WALL_X + WALL_THICKNESS)
+        right = (~left & ((actions & ACTION_RIGHT) != 0) &
+                 (self.paddle_x + PADDLE_WIDTH < self.right_wall_x))
+        self.paddle_x[left] -= self.paddle_speed
+        self.paddle_x[right] += self.paddle_speed
+
+        # 玉の移動（発射されていない玉はパドルに追従）
+        moving = self.ball_active.copy()
+        waiting = ~moving
+        self.ball_x[waiting] = self.paddle_x[waiting] + PADDLE_WIDTH // 2
+        self.ball_x[moving] += self.ball_dx[moving]
+        self.ball_y[moving] += self.ball_dy[moving]
+
+        # 衝突判定
+        self.check_ball_wall_collision(moving)
+        self.check_ball_paddle_collision(moving)
+        self.check_ball_block_collision(moving)
+        self.check_ball_enemy_collision(moving)
+
+        # 玉が下に落ちた
+        fell = moving & (self.ball_y > self.bottom_y)
+        self.lives[fell] -= 1
+        self.reset_balls(fell & (self.lives > 0))
+        over = fell & (self.lives <= 0)
+        self.game_over |= over
+        self.ball_active[over] = False
+
+        # 敵の更新とレベルクリア判定
+        playing = ~self.game_over
+        self.check_enemy_trapped(playing)
+        self.update_enemies(playing)
+        self.level_cleared |= (playing & ~self.block_active.any(axis=1) &
+                               ~self.enemy_active.any(axis=1))
+
+        reward = self.score - score_before
+        done = self.game_over | self.level_cleared
+        self.final_score[done] = self.score[done]
+        self.final_lives[done] = self.lives[done]
+        self.final_level_cleared[done] = self.level_cleared[done]
+        self.reset_games(done)
+        return reward, done